@@ -1,7 +1,12 @@
 import json
 import os
+import sys
 from datetime import datetime
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+
+from utils.performance_history import PerformanceHistory
+
 def generate_performance_report():
     """تولید گزارش تحلیل عملکرد"""
     
@@ -29,20 +34,39 @@ def generate_performance_report():
         for operation, duration in operation_times.items():
             report += f"- **{operation}:** {duration:.4f} seconds\n"
         
+        # زمان مراحل pipeline
+        for stage, stats in performance_data.get('stages', {}).items():
+            report += (f"- **{stage}:** {stats['total_seconds']:.4f} seconds "
+                       f"({stats['count']}x, max {stats['max_seconds']:.4f}s)\n")
+        
         # اضافه کردن متریک‌های دقیق
         report += "\n## 📈 Detailed Metrics\n"
         detailed_metrics = performance_data.get('detailed_metrics', [])
         for metric in detailed_metrics[-5:]:  # آخرین 5 متریک
             report += f"- {metric['timestamp']}: {metric['operation']} - {metric['duration_seconds']}s, {metric['memory_mb']}MB\n"
         
+        # ثبت در تاریخچه و مقایسه با اجراهای قبلی
+        history = PerformanceHistory()
+        history.ingest(performance_data, run_id=os.getenv('GITHUB_RUN_ID'))
+        trend, regressions = history.trend_report()
+        history.close()
+        report += trend
+        
         # ذخیره گزارش
         with open('performance_analysis.md', 'w', encoding='utf-8') as f:
             f.write(report)
         
         print("Performance report generated successfully")
+        for regression in regressions:
+            print(f"⚠️ Performance regression: {regression['metric']} "
+                  f"x{regression['ratio']} (z={regression['z_score']})")
+        return regressions
         
     except Exception as e:
         print(f"Error generating performance report: {e}")
+        return []
 
 if __name__ == "__main__":
-    generate_performance_report()
+    regressions = generate_performance_report()
+    if regressions and '--fail-on-regression' in sys.argv:
+        sys.exit(1)
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+بنچمارک کرنل‌های اندیکاتور: محاسبات pandas در برابر strategies.indicators (با و بدون بافر out=)
+"""
+
+import os
+import sys
+import timeit
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from strategies import indicators
+
+def pandas_indicators(close):
+    """همان اندیکاتورهای calculate_indicators با pandas"""
+    series = pd.Series(close)
+    sma_20 = series.rolling(20).mean()
+    std_20 = series.rolling(20).std()
+    delta = series.diff()
+    gain = delta.where(delta > 0, 0).ewm(alpha=1 / 14, adjust=False).mean()
+    loss = (-delta.where(delta < 0, 0)).ewm(alpha=1 / 14, adjust=False).mean()
+    macd = series.ewm(span=12, adjust=False).mean() - series.ewm(span=26, adjust=False).mean()
+    return (sma_20, series.rolling(50).mean(), 100 - 100 / (1 + gain / loss),
+            macd, macd.ewm(span=9, adjust=False).mean(), sma_20 + 2 * std_20, sma_20 - 2 * std_20)
+
+def kernel_indicators(close, buffers=None):
+    """همان اندیکاتورها با کرنل‌ها؛ buffers بافرهای از پیش تخصیص داده شده است"""
+    buffers = buffers or {}
+    sma_20 = indicators.sma(close, 20, out=buffers.get('sma_20'))
+    sma_50 = indicators.sma(close, 50, out=buffers.get('sma_50'))
+    rsi = indicators.rsi(close, out=buffers.get('rsi'), work=buffers.get('work'))
+    macd = indicators.macd(close, out=buffers.get('macd'))
+    bands = indicators.bollinger(close, out=buffers.get('bands'))
+    return sma_20, sma_50, rsi, macd, bands
+
+def make_buffers(shape):
+    return {
+        'sma_20': np.empty(shape), 'sma_50': np.empty(shape), 'rsi': np.empty(shape),
+        'work': np.empty((2,) + shape), 'macd': np.empty((3,) + shape), 'bands': np.empty((3,) + shape),
+    }
+
+def peak_allocation(function):
+    """بیشینه حافظه تخصیص داده شده در یک فراخوانی (بایت)"""
+    function()
+    tracemalloc.start()
+    function()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak
+
+def measure(function, number):
+    return min(timeit.repeat(function, number=number, repeat=5)) / number
+
+def main():
+    print(f"{'input':>12} {'pandas ms':>10} {'kernel ms':>10} {'out= ms':>9} {'speedup':>8} "
+          f"{'pandas KB':>10} {'kernel KB':>10} {'out= KB':>8}")
+
+    rng = np.random.default_rng(0)
+    for shape in ((100,), (1000,), (10000,), (200, 100), (2000, 100)):
+        close = 30000 + np.cumsum(rng.normal(0, 50, shape), axis=-1)
+        rows = close if close.ndim == 2 else close[None, :]
+        buffers = make_buffers(shape)
+
+        # اعتبارسنجی در برابر pandas (MACD با ewm یکسان است؛ RSI بالا بدون مقدار اولیه Wilder است)
+        reference = pandas_indicators(rows[-1])
+        kernel = kernel_indicators(close, buffers)
+        np.testing.assert_allclose(np.atleast_2d(kernel[0])[-1], reference[0], rtol=1e-9)
+        np.testing.assert_allclose(np.atleast_2d(kernel[3][0])[-1], reference[3], rtol=1e-6, atol=1e-6)
+        np.testing.assert_allclose(np.atleast_2d(kernel[4][1])[-1], reference[5], rtol=1e-9)
+
+        number = max(3, 20000 // close.size)
+        pandas_time = measure(lambda: [pandas_indicators(row) for row in rows], number)
+        kernel_time = measure(lambda: kernel_indicators(close), number)
+        reused_time = measure(lambda: kernel_indicators(close, buffers), number)
+
+        pandas_peak = peak_allocation(lambda: [pandas_indicators(row) for row in rows])
+        kernel_peak = peak_allocation(lambda: kernel_indicators(close))
+        reused_peak = peak_allocation(lambda: kernel_indicators(close, buffers))
+
+        label = 'x'.join(str(size) for size in shape)
+        print(f"{label:>12} {pandas_time * 1000:>10.3f} {kernel_time * 1000:>10.3f} {reused_time * 1000:>9.3f} "
+              f"{pandas_time / reused_time:>7.1f}x {pandas_peak / 1024:>10.1f} {kernel_peak / 1024:>10.1f} "
+              f"{reused_peak / 1024:>8.1f}")
+
+if __name__ == "__main__":
+    main()
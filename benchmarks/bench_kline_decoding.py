@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+بنچمارک دیکود کندل‌ها: مسیر قبلی (DataFrame + to_numeric) در برابر decode_klines
+"""
+
+import json
+import os
+import sys
+import timeit
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from services.kline_decoder import decode_klines, _decode_numeric, _decode_parsed, orjson
+
+def make_payload(rows, seed=0, market=None):
+    """پاسخ ساختگی /market/kline با قیمت‌های رشته‌ای مانند API (زمان، open، close، high، low، حجم)
+
+    با market هر ردیف مثل پاسخ واقعی CoinEx دو فیلد اضافه (مبلغ معامله و نام بازار) دارد.
+    """
+    rng = np.random.default_rng(seed)
+    close = 30000 + np.cumsum(rng.normal(0, 50, rows))
+    data = [
+        [1700000000 + i * 900, f"{c - 5:.2f}", f"{c:.2f}", f"{c + 20:.2f}", f"{c - 20:.2f}",
+         f"{v:.4f}"] + ([f"{c * v:.2f}", market] if market else [])
+        for i, (c, v) in enumerate(zip(close, rng.uniform(1, 500, rows)))
+    ]
+    return json.dumps({'code': 0, 'data': data, 'message': 'OK'}).encode('utf-8')
+
+def legacy_decode(payload):
+    """مسیر قبلی fetch_market_data"""
+    market_data = [row[:6] for row in json.loads(payload)['data']]
+    df = pd.DataFrame(market_data, columns=['timestamp', 'open', 'close', 'high', 'low', 'volume'])
+    df['timestamp'] = pd.to_datetime(df['timestamp'], unit='s')
+    df.set_index('timestamp', inplace=True)
+    for col in ['open', 'high', 'low', 'close', 'volume']:
+        df[col] = pd.to_numeric(df[col])
+    return df[['open', 'high', 'low', 'close', 'volume']]
+
+def main():
+    print(f"orjson: {'available' if orjson is not None else 'not installed'}")
+    print(f"{'rows':>6} {'fields':>6} {'legacy ms':>10} {'parsed ms':>10} {'decode ms':>10} "
+          f"{'decode+df ms':>13} {'speedup':>8}")
+
+    for rows in (100, 1000, 10000):
+        for market in (None, 'BTCUSDT'):
+            payload = make_payload(rows, market=market)
+            pd.testing.assert_frame_equal(
+                legacy_decode(payload), decode_klines(payload).to_dataframe(), check_names=False
+            )
+            # ردیف‌های 8 فیلدی هم باید از مسیر سریع دیکود شوند
+            assert _decode_numeric(payload) is not None
+
+            number = max(10, 20000 // rows)
+            legacy = min(timeit.repeat(lambda: legacy_decode(payload), number=number, repeat=5)) / number
+            parsed = min(timeit.repeat(lambda: _decode_parsed(payload), number=number, repeat=5)) / number
+            decode = min(timeit.repeat(lambda: decode_klines(payload), number=number, repeat=5)) / number
+            full = min(timeit.repeat(lambda: decode_klines(payload).to_dataframe(),
+                                     number=number, repeat=5)) / number
+
+            fields = 8 if market else 6
+            print(f"{rows:>6} {fields:>6} {legacy * 1000:>10.3f} {parsed * 1000:>10.3f} {decode * 1000:>10.3f} "
+                  f"{full * 1000:>13.3f} {legacy / full:>7.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -25,3 +25,102 @@ RISK_REWARD_RATIOS = {
     'TP3': 3.0
 }
 STOP_LOSS_MULTIPLIER = 2.2
+
+# تنظیمات بازپخش داده‌های ضبط شده (replay)
+REPLAY_DATA_DIR = os.getenv('REPLAY_DATA_DIR', 'data/replay')
+REPLAY_MIN_SPEED = 1
+REPLAY_MAX_SPEED = 1000
+REPLAY_WARMUP_CANDLES = 50
+
+# تنظیمات زمان‌بندی داخلی هم‌تراز با بسته شدن کندل (حالت --loop)
+CANDLE_WINDOW_SIZE = 100
+SCHEDULER_TIMEFRAMES = [TIMEFRAME]
+SCHEDULER_PREWARM_SECONDS = 5
+SCHEDULER_FETCH_DELAY_SECONDS = 1.5
+SCHEDULER_FETCH_JITTER_SECONDS = 0.5
+SCHEDULER_LATENCY_BUDGET_SECONDS = 20
+
+# اسنپ‌شات وضعیت بین اجراهای کوتاه (GitHub Actions)
+STATE_SNAPSHOT_PATH = os.getenv('STATE_SNAPSHOT_PATH', 'state/market_state.bin')
+STATE_SNAPSHOT_MAX_AGE_SECONDS = 6 * 60 * 60
+
+# کنترل همزمانی تطبیقی (AIMD) و قطع‌کننده مدار درخواست‌های CoinEx
+GOVERNOR_INITIAL_CONCURRENCY = 4
+GOVERNOR_MIN_CONCURRENCY = 1
+GOVERNOR_MAX_CONCURRENCY = 16
+GOVERNOR_LATENCY_TARGET_SECONDS = 1.0
+GOVERNOR_DECREASE_FACTOR = 0.5
+CIRCUIT_FAILURE_THRESHOLD = 5
+CIRCUIT_OPEN_SECONDS = 30
+
+# ارسال درخواست تکراری (hedging) برای کاهش تاخیر دنباله‌ای دریافت کندل‌ها
+HEDGE_KLINE_REQUESTS = os.getenv('HEDGE_KLINE_REQUESTS', 'false').lower() == 'true'
+HEDGE_PERCENTILE = 95
+HEDGE_BUDGET_RATIO = 0.05
+HEDGE_BUDGET_BURST = 1
+HEDGE_MIN_DELAY_SECONDS = 0.05
+HEDGE_DEFAULT_DELAY_SECONDS = 1.0
+HEDGE_MIN_SAMPLES = 20
+
+# ارسال تجمیعی سیگنال‌های هر چرخه در پیام‌های خلاصه تلگرام
+TELEGRAM_DIGEST_MODE = os.getenv('TELEGRAM_DIGEST_MODE', 'false').lower() == 'true'
+TELEGRAM_MESSAGE_LIMIT = 4096
+# سیگنال‌های با اطمینان بالاتر یا برابر این مقدار جداگانه و فوری ارسال می‌شوند
+TELEGRAM_PRIORITY_CONFIDENCE = 100
+
+# پروفایل حافظه مراحل pipeline با tracemalloc (معادل گزینه --memory-profile)
+MEMORY_PROFILING = os.getenv('MEMORY_PROFILING', 'false').lower() == 'true'
+
+# تنظیمات پروفایل حالت دیباگ (debug_mode.py)
+DEBUG_PROFILER = 'both'  # cprofile | sampling | both
+DEBUG_SAMPLE_INTERVAL_SECONDS = 0.001
+DEBUG_PROFILE_LIMIT = 300
+
+# اجرای مرحله‌ای چرخه (دریافت / محاسبه / ارسال) با صف‌های محدود (گزینه --pipeline)
+PIPELINE_ENABLED = os.getenv('PIPELINE_ENABLED', 'false').lower() == 'true'
+PIPELINE_FETCH_WORKERS = 4
+PIPELINE_COMPUTE_WORKERS = max(1, (os.cpu_count() or 2) - 1)
+PIPELINE_QUEUE_SIZE = 8
+
+# دفتر سفارش و فیلتر نقدینگی سیگنال‌ها
+ORDER_BOOK_FILTER = os.getenv('ORDER_BOOK_FILTER', 'false').lower() == 'true'
+ORDER_BOOK_DEPTH_LIMIT = 50
+ORDER_BOOK_BAND_PCT = 0.5  # عمق در بازه ±درصد از قیمت ورود
+ORDER_BOOK_ORDER_NOTIONAL = 1000  # اندازه سفارش (USDT) برای تخمین لغزش
+ORDER_BOOK_MAX_SPREAD_BPS = 20
+ORDER_BOOK_MAX_SLIPPAGE_BPS = 30
+ORDER_BOOK_MIN_DEPTH_NOTIONAL = 5000
+
+# حذف سیگنال‌های تکراری نمادهای همبسته در هر چرخه
+SIGNAL_DECLUSTER = os.getenv('SIGNAL_DECLUSTER', 'false').lower() == 'true'
+CORRELATION_HALFLIFE_CANDLES = 48
+CORRELATION_THRESHOLD = 0.8
+CORRELATION_MIN_OBSERVATIONS = 20
+
+# کندل موقت از معاملات لحظه‌ای (/market/deals) برای تشخیص شرایط درون کندل
+TRADE_AGGREGATION = os.getenv('TRADE_AGGREGATION', 'false').lower() == 'true'
+TRADE_POLL_INTERVAL_SECONDS = 2
+TRADE_POLL_LIMIT = 1000
+
+# نوع داده ستون‌های قیمت، حجم و اندیکاتورها (float32 حافظه پنجره‌ها را نصف می‌کند)
+DATA_DTYPE = os.getenv('DATA_DTYPE', 'float64').lower()
+
+# ارزیابی تنبل و کوتاه‌شونده شرط‌های سیگنال (فقط اندیکاتورهای لازم روی آخرین کندل)
+LAZY_SIGNAL_EVALUATION = os.getenv('LAZY_SIGNAL_EVALUATION', 'false').lower() == 'true'
+
+# ژورنال ستونی سیگنال‌ها همراه با اندیکاتورهای لحظه تصمیم
+SIGNAL_JOURNAL = os.getenv('SIGNAL_JOURNAL', 'false').lower() == 'true'
+SIGNAL_JOURNAL_DIR = os.getenv('SIGNAL_JOURNAL_DIR', 'journal')
+
+# موتور سیگنال: indicators (رای‌گیری شرط‌های اندیکاتور) یا atr_trailing (حد ضرر متحرک ATR با SENSITIVITY و SIGNAL_TUNER)
+STRATEGY_MODE = os.getenv('STRATEGY_MODE', 'indicators').lower()
+# منبع قیمت حالت atr_trailing: بسته شدن کندل‌های Heikin-Ashi به جای قیمت بسته شدن
+HEIKIN_ASHI = os.getenv('HEIKIN_ASHI', 'false').lower() == 'true'
+
+# اسکنر بازار: فهرست K قوی‌ترین وضعیت سیگنال بین همه بازارها (گزینه --scan)
+SCANNER_TOP_K = 10
+SCANNER_QUOTE = 'USDT'
+SCANNER_MAX_MARKETS = 3000
+# بودجه زمانی کل اسکن (دریافت کندل‌ها و امتیازدهی)؛ دریافت در دسته‌های SCANNER_FETCH_BATCH بازار
+SCANNER_TIME_BUDGET_SECONDS = 60
+SCANNER_FETCH_BATCH = 200
@@ -5,14 +5,30 @@
 
 import argparse
 import json
-from services.debug_service import DebugService
+from services.debug_service import DebugService, PROFILERS
 from config.logging_config import setup_logging, get_logger
+from config.config import DEBUG_PROFILER
+
+def print_profile(result, verbose=False):
+    """نمایش زمان هر مرحله pipeline و فایل‌های پروفایل"""
+    total = sum(result.get('stages', {}).values()) or 1
+    for stage, seconds in result.get('stages', {}).items():
+        print(f"  {stage:<11} {seconds * 1000:9.2f} ms ({seconds / total:6.1%})")
+    for kind, path in result.get('files', {}).items():
+        print(f"  {kind}: {path}")
+    if verbose:
+        for entry in result.get('top_functions', []):
+            print(f"    {json.dumps(entry, ensure_ascii=False)}")
 
 def main():
     parser = argparse.ArgumentParser(description='Debug Mode for CoinEx Signal Bot')
     parser.add_argument('--symbol', type=str, help='Specific symbol to debug')
     parser.add_argument('--comprehensive', action='store_true', help='Run comprehensive test')
     parser.add_argument('--verbose', action='store_true', help='Verbose output')
+    parser.add_argument('--profiler', choices=PROFILERS, default=DEBUG_PROFILER, help='Profiler to run the pipeline under')
+    parser.add_argument('--repeat', type=int, default=1, help='Pipeline repetitions per symbol')
+    parser.add_argument('--workers', type=int, default=None, help='Worker processes for --comprehensive')
+    parser.add_argument('--sequential', action='store_true', help='Run --comprehensive in a single process')
     
     args = parser.parse_args()
     
@@ -24,7 +40,10 @@ def main():
     
     if args.comprehensive:
         logger.info("Running comprehensive debug test...")
-        results = debug_service.run_comprehensive_test()
+        results = debug_service.run_comprehensive_test(
+            profiler=args.profiler, parallel=not args.sequential,
+            max_workers=args.workers, repeat=args.repeat
+        )
         
         print("\n" + "="*50)
         print("COMPREHENSIVE DEBUG RESULTS")
@@ -38,12 +57,25 @@ def main():
                 print(f"  Signals found: {result['signals_found']}")
             else:
                 print(f"  Error: {result['error']}")
+            print_profile(result, args.verbose)
         
         print("="*50)
         
     elif args.symbol:
         logger.info(f"Debugging symbol: {args.symbol}")
         # دیباگ نماد خاص
+        result = debug_service.profile_symbol(args.symbol, profiler=args.profiler, repeat=args.repeat)
+        
+        status = "✅ SUCCESS" if result['status'] == 'success' else "❌ FAILED"
+        print(f"{args.symbol}: {status}")
+        if result['status'] == 'success':
+            print(f"  Data points: {result['data_points']}")
+            print(f"  Signals found: {result['signals_found']}")
+        else:
+            print(f"  Error: {result['error']}")
+            if args.verbose:
+                print(result['traceback'])
+        print_profile(result, args.verbose)
         
     else:
         print("Please specify a debug mode. Use --help for options.")
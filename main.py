@@ -17,8 +17,21 @@ sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 try:
     from services.coinex_api import CoinExAPI
     from services.telegram_bot import TelegramBot
+    from services.market_state import MarketState
+    from services.state_snapshot import save_snapshot, load_snapshot, SnapshotError
+    from services.signal_pipeline import SignalPipeline
+    from services.order_book import OrderBookStore
+    from services.correlation_service import CorrelationService
+    from services.trade_aggregator import TradeAggregator
+    from services.signal_journal import SignalJournal
+    from utils.time_utils import timeframe_to_seconds
+    from utils.performance_monitor import performance_monitor
     from strategies.mutanabby_strategy import MutanabbyStrategy
-    from config.config import SYMBOLS, TIMEFRAME, SENSITIVITY, SIGNAL_TUNER
+    from config.config import SYMBOLS, TIMEFRAME, SENSITIVITY, SIGNAL_TUNER, CANDLE_WINDOW_SIZE
+    from config.config import STATE_SNAPSHOT_PATH, TELEGRAM_DIGEST_MODE, TELEGRAM_PRIORITY_CONFIDENCE
+    from config.config import MEMORY_PROFILING, PIPELINE_ENABLED, ORDER_BOOK_FILTER, ORDER_BOOK_DEPTH_LIMIT
+    from config.config import SIGNAL_DECLUSTER, TRADE_AGGREGATION, SIGNAL_JOURNAL
+    from config.config import SCANNER_QUOTE, SCANNER_MAX_MARKETS, SCANNER_TIME_BUDGET_SECONDS, SCANNER_FETCH_BATCH
     print("✅ تمام ماژول‌ها با موفقیت import شدند")
 except ImportError as e:
     print(f"❌ خطا در import ماژول‌ها: {e}")
@@ -44,11 +57,32 @@ except ImportError as e:
     sys.exit(1)
 
 class CoinExSignalBot:
-    def __init__(self, test_mode=False):
+    def __init__(self, test_mode=False, coinex_api=None, telegram_bot=None, use_pipeline=PIPELINE_ENABLED):
         self.test_mode = test_mode
-        self.coinex_api = CoinExAPI()
-        self.telegram_bot = TelegramBot()
+        self.coinex_api = coinex_api or CoinExAPI()
+        self.telegram_bot = telegram_bot or TelegramBot()
         self.strategy = MutanabbyStrategy()
+        # تاخیر بین ارسال سیگنال‌ها (ثانیه)
+        self.send_delay = 1
+        # وضعیت گرم بین چرخه‌ها (پنجره کندل‌ها، مکان‌نما و حذف سیگنال تکراری)
+        self.state = MarketState()
+        self.clock = time.time
+        # سیگنال‌های عادی هر چرخه در پیام‌های خلاصه ارسال می‌شوند
+        self.digest_mode = TELEGRAM_DIGEST_MODE
+        self.pending_digest = []
+        # اجرای مرحله‌ای چرخه: دریافت، محاسبه و ارسال همپوشان با صف‌های محدود
+        self.pipeline = SignalPipeline(self) if use_pipeline else None
+        # دفتر سفارش نمادها برای فیلتر نقدینگی سیگنال‌ها (None یعنی غیرفعال)
+        self.order_books = OrderBookStore() if ORDER_BOOK_FILTER else None
+        # همبستگی بازده نمادها برای حذف سیگنال‌های هم‌خوشه (None یعنی غیرفعال)
+        self.correlation = CorrelationService() if SIGNAL_DECLUSTER else None
+        self.cycle_signals = {}
+        # سیگنال‌های حذف شده هر سیگنال رهبر گروه: (نماد رهبر، تایم‌فریم، کندل، نوع) ← [(نماد، سیگنال)]
+        self.cluster_followers = {}
+        # کندل موقت از معاملات لحظه‌ای برای شرایط درون کندل (None یعنی غیرفعال)
+        self.trades = TradeAggregator(TIMEFRAME) if TRADE_AGGREGATION else None
+        # ژورنال ستونی سیگنال‌های صادر شده (None یعنی غیرفعال)
+        self.journal = SignalJournal() if SIGNAL_JOURNAL else None
         
         print("🤖 CoinEx Signal Bot initialized")
         print(f"🎯 نمادها: {SYMBOLS}")
@@ -56,25 +90,65 @@ class CoinExSignalBot:
         print(f"🎚️ حساسیت: {SENSITIVITY}")
         print(f"⚙️ تنظیم کننده سیگنال: {SIGNAL_TUNER}")
     
-    def fetch_market_data(self, symbol, timeframe, limit=100):
+    def restore_state(self, path=STATE_SNAPSHOT_PATH):
+        """بازیابی وضعیت اجرای قبلی؛ در صورت خرابی یا قدیمی بودن، ساخت کامل از صفر"""
+        if not os.path.exists(path):
+            print("🆕 اسنپ‌شات وضعیت وجود ندارد - دریافت کامل داده‌ها")
+            return False
+        
+        try:
+            state, created_at = load_snapshot(path, window_size=self.state.window_size)
+        except (SnapshotError, OSError, ValueError, KeyError) as e:
+            print(f"⚠️ اسنپ‌شات وضعیت قابل استفاده نیست ({e}) - دریافت کامل داده‌ها")
+            return False
+        
+        self.state = state
+        self.strategy.trailing_states = {}
+        for (symbol, timeframe), symbol_state in state.symbols.items():
+            trailing = symbol_state.trailing
+            # وضعیت ساخته شده با تنظیمات دیگر کنار گذاشته و از پنجره دوباره ساخته می‌شود
+            if trailing is not None and (trailing.sensitivity, trailing.period, trailing.heikin_ashi) == (
+                    self.strategy.sensitivity, self.strategy.signal_tuner, self.strategy.heikin_ashi):
+                self.strategy.trailing_states[self._trailing_key(symbol, timeframe)] = trailing
+        age = time.time() - created_at
+        print(f"♻️ وضعیت {len(state.symbols)} نماد از اسنپ‌شات بازیابی شد (عمر: {age:.0f} ثانیه)")
+        return True
+    
+    @staticmethod
+    def _trailing_key(symbol, timeframe):
+        """کلید وضعیت حد ضرر متحرک نماد در استراتژی (نماد، فاصله کندل‌ها)"""
+        return symbol, pd.Timedelta(seconds=timeframe_to_seconds(timeframe))
+    
+    def save_state(self, path=STATE_SNAPSHOT_PATH):
+        """ذخیره وضعیت فعلی (پنجره‌ها و وضعیت افزایشی استراتژی) برای اجرای بعدی"""
+        for (symbol, timeframe), symbol_state in self.state.symbols.items():
+            symbol_state.trailing = self.strategy.trailing_states.get(self._trailing_key(symbol, timeframe))
+        try:
+            size = save_snapshot(self.state, path)
+            print(f"💾 اسنپ‌شات وضعیت ذخیره شد ({size} بایت)")
+            return True
+        except OSError as e:
+            print(f"❌ خطا در ذخیره اسنپ‌شات وضعیت: {e}")
+            return False
+    
+    def fetch_market_data(self, symbol, timeframe, limit=CANDLE_WINDOW_SIZE):
         """دریافت داده‌های بازار از CoinEx"""
         try:
+            # با پنجره گرم فقط کندل‌های جدید دریافت می‌شوند
+            fetch_limit = self.state.delta_limit(symbol, timeframe, limit, self.clock())
             print(f"📡 دریافت داده برای {symbol}...")
-            market_data = self.coinex_api.get_market_data(symbol, 'kline', limit, timeframe)
+            candles = self.coinex_api.get_klines(symbol, fetch_limit, timeframe)
             
-            if not market_data:
+            if not candles:
                 print(f"⚠️ هیچ داده‌ای برای {symbol} دریافت نشد")
                 return None
             
-            # تبدیل داده‌ها به DataFrame
-            df = pd.DataFrame(market_data, columns=['timestamp', 'open', 'high', 'low', 'close', 'volume'])
-            df['timestamp'] = pd.to_datetime(df['timestamp'], unit='s')
-            df.set_index('timestamp', inplace=True)
-            
-            # تبدیل مقادیر به عدد
-            for col in ['open', 'high', 'low', 'close', 'volume']:
-                df[col] = pd.to_numeric(df[col])
+            # آرایه‌های عددی مستقیما به DataFrame تبدیل می‌شوند (بدون ستون object)
+            df = candles.to_dataframe()
             
+            df = self.state.merge(symbol, timeframe, df, limit)
+            if self.trades is not None and timeframe == self.trades.timeframe:
+                self.trades.anchor(symbol, df, self.clock())
             print(f"✅ داده‌های {symbol} پردازش شدند ({len(df)} کندل)")
             return df
             
@@ -89,7 +163,7 @@ class CoinExSignalBot:
                 print(f"⚠️ داده‌های ناکافی برای {symbol}")
                 return []
             
-            signals = self.strategy.generate_signals(df)
+            signals = self.strategy.generate_signals(df, symbol, now=self.clock())
             print(f"📈 {len(signals)} سیگنال برای {symbol} تولید شد")
             return signals
             
@@ -97,74 +171,392 @@ class CoinExSignalBot:
             print(f"❌ خطا در تولید سیگنال‌های {symbol}: {e}")
             return []
     
-    def send_signals(self, signals, symbol):
-        """ارسال سیگنال‌ها به تلگرام"""
+    def send_signals(self, signals, symbol, timeframe=TIMEFRAME):
+        """ارسال سیگنال‌ها به تلگرام؛ در حالت خلاصه فقط سیگنال‌های پراهمیت فوری ارسال می‌شوند"""
         if not signals:
             return 0
         
-        sent_count = 0
+        delivered = []
         for signal in signals:
             try:
-                message = self.telegram_bot.format_signal_message(
-                    symbol=symbol,
-                    signal_type='خرید' if signal['type'] == 'BUY' else 'فروش',
-                    entry=round(signal['entry'], 4),
-                    sl=round(signal['sl'], 4),
-                    tp1=round(signal['tp1'], 4),
-                    tp2=round(signal['tp2'], 4),
-                    tp3=round(signal['tp3'], 4)
-                )
+                fields = self.telegram_bot.signal_fields(signal, symbol)
+                
+                if self.digest_mode and not self.is_priority(signal):
+                    self.pending_digest.append(
+                        (symbol, timeframe, signal, self.telegram_bot.format_digest_line(**fields))
+                    )
+                    continue
+                
+                message = self.telegram_bot.format_signal_message(**fields)
                 
                 if self.test_mode:
                     print(f"🧪 حالت تست - سیگنال برای {symbol}:")
                     print(message)
-                    sent_count += 1
+                    delivered.append(signal)
                 else:
+                    performance_monitor.increment('telegram_messages')
                     if self.telegram_bot.send_message(message):
                         print(f"✅ سیگنال برای {symbol} ارسال شد")
-                        sent_count += 1
+                        delivered.append(signal)
                     else:
                         print(f"❌ ارسال سیگنال برای {symbol} ناموفق بود")
                 
                 # تاخیر بین ارسال سیگنال‌ها
-                time.sleep(1)
+                if self.send_delay:
+                    time.sleep(self.send_delay)
                 
             except Exception as e:
                 print(f"❌ خطا در ارسال سیگنال برای {symbol}: {e}")
         
+        for signal in delivered:
+            self.mark_delivered(symbol, timeframe, signal)
+        self.record_signals(delivered, symbol, timeframe)
+        return len(delivered)
+    
+    def flush_digest(self):
+        """ارسال سیگنال‌های صف شده چرخه در کمترین تعداد پیام"""
+        if not self.pending_digest:
+            return 0
+        
+        pending, self.pending_digest = self.pending_digest, []
+        lines = [line for *_, line in pending]
+        
+        try:
+            if self.test_mode:
+                chunks = self.telegram_bot.split_digest(lines)
+                for part, chunk in enumerate(chunks, 1):
+                    print(f"🧪 حالت تست - پیام خلاصه {part}/{len(chunks)}:")
+                    print(self.telegram_bot.render_digest(chunk, part, len(chunks), len(lines)))
+                delivered = [True] * len(lines)
+            else:
+                performance_monitor.increment('telegram_messages', len(self.telegram_bot.split_digest(lines)))
+                delivered = self.telegram_bot.send_digest(lines)
+        except Exception as e:
+            print(f"❌ خطا در ارسال پیام خلاصه: {e}")
+            return 0
+        
+        # فقط سیگنال‌های تحویل شده علامت می‌خورند و ثبت می‌شوند تا بقیه در چرخه بعد دوباره ارسال شوند
+        recorded = {}
+        for (symbol, timeframe, signal, _), ok in zip(pending, delivered):
+            if ok:
+                self.mark_delivered(symbol, timeframe, signal)
+                recorded.setdefault((symbol, timeframe), []).append(signal)
+        for (symbol, timeframe), signals in recorded.items():
+            self.record_signals(signals, symbol, timeframe)
+        
+        sent_count = sum(delivered)
+        print(f"📨 {sent_count} از {len(lines)} سیگنال در پیام خلاصه ارسال شد")
         return sent_count
     
-    def run(self):
-        """اجرای اصلی ربات"""
-        print("\n" + "="*60)
-        print("🚀 شروع اجرای CoinEx Signal Bot")
-        print("="*60)
+    @staticmethod
+    def is_priority(signal):
+        """سیگنال پراهمیت بدون انتظار برای پیام خلاصه ارسال می‌شود"""
+        return signal.get('confidence', 0) >= TELEGRAM_PRIORITY_CONFIDENCE
+    
+    def filter_by_liquidity(self, signals, symbol):
+        """به‌روزرسانی دفتر سفارش نماد و حذف سیگنال‌هایی که نقدینگی کافی ندارند"""
+        try:
+            depth = self.coinex_api.get_depth(symbol, ORDER_BOOK_DEPTH_LIMIT)
+        except Exception as e:
+            print(f"⚠️ خطا در دریافت دفتر سفارش {symbol}: {e}")
+            depth = None
+        if depth is not None:
+            self.order_books.apply(symbol, depth)
         
-        total_signals = 0
-        start_time = time.time()
+        accepted = self.order_books.filter_signals(signals, symbol)
+        if len(accepted) < len(signals):
+            print(f"💧 {len(signals) - len(accepted)} سیگنال {symbol} به دلیل نقدینگی کم حذف شد")
+            performance_monitor.increment('signals_illiquid', len(signals) - len(accepted))
+        return accepted
+    
+    def filter_new_signals(self, signals, symbol, timeframe):
+        """حذف سیگنال‌هایی که برای همان کندل قبلا ارسال شده‌اند"""
+        return [
+            signal for signal in signals
+            if self.state.is_new_signal_candle(symbol, timeframe, self._candle_time(signal),
+                                               self.is_provisional(signal))
+        ]
+    
+    @staticmethod
+    def is_provisional(signal):
+        """سیگنال کندل در حال تشکیل (run_intrabar) که هنوز با بسته شدن کندل تایید نشده است"""
+        return signal.get('provisional', False)
+    
+    @staticmethod
+    def _candle_time(signal):
+        """زمان کندل سیگنال به ثانیه یونیکس"""
+        return int(pd.Timestamp(signal['timestamp']).timestamp())
+    
+    def process_symbol(self, symbol, timeframe=TIMEFRAME):
+        """پردازش یک نماد: دریافت داده، تولید و ارسال سیگنال"""
+        print(f"\n🎯 پردازش نماد: {symbol}")
+        
+        performance_monitor.increment('symbols')
+        
+        # دریافت داده‌های بازار
+        with performance_monitor.stage('fetch', symbol):
+            df = self.fetch_market_data(symbol, timeframe)
+        if df is None:
+            return 0
+        
+        # تولید سیگنال‌ها
+        with performance_monitor.stage('signals', symbol):
+            signals = self.generate_signals(df, symbol)
+        
+        with performance_monitor.stage('send', symbol):
+            return self.deliver_signals(signals, symbol, timeframe)
+    
+    def deliver_signals(self, signals, symbol, timeframe=TIMEFRAME):
+        """حذف سیگنال‌های تکراری، ارسال و ثبت کندل آخرین سیگنال ارسال شده"""
+        signals = self.filter_new_signals(signals, symbol, timeframe)
+        performance_monitor.increment('signals_generated', len(signals))
         
+        if not signals:
+            print(f"📊 هیچ سیگنالی برای {symbol} یافت نشد")
+            return 0
+        
+        if self.correlation is not None:
+            # سیگنال‌ها تا پایان چرخه نگه داشته می‌شوند تا گروه‌های همبسته حذف شوند
+            self.cycle_signals[symbol] = signals
+            return 0
+        return self._send_new_signals(signals, symbol, timeframe)
+    
+    def mark_delivered(self, symbol, timeframe, signal):
+        """علامت‌گذاری کندل سیگنال تحویل شده و سیگنال‌های هم‌خوشه‌ای که به خاطر آن حذف شده‌اند"""
+        provisional = self.is_provisional(signal)
+        self.state.mark_signal(symbol, timeframe, self._candle_time(signal), provisional)
+        for follower, follower_signal in self.cluster_followers.pop(self._cluster_key(symbol, timeframe, signal), []):
+            self.state.mark_signal(follower, timeframe, self._candle_time(follower_signal), provisional)
+    
+    def _cluster_key(self, symbol, timeframe, signal):
+        """کلید سیگنال رهبر در cluster_followers (هر سیگنال رهبر حذف شده‌های خودش را دارد)"""
+        return symbol, timeframe, self._candle_time(signal), signal['type']
+    
+    def _send_new_signals(self, signals, symbol, timeframe, check_liquidity=True):
+        if self.order_books is not None and check_liquidity:
+            signals = self.filter_by_liquidity(signals, symbol)
+            if not signals:
+                return 0
+        
+        # ارسال سیگنال‌ها
+        sent_count = self.send_signals(signals, symbol, timeframe)
+        performance_monitor.increment('signals_sent', sent_count)
+        return sent_count
+    
+    def run_intrabar(self, timeframe=TIMEFRAME):
+        """دریافت معاملات جدید و ارزیابی کندل موقت همه نمادها بین چرخه‌ها"""
+        sent_count = 0
         for symbol in SYMBOLS:
+            window = self.state.get(symbol, timeframe).window
+            if window is None:
+                continue
             try:
-                print(f"\n🎯 پردازش نماد: {symbol}")
-                
-                # دریافت داده‌های بازار
-                df = self.fetch_market_data(symbol, TIMEFRAME)
-                if df is None:
+                with performance_monitor.stage('trades', symbol):
+                    if not self.trades.poll(self.coinex_api, symbol):
+                        continue
+                    if self.strategy.mode == 'indicators':
+                        frame = self.trades.provisional_frame(symbol, window)
+                    else:
+                        # حالت‌های دیگر کل تاریخچه را لازم دارند؛ کندل موقت وضعیت نماد را تغییر نمی‌دهد
+                        frame = self.trades.provisional_window(symbol, window)
+                if frame is None:
                     continue
-                
-                # تولید سیگنال‌ها
-                signals = self.generate_signals(df, symbol)
-                
-                # ارسال سیگنال‌ها
-                if signals:
-                    sent_count = self.send_signals(signals, symbol)
-                    total_signals += sent_count
+                if self.strategy.mode == 'indicators':
+                    signals = self.strategy.analyze_signals(frame)
                 else:
-                    print(f"📊 هیچ سیگنالی برای {symbol} یافت نشد")
-                
+                    signals = self.strategy.generate_signals(frame, symbol, now=self.clock(), commit=False)
+                # سیگنال کندل در حال تشکیل جدا از سیگنال قطعی کندل ارسال و حذف تکراری می‌شود
+                for signal in signals:
+                    signal['provisional'] = True
+                sent_count += self.deliver_signals(signals, symbol, timeframe)
             except Exception as e:
-                print(f"💥 خطای غیرمنتظره در پردازش {symbol}: {e}")
+                print(f"❌ خطا در ارزیابی کندل موقت {symbol}: {e}")
+        if self.correlation is not None:
+            sent_count += self.deliver_declustered(timeframe)
+        sent_count += self.flush_digest()
+        return sent_count
+    
+    def record_signals(self, signals, symbol, timeframe):
+        """ثبت سیگنال‌های تحویل شده و اندیکاتورهای لحظه تصمیم در ژورنال
+
+        فقط پس از ارسال موفق فراخوانی می‌شود تا تلاش دوباره سیگنال‌های ارسال
+        نشده در چرخه بعد ردیف تکراری در ژورنال نسازد.
+        """
+        if self.journal is None or not signals:
+            return
+        try:
+            with performance_monitor.stage('journal', symbol):
+                self.journal.append(symbol, timeframe, signals, recorded_at=self.clock())
+        except (OSError, ValueError) as e:
+            print(f"❌ خطا در ثبت سیگنال‌های {symbol} در ژورنال: {e}")
+    
+    def update_correlation(self, timeframe):
+        """ثبت آخرین کندل بسته شده همه نمادها در ماتریس همبستگی (ساخت اولیه از پنجره‌ها)"""
+        now = self.clock()
+        closes = {}
+        for symbol in SYMBOLS:
+            window = self.state.get(symbol, timeframe).window
+            if window is None or not len(window):
                 continue
+            # کندل در حال تشکیل در بازده‌ها استفاده نمی‌شود
+            close_times = window.index.asi8 // 10**9 + timeframe_to_seconds(timeframe)
+            closed = window['close'][close_times <= now]
+            if len(closed):
+                closes[symbol] = closed
+        
+        if not closes:
+            return
+        if not self.correlation.last:
+            self.correlation.seed(pd.DataFrame(closes))
+            return
+        for symbol, closed in closes.items():
+            self.correlation.observe(symbol, int(closed.index[-1].timestamp()), float(closed.iloc[-1]))
+        self.correlation.commit()
+    
+    def deliver_declustered(self, timeframe):
+        """ارسال سیگنال‌های چرخه پس از حذف سیگنال‌های هم‌جهت نمادهای همبسته"""
+        self.update_correlation(timeframe)
+        signals_by_symbol, self.cycle_signals = self.cycle_signals, {}
+        if self.order_books is not None:
+            # فیلتر نقدینگی پیش از گروه‌بندی تا رهبر هر گروه سیگنالی قابل ارسال باشد
+            signals_by_symbol = {
+                symbol: self.filter_by_liquidity(signals, symbol)
+                for symbol, signals in signals_by_symbol.items() if signals
+            }
+        signals_by_symbol = {symbol: signals for symbol, signals in signals_by_symbol.items() if signals}
+        if not signals_by_symbol:
+            return 0
+        
+        kept, suppressed = self.correlation.decluster(signals_by_symbol)
+        # حذف شده‌ها فقط پس از تحویل رهبر علامت می‌خورند (mark_delivered)؛ اگر رهبر
+        # ارسال نشود در چرخه بعد دوباره ارزیابی می‌شوند
+        self.cluster_followers = {}
+        for symbol, signal, leader, leader_signal in suppressed:
+            print(f"🔗 سیگنال {signal['type']} {symbol} هم‌خوشه با {leader} است و ارسال نشد")
+            self.cluster_followers.setdefault(
+                self._cluster_key(leader, timeframe, leader_signal), []
+            ).append((symbol, signal))
+        performance_monitor.increment('signals_clustered', len(suppressed))
+        
+        sent_count = 0
+        for symbol, signals in kept.items():
+            if signals:
+                sent_count += self._send_new_signals(signals, symbol, timeframe, check_liquidity=False)
+        return sent_count
+    
+    def run_cycle(self, timeframe=TIMEFRAME, deadline=None):
+        """یک چرخه ارزیابی همه نمادها با بودجه زمانی (deadline به ثانیه یونیکس)"""
+        cycle = {
+            'timeframe': timeframe,
+            'started_at': self.clock(),
+            'signals_sent': 0,
+            'latencies': {},
+            'misses': [],
+            'errors': [],
+        }
+        
+        if self.pipeline is not None:
+            self._run_pipeline_cycle(cycle, timeframe, deadline)
+        else:
+            for symbol in SYMBOLS:
+                try:
+                    cycle['signals_sent'] += self.process_symbol(symbol, timeframe)
+                except Exception as e:
+                    print(f"💥 خطای غیرمنتظره در پردازش {symbol}: {e}")
+                    cycle['errors'].append(symbol)
+                
+                finished_at = self.clock()
+                cycle['latencies'][symbol] = round(finished_at - cycle['started_at'], 4)
+                if deadline is not None and finished_at > deadline:
+                    cycle['misses'].append(symbol)
+        
+        if self.correlation is not None:
+            with performance_monitor.stage('decluster'):
+                cycle['signals_sent'] += self.deliver_declustered(timeframe)
+        
+        with performance_monitor.stage('digest'):
+            digest_sent = self.flush_digest()
+        cycle['signals_sent'] += digest_sent
+        performance_monitor.increment('signals_sent', digest_sent)
+        
+        cycle['duration'] = round(self.clock() - cycle['started_at'], 4)
+        cycle['memory_growth'] = performance_monitor.end_cycle()
+        return cycle
+    
+    def _run_pipeline_cycle(self, cycle, timeframe, deadline):
+        """اجرای چرخه با pipeline مرحله‌ای و ثبت تاخیر هر نماد"""
+        performance_monitor.increment('symbols', len(SYMBOLS))
+        with performance_monitor.stage('pipeline'):
+            result = self.pipeline.run(SYMBOLS, timeframe)
+        
+        cycle['signals_sent'] += sum(result['sent'].values())
+        cycle['errors'].extend(result['errors'])
+        for symbol in SYMBOLS:
+            finished_at = result['finished_at'].get(symbol, self.clock())
+            cycle['latencies'][symbol] = round(finished_at - cycle['started_at'], 4)
+            if deadline is not None and finished_at > deadline:
+                cycle['misses'].append(symbol)
+        cycle['pipeline'] = result['stats']
+        
+        for stage, stats in result['stats'].items():
+            print(f"🔀 مرحله {stage}: {stats['items']} آیتم، بهره‌وری {stats['utilization']:.0%}، "
+                  f"بیشینه صف {stats['max_queue_depth']}")
+    
+    def scan_markets(self, scanner, timeframe=TIMEFRAME):
+        """یک چرخه اسکن همه بازارهای SCANNER_QUOTE و ارسال فهرست K وضعیت برتر"""
+        deadline = scanner.clock() + SCANNER_TIME_BUDGET_SECONDS
+        with performance_monitor.stage('scan_fetch'):
+            markets = [market for market in self.coinex_api.get_market_list() or []
+                       if market.endswith(SCANNER_QUOTE)][:SCANNER_MAX_MARKETS]
+        # بازارهای قوی چرخه قبل زودتر دریافت می‌شوند تا با پایان بودجه زمانی از دست نروند
+        markets = scanner.order(markets)
+        fetched = []
+        
+        def fetch_batches():
+            """دریافت کندل‌ها دسته به دسته؛ scan_batches پس از پایان بودجه دسته بعدی را نمی‌خواهد"""
+            for start in range(0, len(markets), SCANNER_FETCH_BATCH):
+                batch = markets[start:start + SCANNER_FETCH_BATCH]
+                with performance_monitor.stage('scan_fetch'):
+                    candles = self.coinex_api.get_klines_many(
+                        dict.fromkeys(batch, CANDLE_WINDOW_SIZE), timeframe
+                    )
+                fetched.extend(batch)
+                yield {symbol: ohlcv.close for symbol, ohlcv in candles.items()
+                       if ohlcv is not None and len(ohlcv) >= 50}
+        
+        with performance_monitor.stage('scan'):
+            ranked = scanner.scan_batches(fetch_batches(), deadline=deadline)
+        print(f"🔭 اسکن {len(fetched)} بازار از {len(markets)}")
+        if len(fetched) < len(markets):
+            print(f"⏱️ بودجه زمانی اسکن تمام شد؛ {len(markets) - len(fetched)} بازار دریافت نشد")
+        if not ranked:
+            print("📊 هیچ وضعیتی برای فهرست برتر یافت نشد")
+            return ranked
+        
+        lines = [scanner.format_line(rank, entry) for rank, entry in enumerate(ranked, 1)]
+        print("\n".join(lines))
+        if not self.test_mode:
+            header = f"🔭 {len(ranked)} وضعیت برتر از {len(fetched)} بازار ({timeframe})\n\n"
+            if not self.telegram_bot.send_message(header + "\n".join(lines)):
+                print("❌ ارسال فهرست اسکن ناموفق بود")
+        return ranked
+    
+    def run(self):
+        """اجرای اصلی ربات"""
+        print("\n" + "="*60)
+        print("🚀 شروع اجرای CoinEx Signal Bot")
+        print("="*60)
+        
+        start_time = time.time()
+        performance_monitor.start_monitoring()
+        with performance_monitor.stage('restore_state'):
+            self.restore_state()
+        total_signals = self.run_cycle(TIMEFRAME)['signals_sent']
+        with performance_monitor.stage('save_state'):
+            self.save_state()
+        if self.pipeline is not None:
+            self.pipeline.close()
+        performance_monitor.log_performance_report()
         
         # گزارش نهایی
         execution_time = time.time() - start_time
@@ -175,10 +567,81 @@ class CoinExSignalBot:
         print(f"✅ تعداد سیگنال‌های ارسال شده: {total_signals}")
         print(f"⏱️ زمان اجرا: {execution_time:.2f} ثانیه")
         print(f"🧪 حالت تست: {'فعال' if self.test_mode else 'غیرفعال'}")
+        print(f"💾 حافظه پنجره‌های کندل: {self.state.nbytes() / 1024:.1f} KB ({self.strategy.dtype.name})")
+        if self.strategy.lazy:
+            stats = self.strategy.condition_stats
+            print(f"🪶 شرط‌های ارزیابی شده: {stats['evaluated']} برای {stats['symbols']} نماد")
+        print(f"🚦 کنترل درخواست‌ها: {self.coinex_api.get_governor_metrics()}")
+        hedge_metrics = self.coinex_api.get_hedge_metrics()
+        if hedge_metrics is not None:
+            print(f"🪝 hedging: {hedge_metrics}")
         print("="*60)
         
         return total_signals
 
+def get_cli_option(name, default=None):
+    """خواندن مقدار یک آرگومان خط فرمان (مثلا --speed 100)"""
+    if name not in sys.argv:
+        return default
+    index = sys.argv.index(name)
+    if index + 1 < len(sys.argv) and not sys.argv[index + 1].startswith('--'):
+        return sys.argv[index + 1]
+    return default
+
+def run_replay():
+    """اجرای ربات روی داده‌های ضبط شده و گزارش تاخیر"""
+    from services.replay_service import ReplayService
+    from config.config import REPLAY_DATA_DIR
+
+    data_dir = get_cli_option('--replay', REPLAY_DATA_DIR)
+    speed = get_cli_option('--speed', 'max')
+    speed = None if speed == 'max' else float(speed)
+
+    replay = ReplayService(data_dir=data_dir, speed=speed)
+    bot = CoinExSignalBot(coinex_api=replay.api, telegram_bot=replay.telegram_bot)
+    report = replay.run(bot)
+    path = replay.save_report(report)
+
+    print("\n" + "="*60)
+    print("⏪ گزارش بازپخش")
+    print("="*60)
+    print(f"🕯️ کندل‌های پردازش شده: {report['candles_processed']}")
+    print(f"📈 سیگنال‌های تولید شده: {report['signals_emitted']}")
+    print(f"⏱️ تاخیر کندل (ms): {report['candle_latency_ms']}")
+    print(f"📤 تاخیر ارسال سیگنال (ms): {report['emission_latency_ms']}")
+    print(f"🔑 digest: {report['digest']}")
+    print(f"💾 گزارش: {path}")
+    print("="*60)
+    return report['signals_emitted']
+
+def run_scan(test_mode=False):
+    """یک چرخه اسکنر بازار و گزارش هرس شرط‌ها"""
+    from services.market_scanner import MarketScanner
+
+    bot = CoinExSignalBot(test_mode=test_mode)
+    scanner = MarketScanner()
+    performance_monitor.start_monitoring()
+    ranked = bot.scan_markets(scanner)
+    performance_monitor.log_performance_report()
+    print(f"✂️ اسکنر: {dict(scanner.stats)}")
+    return len(ranked)
+
+def run_scheduler(test_mode=False, use_pipeline=PIPELINE_ENABLED):
+    """اجرای دائمی ربات هم‌تراز با بسته شدن کندل‌ها"""
+    from services.scheduler import CandleScheduler
+
+    cycles = get_cli_option('--cycles')
+    bot = CoinExSignalBot(test_mode=test_mode, use_pipeline=use_pipeline)
+    scheduler = CandleScheduler(bot)
+    performance_monitor.start_monitoring()
+    try:
+        scheduler.run_forever(max_cycles=int(cycles) if cycles else None)
+    finally:
+        if bot.pipeline is not None:
+            bot.pipeline.close()
+        performance_monitor.log_performance_report()
+    return scheduler.total_signals
+
 def main():
     """تابع اصلی"""
     print("🤖 CoinEx Signal Bot")
@@ -186,14 +649,30 @@ def main():
     
     # بررسی آرگومان‌های خط فرمان
     test_mode = '--test' in sys.argv or '-t' in sys.argv
+    use_pipeline = '--pipeline' in sys.argv or PIPELINE_ENABLED
     
     if test_mode:
         print("🧪 اجرا در حالت تست (سیگنال‌ها ارسال نمی‌شوند)")
     
+    if '--memory-profile' in sys.argv or MEMORY_PROFILING:
+        # snapshotهای tracemalloc در اطراف هر مرحله (سربار قابل توجه دارد)
+        performance_monitor.enable_memory_profiling()
+        print("🧠 پروفایل حافظه مراحل فعال شد")
+    
     try:
-        # ایجاد و اجرای ربات
-        bot = CoinExSignalBot(test_mode=test_mode)
-        signals_sent = bot.run()
+        if '--replay' in sys.argv:
+            # بازپخش داده‌های ضبط شده با API و تلگرام ساختگی
+            signals_sent = run_replay()
+        elif '--scan' in sys.argv:
+            # فهرست K قوی‌ترین وضعیت سیگنال بین همه بازارها
+            signals_sent = run_scan(test_mode=test_mode)
+        elif '--loop' in sys.argv:
+            # اجرای دائمی با زمان‌بندی داخلی و وضعیت گرم
+            signals_sent = run_scheduler(test_mode=test_mode, use_pipeline=use_pipeline)
+        else:
+            # ایجاد و اجرای ربات
+            bot = CoinExSignalBot(test_mode=test_mode, use_pipeline=use_pipeline)
+            signals_sent = bot.run()
         
         if signals_sent > 0:
             print(f"🎉 اجرا با موفقیت завер شد. {signals_sent} سیگنال ارسال شد.")
@@ -4,13 +4,25 @@ import hmac
 import time
 import json
 from urllib.parse import urlencode
-from config.config import COINEX_ACCESS_ID, COINEX_SECRET_KEY, COINEX_BASE_URL
+from config.config import COINEX_ACCESS_ID, COINEX_SECRET_KEY, COINEX_BASE_URL, HEDGE_KLINE_REQUESTS
+from services.kline_decoder import decode_klines
+from utils.dtype_policy import STORAGE_DTYPE
+from services.request_governor import RequestGovernor, CircuitOpenError
+from services.request_hedger import RequestHedger
+from concurrent.futures import ThreadPoolExecutor
 
 class CoinExAPI:
     def __init__(self):
         self.access_id = COINEX_ACCESS_ID
         self.secret_key = COINEX_SECRET_KEY
         self.base_url = COINEX_BASE_URL
+        # نشست HTTP پایدار؛ پس از warm_up اتصال‌ها بین درخواست‌ها باز می‌مانند
+        self.session = None
+        self.timeout = 10
+        # کنترل همزمانی تطبیقی و قطع‌کننده مدار برای همه درخواست‌ها
+        self.governor = RequestGovernor()
+        # hedging اختیاری درخواست‌های کندل (None یعنی غیرفعال)
+        self.hedger = RequestHedger() if HEDGE_KLINE_REQUESTS else None
         
     def _generate_signature(self, params):
         params_sorted = sorted(params.items())
@@ -22,6 +34,56 @@ class CoinExAPI:
         ).hexdigest()
         return signature
     
+    def _get(self, endpoint, params):
+        """ارسال GET از طریق governor؛ None وقتی مدار باز است"""
+        url = f"{self.base_url}{endpoint}"
+        try:
+            token = self.governor.acquire()
+        except CircuitOpenError as e:
+            print(f"⛔ {e} - درخواست {endpoint} ارسال نشد")
+            return None
+        
+        try:
+            if self.session is not None:
+                response = self.session.get(url, params=params, timeout=self.timeout)
+            else:
+                response = requests.get(url, params=params, timeout=self.timeout)
+        except Exception:
+            self.governor.release(token, RequestGovernor.FAILURE)
+            raise
+        
+        self.governor.release(token, RequestGovernor.classify(response.status_code))
+        return response
+    
+    def _get_hedged(self, endpoint, params):
+        """GET با hedging در صورت فعال بودن؛ اولین پاسخ 200 برنده است"""
+        if self.hedger is None:
+            return self._get(endpoint, params)
+        return self.hedger.execute(
+            endpoint,
+            lambda: self._get(endpoint, params),
+            lambda response: response is not None and response.status_code == 200
+        )
+    
+    def get_hedge_metrics(self):
+        """نرخ hedge و صرفه‌جویی تاخیر (None وقتی غیرفعال است)"""
+        return self.hedger.metrics() if self.hedger is not None else None
+    
+    def get_governor_metrics(self):
+        """وضعیت همزمانی و مدار درخواست‌ها"""
+        return self.governor.metrics()
+    
+    def warm_up(self, symbol='BTCUSDT'):
+        """باز کردن اتصال پایدار (TCP/TLS) قبل از زمان دریافت داده"""
+        if self.session is None:
+            self.session = requests.Session()
+        try:
+            response = self._get('/market/ticker', {'market': symbol})
+            return response is not None and response.status_code == 200
+        except requests.RequestException as e:
+            print(f"Error warming up CoinEx connection: {e}")
+            return False
+    
     def get_market_data(self, symbol, type='kline', limit=100, timeframe='15min'):
         endpoint = '/market/kline'
         params = {
@@ -30,10 +92,95 @@ class CoinExAPI:
             'limit': limit
         }
         
-        url = f"{self.base_url}{endpoint}"
-        response = requests.get(url, params=params)
+        response = self._get_hedged(endpoint, params)
         
-        if response.status_code == 200:
+        if response is not None and response.status_code == 200:
+            data = response.json()
+            if data['code'] == 0:
+                return data['data']
+        return None
+    
+    def get_kline_payload(self, symbol, limit=100, timeframe='15min'):
+        """بایت‌های خام پاسخ /market/kline بدون پارس JSON"""
+        endpoint = '/market/kline'
+        params = {
+            'market': symbol,
+            'type': timeframe,
+            'limit': limit
+        }
+        
+        response = self._get_hedged(endpoint, params)
+        
+        if response is not None and response.status_code == 200:
+            return response.content
+        return None
+    
+    def get_klines(self, symbol, limit=100, timeframe='15min'):
+        """دریافت کندل‌ها و دیکود مستقیم به آرایه‌های numpy (OHLCV)"""
+        payload = self.get_kline_payload(symbol, limit, timeframe)
+        if payload is None:
+            return None
+        return decode_klines(payload, STORAGE_DTYPE)
+    
+    def get_klines_many(self, requests_by_symbol, timeframe='15min', max_workers=None):
+        """دریافت همزمان کندل‌های چند نماد؛ همزمانی واقعی را governor تنظیم می‌کند"""
+        max_workers = max_workers or self.governor.max_limit
+        results = {}
+        
+        def fetch(item):
+            symbol, limit = item
+            try:
+                return symbol, self.get_klines(symbol, limit, timeframe)
+            except Exception as e:
+                print(f"Error fetching klines for {symbol}: {e}")
+                return symbol, None
+        
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            for symbol, candles in executor.map(fetch, requests_by_symbol.items()):
+                results[symbol] = candles
+        return results
+    
+    def get_depth(self, symbol, limit=20, merge='0'):
+        """دفتر سفارش (bids/asks به صورت [قیمت، مقدار]) از /market/depth"""
+        endpoint = '/market/depth'
+        params = {
+            'market': symbol,
+            'merge': merge,
+            'limit': limit
+        }
+        
+        response = self._get(endpoint, params)
+        
+        if response is not None and response.status_code == 200:
+            data = response.json()
+            if data['code'] == 0:
+                return data['data']
+        return None
+    
+    def get_deals(self, symbol, last_id=0, limit=100):
+        """معاملات اخیر بازار از /market/deals؛ با last_id فقط معاملات جدیدتر"""
+        endpoint = '/market/deals'
+        params = {
+            'market': symbol,
+            'last_id': last_id,
+            'limit': limit
+        }
+        
+        response = self._get(endpoint, params)
+        
+        if response is not None and response.status_code == 200:
+            data = response.json()
+            if data['code'] == 0:
+                return data['data']
+        return None
+    
+    def get_market_list(self):
+        """نام همه بازارهای قابل معامله از /market/list"""
+        endpoint = '/market/list'
+        
+        response = self._get(endpoint, {})
+        
+        if response is not None and response.status_code == 200:
             data = response.json()
             if data['code'] == 0:
                 return data['data']
@@ -43,10 +190,9 @@ class CoinExAPI:
         endpoint = '/market/ticker'
         params = {'market': symbol}
         
-        url = f"{self.base_url}{endpoint}"
-        response = requests.get(url, params=params)
+        response = self._get(endpoint, params)
         
-        if response.status_code == 200:
+        if response is not None and response.status_code == 200:
             data = response.json()
             if data['code'] == 0:
                 return float(data['data']['ticker']['last'])
@@ -0,0 +1,180 @@
+import logging
+
+import numpy as np
+
+from config.config import (
+    CORRELATION_HALFLIFE_CANDLES, CORRELATION_THRESHOLD, CORRELATION_MIN_OBSERVATIONS
+)
+
+logger = logging.getLogger(__name__)
+
+class CorrelationService:
+    """ماتریس کوواریانس نمایی بازده نمادها با به‌روزرسانی افزایشی در هر کندل
+
+    هر کندل جدید فقط یک به‌روزرسانی رتبه یک O(N²) دارد و محاسبه دوباره کل
+    پنجره (O(N²·T)) لازم نیست. نمادی که در این کندل بازده ندارد فقط میرا می‌شود.
+    """
+
+    def __init__(self, halflife=CORRELATION_HALFLIFE_CANDLES, threshold=CORRELATION_THRESHOLD,
+                 min_observations=CORRELATION_MIN_OBSERVATIONS, capacity=64):
+        self.alpha = 1 - 0.5 ** (1 / halflife)
+        self.threshold = threshold
+        self.min_observations = min_observations
+        self.index = {}
+        self.symbols = []
+        self.mean = np.zeros(capacity)
+        self.cov = np.zeros((capacity, capacity))
+        self.observations = np.zeros(capacity, dtype=np.int64)
+        # آخرین کندل بسته شده هر نماد: (زمان، قیمت بسته شدن)
+        self.last = {}
+        self.pending = {}
+        self.updates = 0
+
+    def __len__(self):
+        return len(self.symbols)
+
+    def _slot(self, symbol):
+        slot = self.index.get(symbol)
+        if slot is not None:
+            return slot
+        slot = len(self.symbols)
+        if slot == len(self.mean):
+            # دو برابر کردن ظرفیت؛ هزینه سرشکن برای اضافه شدن نمادها
+            capacity = 2 * len(self.mean)
+            self.mean = np.resize(self.mean, capacity)
+            self.mean[slot:] = 0
+            cov = np.zeros((capacity, capacity))
+            cov[:slot, :slot] = self.cov[:slot, :slot]
+            self.cov = cov
+            observations = np.zeros(capacity, dtype=np.int64)
+            observations[:slot] = self.observations[:slot]
+            self.observations = observations
+        self.index[symbol] = slot
+        self.symbols.append(symbol)
+        return slot
+
+    def _update(self, returns):
+        """به‌روزرسانی نمایی میانگین و کوواریانس با بردار بازده (nan = بدون داده)"""
+        n = len(self.symbols)
+        present = ~np.isnan(returns)
+        if not present.any():
+            return
+        diff = np.where(present, returns - self.mean[:n], 0.0)
+        a = self.alpha
+        self.mean[:n] += a * diff
+        cov = self.cov[:n, :n]
+        cov *= 1 - a
+        cov += np.outer(diff * (a * (1 - a)), diff)
+        self.observations[:n] += present
+        self.updates += 1
+
+    def observe(self, symbol, candle_time, close):
+        """ثبت قیمت بسته شدن آخرین کندل بسته شده نماد برای commit بعدی"""
+        self.pending[symbol] = (candle_time, close)
+
+    def commit(self):
+        """اعمال بازده‌های ثبت شده این کندل در یک به‌روزرسانی"""
+        returns = {}
+        for symbol, (candle_time, close) in self.pending.items():
+            previous = self.last.get(symbol)
+            if previous is not None and candle_time > previous[0] and previous[1] > 0 and close > 0:
+                returns[self._slot(symbol)] = np.log(close / previous[1])
+            if previous is None or candle_time > previous[0]:
+                self.last[symbol] = (candle_time, close)
+                self._slot(symbol)
+        self.pending = {}
+
+        if returns:
+            vector = np.full(len(self.symbols), np.nan)
+            for slot, value in returns.items():
+                vector[slot] = value
+            self._update(vector)
+        return len(returns)
+
+    def seed(self, closes):
+        """ساخت اولیه از پنجره قیمت‌ها (DataFrame با ستون هر نماد و ایندکس زمانی)"""
+        closes = closes.sort_index()
+        returns = np.log(closes / closes.shift(1)).iloc[1:]
+        slots = [self._slot(symbol) for symbol in closes.columns]
+        n = len(self.symbols)
+        for row in returns.to_numpy():
+            vector = np.full(n, np.nan)
+            vector[slots] = row
+            self._update(vector)
+
+        for symbol in closes.columns:
+            column = closes[symbol].dropna()
+            if len(column):
+                self.last[symbol] = (int(column.index[-1].timestamp()), float(column.iloc[-1]))
+
+    def correlation(self, symbols):
+        """زیرماتریس همبستگی نمادها (O(k²))؛ نماد با داده ناکافی همبستگی صفر دارد"""
+        slots = np.array([self.index.get(symbol, -1) for symbol in symbols])
+        known = slots >= 0
+        k = len(symbols)
+        corr = np.eye(k)
+        if known.sum() < 2:
+            return corr
+
+        idx = slots[known]
+        sub = self.cov[np.ix_(idx, idx)]
+        std = np.sqrt(np.diag(sub))
+        valid = (std > 0) & (self.observations[idx] >= self.min_observations)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            block = sub / np.outer(std, std)
+        block[~valid, :] = 0
+        block[:, ~valid] = 0
+        np.fill_diagonal(block, 1.0)
+        positions = np.flatnonzero(known)
+        corr[np.ix_(positions, positions)] = block
+        return corr
+
+    def decluster(self, signals_by_symbol):
+        """گروه‌بندی سیگنال‌های هم‌جهت نمادهای همبسته و نگه داشتن یک سیگنال از هر گروه
+
+        خروجی: (سیگنال‌های نگه داشته شده به تفکیک نماد،
+        لیست (نماد، سیگنال، نماد رهبر، سیگنال رهبر) حذف شده)
+        """
+        kept = {symbol: [] for symbol in signals_by_symbol}
+        suppressed = []
+
+        for direction in ('BUY', 'SELL'):
+            entries = [
+                (symbol, signal)
+                for symbol, signals in signals_by_symbol.items()
+                for signal in signals if signal['type'] == direction
+            ]
+            if not entries:
+                continue
+
+            symbols = [symbol for symbol, _ in entries]
+            corr = self.correlation(symbols)
+            parent = list(range(len(entries)))
+
+            def find(i):
+                while parent[i] != i:
+                    parent[i] = parent[parent[i]]
+                    i = parent[i]
+                return i
+
+            rows, cols = np.nonzero(np.triu(corr >= self.threshold, k=1))
+            for i, j in zip(rows, cols):
+                parent[find(i)] = find(j)
+
+            clusters = {}
+            for i in range(len(entries)):
+                clusters.setdefault(find(i), []).append(i)
+
+            for members in clusters.values():
+                # رهبر گروه: بیشترین اطمینان؛ در تساوی، اولین نماد به ترتیب ورودی
+                leader = max(members, key=lambda i: (entries[i][1].get('confidence', 0), -i))
+                leader_symbol, leader_signal = entries[leader]
+                leader_signal['cluster_size'] = len(members)
+                kept[leader_symbol].append(leader_signal)
+                for i in members:
+                    if i != leader:
+                        symbol, signal = entries[i]
+                        signal['cluster_leader'] = leader_symbol
+                        suppressed.append((symbol, signal, leader_symbol, leader_signal))
+
+        return kept, suppressed
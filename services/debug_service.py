@@ -0,0 +1,335 @@
+import cProfile
+import io
+import json
+import pstats
+import pandas as pd
+import numpy as np
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+import traceback
+import os
+from config.config import SYMBOLS, TIMEFRAME
+from config.config import DEBUG_PROFILER, DEBUG_SAMPLE_INTERVAL_SECONDS, DEBUG_PROFILE_LIMIT
+from services.coinex_api import CoinExAPI
+from services.kline_decoder import decode_klines
+from services.telegram_bot import TelegramBot
+from strategies.mutanabby_strategy import MutanabbyStrategy
+from utils.performance_monitor import PerformanceMonitor
+from utils.sampling_profiler import SamplingProfiler
+
+PIPELINE_STAGES = ('fetch', 'parse', 'indicators', 'signals', 'format')
+PROFILERS = ('cprofile', 'sampling', 'both')
+
+def _profile_worker(symbol, profiler, output_dir, repeat):
+    """اجرای پروفایل یک نماد در پروسس جداگانه (حالت --comprehensive)"""
+    service = DebugService()
+    return service.profile_symbol(symbol, profiler=profiler, output_dir=output_dir, repeat=repeat)
+
+class DebugService:
+    def __init__(self, coinex_api=None, debug_dir="debug"):
+        self.debug_dir = debug_dir
+        self.reports_dir = f"{self.debug_dir}/debug_reports"
+        self.historical_dir = f"{self.debug_dir}/historical_signals"
+        self.profiles_dir = f"{self.debug_dir}/profiles"
+        os.makedirs(self.reports_dir, exist_ok=True)
+        os.makedirs(self.historical_dir, exist_ok=True)
+        os.makedirs(self.profiles_dir, exist_ok=True)
+        
+        self.coinex_api = coinex_api or CoinExAPI()
+        self.strategy = MutanabbyStrategy()
+        self.telegram_bot = TelegramBot()
+        self.monitor = PerformanceMonitor()
+        # مرحله فعلی pipeline؛ ریشه پشته‌های پروفایلر نمونه‌بردار
+        self.current_stage = None
+    
+    @contextmanager
+    def _stage(self, name, symbol):
+        self.current_stage = name
+        try:
+            with self.monitor.stage(name, symbol):
+                yield
+        finally:
+            self.current_stage = None
+    
+    def run_pipeline(self, symbol, limit=DEBUG_PROFILE_LIMIT, timeframe=TIMEFRAME):
+        """اجرای مرحله به مرحله مسیر سیگنال: دریافت، پارس، اندیکاتور، تحلیل و قالب‌بندی"""
+        with self._stage('fetch', symbol):
+            payload = self.coinex_api.get_kline_payload(symbol, limit, timeframe)
+        if payload is None:
+            raise ValueError("No data")
+        
+        with self._stage('parse', symbol):
+            candles = decode_klines(payload)
+            if not candles:
+                raise ValueError("Invalid kline payload")
+            df = candles.to_dataframe()
+        
+        with self._stage('indicators', symbol):
+            prepared = self.strategy.prepare_dataframe(df)
+            if prepared is None:
+                raise ValueError("Invalid market data")
+            indicators = self.strategy.calculate_indicators(prepared)
+        
+        with self._stage('signals', symbol):
+            signals = self.strategy.analyze_signals(indicators)
+        
+        with self._stage('format', symbol):
+            messages = [
+                self.telegram_bot.format_signal_message(**self.telegram_bot.signal_fields(signal, symbol))
+                for signal in signals
+            ]
+        
+        return df, signals, messages
+    
+    def new_profile_dir(self):
+        path = f"{self.profiles_dir}/{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        os.makedirs(path, exist_ok=True)
+        return path
+    
+    def profile_symbol(self, symbol, profiler=DEBUG_PROFILER, output_dir=None, repeat=1):
+        """اجرای pipeline یک نماد زیر cProfile و/یا پروفایلر نمونه‌بردار"""
+        if profiler not in PROFILERS:
+            raise ValueError(f"Unknown profiler: {profiler}")
+        output_dir = output_dir or self.new_profile_dir()
+        self.monitor.start_monitoring()
+        
+        profile = cProfile.Profile() if profiler in ('cprofile', 'both') else None
+        sampler = SamplingProfiler(
+            DEBUG_SAMPLE_INTERVAL_SECONDS, label=lambda: self.current_stage or 'other'
+        ) if profiler in ('sampling', 'both') else None
+        
+        try:
+            if sampler is not None:
+                sampler.start()
+            if profile is not None:
+                profile.enable()
+            try:
+                for _ in range(repeat):
+                    df, signals, messages = self.run_pipeline(symbol)
+            finally:
+                if profile is not None:
+                    profile.disable()
+                if sampler is not None:
+                    sampler.stop()
+            
+            result = {
+                "status": "success",
+                "data_points": len(df),
+                "signals_found": len(signals),
+                "messages_formatted": len(messages),
+            }
+            report = self.generate_debug_report(df, signals, symbol)
+            result["report_generated"] = "error" not in report
+            
+        except Exception as e:
+            result = {
+                "status": "failed",
+                "error": str(e),
+                "traceback": traceback.format_exc()
+            }
+        
+        stages = self.monitor.get_performance_report()['stages']
+        result["stages"] = {
+            name: round(stages[name]['total_seconds'], 6) for name in PIPELINE_STAGES if name in stages
+        }
+        result["files"] = self._write_profiles(symbol, output_dir, profile, sampler)
+        result["top_functions"] = self._top_functions(profile, sampler)
+        return result
+    
+    def _write_profiles(self, symbol, output_dir, profile, sampler):
+        """ذخیره آمار قابل مرتب‌سازی (pstats) و پشته‌های collapsed"""
+        files = {}
+        if profile is not None:
+            files['pstats'] = f"{output_dir}/{symbol}.prof"
+            profile.dump_stats(files['pstats'])
+            files['stats_text'] = self._write_stats_text(pstats.Stats(profile), f"{output_dir}/{symbol}_stats.txt")
+        if sampler is not None:
+            files['collapsed'] = sampler.write_collapsed(f"{output_dir}/{symbol}.collapsed")
+        return files
+    
+    @staticmethod
+    def _write_stats_text(stats, path, limit=40):
+        stream = io.StringIO()
+        stats.stream = stream
+        stats.sort_stats('cumulative').print_stats(limit)
+        stats.sort_stats('tottime').print_stats(limit)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(stream.getvalue())
+        return path
+    
+    @staticmethod
+    def _top_functions(profile, sampler, limit=10):
+        """پرهزینه‌ترین توابع بر اساس زمان اختصاصی"""
+        if profile is not None:
+            stats = pstats.Stats(profile).stats
+            ranked = sorted(stats.items(), key=lambda item: item[1][2], reverse=True)[:limit]
+            return [
+                {"function": f"{func} ({os.path.basename(filename)}:{line})", "tottime": round(tt, 6), "calls": nc}
+                for (filename, line, func), (cc, nc, tt, ct, callers) in ranked
+            ]
+        if sampler is not None:
+            total = sampler.total_samples() or 1
+            return [
+                {"function": name, "samples": count, "share": round(count / total, 4)}
+                for name, count in sampler.top_functions(limit)
+            ]
+        return []
+    
+    def merge_profiles(self, results, output_dir):
+        """ادغام پروفایل همه نمادها در یک فایل pstats و یک فایل collapsed"""
+        merged = {}
+        prof_files = [r['files']['pstats'] for r in results.values() if 'pstats' in r.get('files', {})]
+        if prof_files:
+            stats = pstats.Stats(*prof_files)
+            merged['pstats'] = f"{output_dir}/combined.prof"
+            stats.dump_stats(merged['pstats'])
+            merged['stats_text'] = self._write_stats_text(stats, f"{output_dir}/combined_stats.txt")
+        
+        collapsed = Counter()
+        for r in results.values():
+            path = r.get('files', {}).get('collapsed')
+            if not path:
+                continue
+            with open(path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    stack, _, count = line.rstrip('\n').rpartition(' ')
+                    collapsed[stack] += int(count)
+        if collapsed:
+            merged['collapsed'] = f"{output_dir}/combined.collapsed"
+            with open(merged['collapsed'], 'w', encoding='utf-8') as f:
+                for stack, count in sorted(collapsed.items()):
+                    f.write(f"{stack} {count}\n")
+        return merged
+    
+    def generate_debug_report(self, data, signals, symbol):
+        """ایجاد گزارش دیباگ کامل"""
+        try:
+            report = {
+                "timestamp": datetime.now().isoformat(),
+                "symbol": symbol,
+                "data_points": len(data),
+                "signals_found": len(signals),
+                "latest_price": data['close'].iloc[-1] if len(data) > 0 else None,
+                "indicators": self._calculate_indicators(data),
+                "signal_details": signals,
+                "data_sample": self._get_data_sample(data),
+                "strategy_parameters": self._get_strategy_params()
+            }
+            
+            # ذخیره گزارش
+            filename = f"{self.reports_dir}/debug_report_{symbol}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+            with open(filename, 'w', encoding='utf-8') as f:
+                json.dump(report, f, indent=2, ensure_ascii=False, default=str)
+            
+            return report
+            
+        except Exception as e:
+            error_msg = f"Error generating debug report: {str(e)}\n{traceback.format_exc()}"
+            print(error_msg)
+            return {"error": error_msg}
+    
+    def _calculate_indicators(self, data):
+        """محاسبه همه اندیکاتورها برای دیباگ"""
+        if len(data) < 50:
+            return {"error": "Insufficient data"}
+        
+        try:
+            # محاسبه EMAها
+            ema_20 = data['close'].ewm(span=20).mean().iloc[-1]
+            ema_50 = data['close'].ewm(span=50).mean().iloc[-1]
+            ema_150 = data['close'].ewm(span=150).mean().iloc[-1]
+            ema_200 = data['close'].ewm(span=200).mean().iloc[-1]
+            
+            # محاسبه RSI
+            delta = data['close'].diff()
+            gain = (delta.where(delta > 0, 0)).rolling(window=14).mean()
+            loss = (-delta.where(delta < 0, 0)).rolling(window=14).mean()
+            rs = gain / loss
+            rsi = 100 - (100 / (1 + rs)).iloc[-1]
+            
+            # محاسبه حجم میانگین
+            avg_volume = data['volume'].rolling(window=20).mean().iloc[-1]
+            current_volume = data['volume'].iloc[-1]
+            
+            return {
+                "ema_20": round(ema_20, 4),
+                "ema_50": round(ema_50, 4),
+                "ema_150": round(ema_150, 4),
+                "ema_200": round(ema_200, 4),
+                "rsi": round(rsi, 2),
+                "volume_ratio": round(current_volume / avg_volume, 2) if avg_volume > 0 else 0,
+                "price_change_24h": self._calculate_price_change(data)
+            }
+            
+        except Exception as e:
+            return {"error": f"Indicator calculation failed: {str(e)}"}
+    
+    def _calculate_price_change(self, data):
+        """محاسبه تغییرات قیمت"""
+        if len(data) >= 96:  # 24 ساعت با داده 15 دقیقه‌ای
+            return round((data['close'].iloc[-1] / data['close'].iloc[-96] - 1) * 100, 2)
+        return None
+    
+    def _get_data_sample(self, data):
+        """نمونه‌ای از داده‌ها برای دیباگ"""
+        if len(data) > 10:
+            sample = data.iloc[-10:].copy()
+            return {
+                "timestamps": sample.index.strftime('%Y-%m-%d %H:%M').tolist(),
+                "prices": sample['close'].round(4).tolist(),
+                "volumes": sample['volume'].round(2).tolist()
+            }
+        return {"error": "Not enough data"}
+    
+    def _get_strategy_params(self):
+        """پارامترهای استراتژی"""
+        return {
+            "sensitivity": self.strategy.sensitivity,
+            "signal_tuner": self.strategy.signal_tuner,
+            "stop_loss_multiplier": self.strategy.stop_loss_multiplier,
+            "risk_reward_ratios": self.strategy.risk_reward_ratios
+        }
+    
+    def run_comprehensive_test(self, symbols=None, profiler=DEBUG_PROFILER, parallel=True,
+                               max_workers=None, repeat=1):
+        """اجرای تست جامع و پروفایل روی همه نمادها (به صورت موازی در پروسس‌های جدا)"""
+        symbols = list(symbols or SYMBOLS)
+        output_dir = self.new_profile_dir()
+        test_results = {}
+        
+        if parallel and len(symbols) > 1:
+            workers = max_workers or min(len(symbols), os.cpu_count() or 1)
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                futures = {
+                    executor.submit(_profile_worker, symbol, profiler, output_dir, repeat): symbol
+                    for symbol in symbols
+                }
+                for future in as_completed(futures):
+                    symbol = futures[future]
+                    try:
+                        test_results[symbol] = future.result()
+                    except Exception as e:
+                        test_results[symbol] = {
+                            "status": "failed",
+                            "error": str(e),
+                            "traceback": traceback.format_exc()
+                        }
+        else:
+            for symbol in symbols:
+                print(f"Running comprehensive test for {symbol}...")
+                test_results[symbol] = self.profile_symbol(
+                    symbol, profiler=profiler, output_dir=output_dir, repeat=repeat
+                )
+        
+        # ترتیب نتایج مطابق لیست نمادها
+        test_results = {symbol: test_results[symbol] for symbol in symbols}
+        merged = self.merge_profiles(test_results, output_dir)
+        
+        # ذخیره نتایج تست
+        results_file = f"{self.reports_dir}/comprehensive_test_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+        with open(results_file, 'w', encoding='utf-8') as f:
+            json.dump({"results": test_results, "combined_profiles": merged}, f, indent=2, ensure_ascii=False)
+        
+        return test_results
@@ -0,0 +1,173 @@
+import json
+import logging
+import re
+import warnings
+
+import numpy as np
+import pandas as pd
+
+try:
+    import orjson
+except ImportError:  # پارسر سریع اختیاری است
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+OHLCV_COLUMNS = ['open', 'high', 'low', 'close', 'volume']
+KLINE_FIELDS = 1 + len(OHLCV_COLUMNS)
+# ردیف kline نسخه 1 CoinEx: [time, open, close, high, low, volume, amount, market]
+# اندیس فیلد ردیف برای هر ستون OHLCV_COLUMNS
+KLINE_COLUMN_FIELDS = [1, 3, 4, 2, 5]
+
+_CODE_PATTERN = re.compile(rb'"code"\s*:\s*(-?\d+)')
+_DATA_PATTERN = re.compile(rb'"data"\s*:\s*\[\s*(\]?)')
+# کاراکترهایی که بین اعداد کندل‌ها حذف می‌شوند تا فقط «عدد,عدد,...» بماند
+_STRIP_BYTES = b'[]" \t\r\n'
+
+class OHLCV:
+    """کندل‌ها به صورت آرایه‌های ستونی numpy (بدون ستون‌های object)"""
+
+    __slots__ = ('timestamp', 'values')
+
+    def __init__(self, timestamp, values):
+        self.timestamp = timestamp  # int64، ثانیه یونیکس
+        self.values = values        # آرایه (5, n) پیوسته: open, high, low, close, volume
+
+    @classmethod
+    def empty(cls, rows, dtype=np.float64):
+        """آرایه‌های از پیش تخصیص داده شده برای rows کندل"""
+        return cls(np.empty(rows, dtype=np.int64), np.empty((len(OHLCV_COLUMNS), rows), dtype=dtype))
+
+    def __len__(self):
+        return len(self.timestamp)
+
+    @property
+    def open(self):
+        return self.values[0]
+
+    @property
+    def high(self):
+        return self.values[1]
+
+    @property
+    def low(self):
+        return self.values[2]
+
+    @property
+    def close(self):
+        return self.values[3]
+
+    @property
+    def volume(self):
+        return self.values[4]
+
+    def to_dataframe(self):
+        """ساخت DataFrame روی همان حافظه (بدون کپی ستون‌ها)"""
+        df = pd.DataFrame(
+            self.values.T,
+            columns=OHLCV_COLUMNS,
+            index=pd.to_datetime(self.timestamp, unit='s'),
+            copy=False
+        )
+        df.index.name = 'timestamp'
+        return df
+
+def decode_klines(payload, dtype=np.float64):
+    """دیکود مستقیم پاسخ خام /market/kline به OHLCV با نوع داده dtype؛ None در صورت خطای API"""
+    if isinstance(payload, str):
+        payload = payload.encode('utf-8')
+
+    code = _CODE_PATTERN.search(payload)
+    if code is None or int(code.group(1)) != 0:
+        return None
+
+    candles = _decode_numeric(payload, dtype)
+    if candles is None:
+        candles = _decode_parsed(payload, dtype)
+    return candles
+
+def _find_data_array(payload):
+    """بازه بایت‌های ردیف‌های آرایه data؛ (0, 0) برای آرایه خالی"""
+    match = _DATA_PATTERN.search(payload)
+    if match is None:
+        return None
+    if match.group(1):
+        return 0, 0
+    start = match.start(1)
+    end = payload.find(b']]', start)
+    if end < 0:
+        return None
+    return start, end + 1
+
+def _strip_market_field(body):
+    """حذف فیلد متنی انتهای ردیف‌ها (نام بازار در پاسخ CoinEx) با یک replace روی کل بایت‌ها
+
+    همه ردیف‌های پاسخ یک بازار همان متن را دارند؛ اگر ردیفی متن دیگری داشته
+    باشد پارس اعداد شکست می‌خورد و مسیر عمومی استفاده می‌شود.
+    """
+    first_row = body[:body.find(b']')]
+    separator = first_row.rfind(b',')
+    field = first_row[separator + 1:].strip()
+    if separator < 0 or not field.startswith(b'"'):
+        return body
+    try:
+        float(field.strip(b'"'))
+        return body
+    except ValueError:
+        return body.replace(first_row[separator:], b'')
+
+def _decode_numeric(payload, dtype=np.float64):
+    """مسیر سریع: تبدیل برداری متن اعداد به float بدون ساخت لیست‌های پایتون"""
+    span = _find_data_array(payload)
+    if span is None:
+        return None
+    start, end = span
+    if start == end:
+        return OHLCV.empty(0, dtype)
+
+    body = payload[start:end]
+    rows = body.count(b'[')
+    body = _strip_market_field(body)
+    numbers = body.translate(None, _STRIP_BYTES)
+
+    with warnings.catch_warnings():
+        # متن غیرعددی در فیلدهای کندل باعث هشدار می‌شود: مسیر عمومی استفاده می‌شود
+        warnings.simplefilter('error')
+        try:
+            flat = np.fromstring(numbers, dtype=np.float64, sep=',')
+        except (ValueError, DeprecationWarning):
+            return None
+
+    if rows == 0 or flat.size % rows != 0 or flat.size // rows < KLINE_FIELDS:
+        return None
+
+    # متن همیشه به float64 پارس می‌شود و فقط ذخیره در dtype انجام می‌شود
+    table = flat.reshape(rows, flat.size // rows)
+    candles = OHLCV.empty(rows, dtype)
+    candles.timestamp[:] = table[:, 0]
+    candles.values[:] = table[:, KLINE_COLUMN_FIELDS].T
+    return candles
+
+def _decode_parsed(payload, dtype=np.float64):
+    """مسیر عمومی: پارس JSON (orjson در صورت وجود) و تبدیل برداری رشته به عدد"""
+    try:
+        data = orjson.loads(payload) if orjson is not None else json.loads(payload)
+    except ValueError as e:
+        logger.error(f"پاسخ کندل قابل پارس نیست: {e}")
+        return None
+
+    rows = data.get('data') if isinstance(data, dict) else None
+    if not isinstance(rows, list):
+        return None
+    if not rows:
+        return OHLCV.empty(0, dtype)
+
+    try:
+        table = np.array([row[:KLINE_FIELDS] for row in rows], dtype=object)
+        candles = OHLCV.empty(len(rows), dtype)
+        candles.timestamp[:] = table[:, 0].astype(np.float64)
+        candles.values[:] = table[:, KLINE_COLUMN_FIELDS].astype(np.float64).T
+    except (ValueError, TypeError, IndexError) as e:
+        logger.error(f"ساختار کندل‌ها نامعتبر است: {e}")
+        return None
+    return candles
@@ -0,0 +1,141 @@
+import heapq
+import logging
+import time
+from collections import Counter
+
+import numpy as np
+
+from config.config import SCANNER_TOP_K
+from strategies.lazy_conditions import LastBarIndicators, CONDITIONS
+from utils.dtype_policy import STORAGE_DTYPE
+
+logger = logging.getLogger(__name__)
+
+SIDES = ('BUY', 'SELL')
+
+class _Entry:
+    """عضو هیپ؛ ضعیف‌تر یعنی امتیاز کمتر و در امتیاز برابر نام بزرگ‌تر (رتبه‌بندی قطعی)"""
+
+    __slots__ = ('score', 'symbol', 'side', 'votes', 'close')
+
+    def __init__(self, score, symbol, side, votes, close):
+        self.score = score
+        self.symbol = symbol
+        self.side = side
+        self.votes = votes
+        self.close = close
+
+    def __lt__(self, other):
+        return self.score < other.score or (self.score == other.score and self.symbol > other.symbol)
+
+class MarketScanner:
+    """K قوی‌ترین وضعیت سیگنال بین همه بازارها با هیپ محدود و ارزیابی ناقص
+
+    امتیاز هر سمت جمع امتیاز پیوسته شرط‌های analyze_signals است (هر شرط بین
+    0 و 1). شرط‌ها به ترتیب هزینه ارزیابی می‌شوند و پس از هر شرط سقف امتیاز
+    (امتیاز فعلی + یک برای هر شرط باقیمانده) با کمترین امتیاز هیپ مقایسه
+    می‌شود؛ نمادی که حتی با این سقف وارد هیپ نمی‌شود بدون محاسبه اندیکاتورهای
+    گران (MACD روی کل پنجره) کنار گذاشته می‌شود.
+    """
+
+    def __init__(self, top_k=SCANNER_TOP_K, conditions=CONDITIONS, dtype=STORAGE_DTYPE, clock=time.monotonic):
+        self.top_k = top_k
+        self.conditions = conditions
+        self.dtype = dtype
+        self.clock = clock
+        # امتیاز (یا سقف امتیاز) چرخه قبل برای ترتیب اسکن؛ هیپ زودتر با نمادهای قوی پر می‌شود
+        self.last_scores = {}
+        self.stats = Counter()
+
+    def score(self, closes, threshold=-np.inf):
+        """امتیاز بهترین سمت نماد؛ خروجی (امتیاز، سمت، رای) یا (سقف امتیاز، None، 0) اگر رد شده باشد
+
+        ارزیابی سمتی متوقف می‌شود که امتیازش حتی با یک کامل برای هر شرط
+        باقیمانده به threshold نرسد (امتیاز برابر با نام کوچک‌تر هنوز وارد هیپ می‌شود).
+        """
+        indicators = LastBarIndicators(closes, self.dtype)
+        totals = dict.fromkeys(SIDES, 0.0)
+        open_sides = list(SIDES)
+        remaining = len(self.conditions)
+
+        for condition in self.conditions:
+            for side in open_sides:
+                totals[side] += condition.score(side, indicators)
+            remaining -= 1
+            self.stats['conditions'] += len(open_sides)
+            bound = max(totals[side] for side in open_sides) + remaining
+            open_sides = [side for side in open_sides if totals[side] + remaining >= threshold]
+            if not open_sides:
+                return bound, None, 0
+
+        side = max(open_sides, key=lambda name: totals[name])
+        votes = sum(condition.test(side, indicators) for condition in self.conditions)
+        return totals[side], side, votes
+
+    def order(self, symbols):
+        """ترتیب اسکن: نزولی بر اساس امتیاز (یا سقف امتیاز) چرخه قبل"""
+        return sorted(symbols, key=lambda symbol: -self.last_scores.get(symbol, len(self.conditions) / 2))
+
+    def scan(self, windows, deadline=None):
+        """رتبه‌بندی نمادها؛ windows نماد ← قیمت‌های بسته شدن پنجره
+
+        با deadline (زمان clock) نمادهای باقیمانده پس از پایان بودجه زمانی
+        اسکن نمی‌شوند. خروجی فهرست مرتب (نزولی) دیکشنری‌های symbol، type،
+        score، votes و close است.
+        """
+        return self.scan_batches([windows], deadline)
+
+    def scan_batches(self, batches, deadline=None):
+        """رتبه‌بندی دسته‌هایی از پنجره‌ها که به ترتیب می‌رسند (مثلا همزمان با دریافت از API)
+
+        هیپ و آستانه هرس بین دسته‌ها مشترک است و پس از پایان بودجه زمانی دسته
+        بعدی درخواست نمی‌شود، پس دریافت و اسکن هر دو در همان deadline می‌مانند.
+        """
+        heap = []
+        for windows in batches:
+            if not self._scan_batch(heap, windows, deadline):
+                break
+            if deadline is not None and self.clock() >= deadline:
+                logger.warning("بودجه زمانی اسکن تمام شد؛ دسته‌های باقیمانده دریافت نشد")
+                break
+
+        return [
+            {'symbol': entry.symbol, 'type': entry.side, 'score': round(entry.score, 4),
+             'votes': entry.votes, 'close': entry.close}
+            for entry in sorted(heap, reverse=True)
+        ]
+
+    def _scan_batch(self, heap, windows, deadline):
+        """اسکن یک دسته در هیپ؛ False اگر بودجه زمانی وسط دسته تمام شود"""
+        order = self.order(windows)
+        for scanned, symbol in enumerate(order):
+            if deadline is not None and self.clock() >= deadline:
+                self.stats['over_budget'] += len(order) - scanned
+                logger.warning(f"بودجه زمانی اسکن تمام شد؛ {len(order) - scanned} نماد اسکن نشد")
+                return False
+            closes = windows[symbol]
+            threshold = heap[0].score if len(heap) >= self.top_k else -np.inf
+            try:
+                score, side, votes = self.score(closes, threshold)
+            except Exception as e:
+                logger.error(f"خطا در امتیازدهی {symbol}: {e}")
+                continue
+            self.last_scores[symbol] = score
+            if side is None:
+                self.stats['pruned'] += 1
+                continue
+
+            self.stats['scored'] += 1
+            entry = _Entry(score, symbol, side, votes, float(closes[-1]))
+            if len(heap) < self.top_k:
+                heapq.heappush(heap, entry)
+            elif heap[0] < entry:
+                heapq.heapreplace(heap, entry)
+        return True
+
+    @staticmethod
+    def format_line(rank, entry):
+        """یک خط از فهرست رتبه‌بندی شده"""
+        icon = '🟢' if entry['type'] == 'BUY' else '🔴'
+        return (f"{rank}. {icon} {entry['symbol']} {entry['type']} "
+                f"امتیاز {entry['score']:.2f} ({entry['votes']}/{len(CONDITIONS)} شرط) قیمت {entry['close']}")
@@ -0,0 +1,89 @@
+import logging
+
+import pandas as pd
+
+from config.config import CANDLE_WINDOW_SIZE
+from utils.time_utils import timeframe_to_seconds
+from utils.dtype_policy import frame_nbytes
+
+logger = logging.getLogger(__name__)
+
+class SymbolState:
+    """وضعیت گرم یک نماد در یک تایم فریم بین چرخه‌های اجرا"""
+
+    __slots__ = ('window', 'last_candle', 'last_signal_candle', 'last_provisional_candle', 'trailing')
+
+    def __init__(self):
+        self.window = None              # پنجره کندل‌ها (DataFrame با ایندکس زمانی)
+        self.last_candle = None         # زمان باز شدن آخرین کندل دریافتی (ثانیه یونیکس)
+        self.last_signal_candle = None  # آخرین کندلی که برای آن سیگنال ارسال شد
+        self.last_provisional_candle = None  # آخرین کندل در حال تشکیلی که سیگنال موقت آن ارسال شد
+        self.trailing = None            # وضعیت افزایشی حد ضرر متحرک (TrailingState) برای اسنپ‌شات
+
+class MarketState:
+    """نگهداری پنجره کندل‌ها، مکان‌نمای دریافت و وضعیت حذف تکراری برای همه نمادها"""
+
+    def __init__(self, window_size=CANDLE_WINDOW_SIZE):
+        self.window_size = window_size
+        self.symbols = {}
+
+    def get(self, symbol, timeframe):
+        """دریافت (یا ایجاد) وضعیت نماد"""
+        key = (symbol, timeframe)
+        state = self.symbols.get(key)
+        if state is None:
+            state = self.symbols[key] = SymbolState()
+        return state
+
+    def nbytes(self):
+        """حجم پنجره‌های کندل همه نمادها به بایت"""
+        return sum(frame_nbytes(state.window) for state in self.symbols.values())
+
+    def delta_limit(self, symbol, timeframe, limit, now):
+        """تعداد کندل‌هایی که باید دریافت شوند تا پنجره به‌روز شود"""
+        state = self.symbols.get((symbol, timeframe))
+        if state is None or state.window is None or state.last_candle is None:
+            return limit
+
+        # آخرین کندل ممکن است ناقص دریافت شده باشد، پس دوباره گرفته می‌شود
+        missing = int((now - state.last_candle) // timeframe_to_seconds(timeframe)) + 1
+        if missing >= limit:
+            return limit
+        return max(missing, 2)
+
+    def merge(self, symbol, timeframe, df, max_rows=None):
+        """ادغام کندل‌های جدید در پنجره نماد و برگرداندن پنجره به‌روز"""
+        state = self.get(symbol, timeframe)
+        max_rows = max_rows or self.window_size
+
+        if state.window is not None and len(state.window) > 0:
+            combined = pd.concat([state.window, df])
+            combined = combined[~combined.index.duplicated(keep='last')].sort_index()
+        else:
+            combined = df
+
+        combined = combined.iloc[-max_rows:]
+        state.window = combined
+        state.last_candle = int(combined.index[-1].timestamp())
+        return combined
+
+    def is_new_signal_candle(self, symbol, timeframe, candle_time, provisional=False):
+        """بررسی اینکه برای این کندل قبلا سیگنال ارسال نشده باشد
+
+        سیگنال موقت کندل در حال تشکیل جدا ثبت می‌شود تا با بسته شدن کندل سیگنال
+        قطعی همان کندل (تایید سیگنال موقت) حذف نشود؛ پس از سیگنال قطعی سیگنال
+        موقت آن کندل دیگر ارسال نمی‌شود.
+        """
+        state = self.symbols.get((symbol, timeframe))
+        if state is None:
+            return True
+        if state.last_signal_candle == candle_time:
+            return False
+        return not provisional or state.last_provisional_candle != candle_time
+
+    def mark_signal(self, symbol, timeframe, candle_time, provisional=False):
+        """ثبت کندلی که سیگنال آن ارسال شد؛ علامت کندل قدیمی‌تر جدیدترین کندل را عقب نمی‌برد"""
+        state = self.get(symbol, timeframe)
+        field = 'last_provisional_candle' if provisional else 'last_signal_candle'
+        previous = getattr(state, field)
+        setattr(state, field, candle_time if previous is None else max(previous, candle_time))
@@ -0,0 +1,250 @@
+import logging
+
+import numpy as np
+
+from config.config import (
+    ORDER_BOOK_BAND_PCT, ORDER_BOOK_ORDER_NOTIONAL, ORDER_BOOK_MAX_SPREAD_BPS,
+    ORDER_BOOK_MAX_SLIPPAGE_BPS, ORDER_BOOK_MIN_DEPTH_NOTIONAL
+)
+
+logger = logging.getLogger(__name__)
+
+_EMPTY = np.empty(0, dtype=np.float64)
+
+def _levels(rows):
+    """تبدیل [[قیمت، مقدار], ...] (رشته یا عدد) به دو آرایه float64"""
+    if rows is None or len(rows) == 0:
+        return _EMPTY, _EMPTY
+    levels = np.asarray(rows, dtype=np.float64).reshape(-1, 2)
+    return levels[:, 0], levels[:, 1]
+
+class BookSide:
+    """یک سمت دفتر سفارش: سطوح قیمت مرتب از بهترین قیمت با جمع تجمعی تنبل"""
+
+    __slots__ = ('descending', 'prices', 'sizes', '_cum_size', '_cum_notional')
+
+    def __init__(self, descending):
+        # bids نزولی و asks صعودی ذخیره می‌شوند تا اندیس 0 همیشه بهترین قیمت باشد
+        self.descending = descending
+        self.prices = _EMPTY
+        self.sizes = _EMPTY
+        self._cum_size = None
+        self._cum_notional = None
+
+    def __len__(self):
+        return len(self.prices)
+
+    def _sort(self, prices, sizes):
+        order = np.argsort(-prices if self.descending else prices, kind='stable')
+        self.prices = prices[order]
+        self.sizes = sizes[order]
+        self._cum_size = None
+        self._cum_notional = None
+
+    def replace(self, rows):
+        prices, sizes = _levels(rows)
+        keep = sizes > 0
+        self._sort(prices[keep], sizes[keep])
+
+    def _positions(self, prices):
+        """محل هر قیمت در سطوح فعلی با جستجوی دودویی؛ خروجی (اندیس، وجود سطح)"""
+        if self.descending:
+            # جستجو روی نمای معکوس (صعودی) بدون کپی
+            index = len(self.prices) - np.searchsorted(self.prices[::-1], prices, side='right')
+        else:
+            index = np.searchsorted(self.prices, prices, side='left')
+        found = index < len(self.prices)
+        found[found] = self.prices[index[found]] == prices[found]
+        return index, found
+
+    def update(self, rows):
+        """اعمال تغییرات سطوح در آرایه‌های مرتب فعلی؛ مقدار صفر یعنی حذف سطح
+
+        محل هر تغییر با searchsorted پیدا می‌شود: تغییر مقدار درجا، حذف با
+        np.delete و سطح جدید با np.insert در همان محل، بدون مرتب‌سازی دوباره دفتر.
+        """
+        prices, sizes = _levels(rows)
+        if not len(prices):
+            return
+        # در تغییرات تکراری یک قیمت، آخرین مقدار معتبر است (خروجی unique صعودی است)
+        prices, last = np.unique(prices[::-1], return_index=True)
+        sizes = sizes[::-1][last]
+        if self.descending:
+            prices, sizes = prices[::-1], sizes[::-1]
+
+        index, found = self._positions(prices)
+        removed = found & (sizes <= 0)
+        changed = found & ~removed
+        added = ~found & (sizes > 0)
+
+        book_prices, book_sizes = self.prices, self.sizes
+        if removed.any():
+            book_prices = np.delete(book_prices, index[removed])
+            book_sizes = np.delete(book_sizes, index[removed])
+        elif changed.any():
+            book_sizes = book_sizes.copy()
+        if changed.any():
+            # اندیس سطوح تغییر یافته پس از حذف سطوح قبل از آن‌ها جابه‌جا می‌شود
+            shift = np.searchsorted(index[removed], index[changed], side='left')
+            book_sizes[index[changed] - shift] = sizes[changed]
+        if added.any():
+            shift = np.searchsorted(index[removed], index[added], side='left')
+            book_prices = np.insert(book_prices, index[added] - shift, prices[added])
+            book_sizes = np.insert(book_sizes, index[added] - shift, sizes[added])
+
+        self.prices, self.sizes = book_prices, book_sizes
+        self._cum_size = None
+        self._cum_notional = None
+
+    def _cumulative(self):
+        if self._cum_size is None:
+            self._cum_size = np.cumsum(self.sizes)
+            self._cum_notional = np.cumsum(self.prices * self.sizes)
+        return self._cum_size, self._cum_notional
+
+    @property
+    def best(self):
+        return float(self.prices[0]) if len(self.prices) else None
+
+    def notional_between(self, low, high):
+        """ارزش سفارش‌های سطوح با قیمت در بازه [low, high] با دو جستجوی دودویی"""
+        if not len(self.prices):
+            return 0.0
+        _, cum_notional = self._cumulative()
+        if self.descending:
+            start = np.searchsorted(-self.prices, -high, side='left')
+            end = np.searchsorted(-self.prices, -low, side='right')
+        else:
+            start = np.searchsorted(self.prices, low, side='left')
+            end = np.searchsorted(self.prices, high, side='right')
+        if end <= start:
+            return 0.0
+        return float(cum_notional[end - 1] - (cum_notional[start - 1] if start else 0.0))
+
+    def average_price(self, notional):
+        """میانگین قیمت اجرای سفارش با ارزش notional؛ None اگر عمق کافی نباشد"""
+        if not len(self.prices) or notional <= 0:
+            return None
+        cum_size, cum_notional = self._cumulative()
+        index = int(np.searchsorted(cum_notional, notional, side='left'))
+        if index >= len(self.prices):
+            return None
+        filled_notional = cum_notional[index - 1] if index else 0.0
+        filled_size = cum_size[index - 1] if index else 0.0
+        size = filled_size + (notional - filled_notional) / self.prices[index]
+        return float(notional / size)
+
+class OrderBook:
+    """دفتر سفارش فشرده یک نماد؛ به‌روزرسانی افزایشی و پرس‌وجوهای O(log n)"""
+
+    __slots__ = ('symbol', 'bids', 'asks', 'updated_at', 'updates')
+
+    def __init__(self, symbol):
+        self.symbol = symbol
+        self.bids = BookSide(descending=True)
+        self.asks = BookSide(descending=False)
+        self.updated_at = None
+        self.updates = 0
+
+    def apply(self, depth, clean=True):
+        """اعمال پاسخ depth؛ clean=True یعنی snapshot کامل و False یعنی فقط تغییرات
+
+        همان قرارداد پیام depth.update وب‌سوکت CoinEx: [clean, depth].
+        """
+        if clean:
+            self.bids.replace(depth.get('bids'))
+            self.asks.replace(depth.get('asks'))
+        else:
+            self.bids.update(depth.get('bids'))
+            self.asks.update(depth.get('asks'))
+        self.updated_at = depth.get('time', self.updated_at)
+        self.updates += 1
+        return self
+
+    @property
+    def mid(self):
+        if self.bids.best is None or self.asks.best is None:
+            return None
+        return (self.bids.best + self.asks.best) / 2
+
+    def spread_bps(self):
+        mid = self.mid
+        if not mid:
+            return None
+        return (self.asks.best - self.bids.best) / mid * 10000
+
+    def depth_within(self, pct, price=None):
+        """ارزش سفارش‌های هر دو سمت در بازه ±pct درصد از price (پیش‌فرض mid)"""
+        price = price or self.mid
+        if not price:
+            return 0.0
+        low, high = price * (1 - pct / 100), price * (1 + pct / 100)
+        return self.bids.notional_between(low, high) + self.asks.notional_between(low, high)
+
+    def slippage_bps(self, notional, side='BUY'):
+        """لغزش تخمینی سفارش بازار با ارزش notional نسبت به بهترین قیمت"""
+        book_side = self.asks if side == 'BUY' else self.bids
+        average = book_side.average_price(notional)
+        if average is None:
+            return None
+        return abs(average - book_side.best) / book_side.best * 10000
+
+class OrderBookStore:
+    """دفترهای سفارش همه نمادها و فیلتر/حاشیه‌نویسی نقدینگی سیگنال‌ها"""
+
+    def __init__(self, band_pct=ORDER_BOOK_BAND_PCT, order_notional=ORDER_BOOK_ORDER_NOTIONAL,
+                 max_spread_bps=ORDER_BOOK_MAX_SPREAD_BPS, max_slippage_bps=ORDER_BOOK_MAX_SLIPPAGE_BPS,
+                 min_depth_notional=ORDER_BOOK_MIN_DEPTH_NOTIONAL):
+        self.band_pct = band_pct
+        self.order_notional = order_notional
+        self.max_spread_bps = max_spread_bps
+        self.max_slippage_bps = max_slippage_bps
+        self.min_depth_notional = min_depth_notional
+        self.books = {}
+
+    def get(self, symbol):
+        return self.books.get(symbol)
+
+    def apply(self, symbol, depth, clean=True):
+        book = self.books.get(symbol)
+        if book is None:
+            book = self.books[symbol] = OrderBook(symbol)
+        return book.apply(depth, clean)
+
+    def liquidity(self, symbol, signal):
+        """معیارهای نقدینگی سیگنال؛ None اگر دفتر سفارش نماد موجود نباشد"""
+        book = self.books.get(symbol)
+        if book is None or book.mid is None:
+            return None
+        slippage = book.slippage_bps(self.order_notional, signal['type'])
+        return {
+            'spread_bps': round(book.spread_bps(), 2),
+            'depth_notional': round(book.depth_within(self.band_pct, signal['entry']), 2),
+            'slippage_bps': round(slippage, 2) if slippage is not None else None,
+        }
+
+    def is_liquid(self, liquidity):
+        return (
+            liquidity['spread_bps'] <= self.max_spread_bps
+            and liquidity['slippage_bps'] is not None
+            and liquidity['slippage_bps'] <= self.max_slippage_bps
+            and liquidity['depth_notional'] >= self.min_depth_notional
+        )
+
+    def filter_signals(self, signals, symbol):
+        """افزودن معیارهای نقدینگی به سیگنال‌ها و حذف سیگنال‌های کم‌نقدینگی
+
+        سیگنال نمادی که دفتر سفارش ندارد بدون تغییر عبور می‌کند.
+        """
+        accepted = []
+        for signal in signals:
+            liquidity = self.liquidity(symbol, signal)
+            if liquidity is None:
+                accepted.append(signal)
+                continue
+            signal['liquidity'] = liquidity
+            if self.is_liquid(liquidity):
+                accepted.append(signal)
+            else:
+                logger.info(f"سیگنال {signal['type']} {symbol} به دلیل نقدینگی کم حذف شد: {liquidity}")
+        return accepted
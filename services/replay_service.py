@@ -0,0 +1,242 @@
+import glob
+import hashlib
+import json
+import logging
+import os
+import time
+from datetime import datetime
+
+import numpy as np
+
+from config.config import (
+    TIMEFRAME, REPLAY_DATA_DIR, REPLAY_MIN_SPEED, REPLAY_MAX_SPEED, REPLAY_WARMUP_CANDLES
+)
+from services.coinex_api import CoinExAPI
+from services.telegram_bot import TelegramBot
+from utils.time_utils import candle_close_time
+
+logger = logging.getLogger(__name__)
+
+class ReplayCoinExAPI(CoinExAPI):
+    """API جایگزین که کندل‌های ضبط شده را تا مکان‌نمای فعلی هر نماد برمی‌گرداند"""
+
+    def __init__(self, klines):
+        super().__init__()
+        self.klines = klines
+        self.cursors = {}
+        # هر کندل یک بار به JSON تبدیل می‌شود تا پاسخ خام با هزینه ناچیز ساخته شود
+        self.encoded = {
+            symbol: [json.dumps(row, separators=(',', ':')).encode('utf-8') for row in rows]
+            for symbol, rows in klines.items()
+        }
+
+    def set_cursor(self, symbol, end_index):
+        """تنظیم آخرین کندل قابل مشاهده (انحصاری) برای نماد"""
+        self.cursors[symbol] = end_index
+
+    def get_market_data(self, symbol, type='kline', limit=100, timeframe='15min'):
+        rows = self.klines.get(symbol)
+        end = self.cursors.get(symbol, 0)
+        if not rows or end <= 0:
+            return None
+        return rows[max(0, end - limit):end]
+
+    def get_kline_payload(self, symbol, limit=100, timeframe='15min'):
+        rows = self.encoded.get(symbol)
+        end = self.cursors.get(symbol, 0)
+        if not rows or end <= 0:
+            return None
+        return b'{"code":0,"data":[' + b','.join(rows[max(0, end - limit):end]) + b'],"message":"OK"}'
+
+    def get_current_price(self, symbol):
+        rows = self.get_market_data(symbol, limit=1)
+        if not rows:
+            return None
+        return float(rows[-1][2])
+
+class ReplayTelegramBot(TelegramBot):
+    """ربات تلگرام ساختگی که پیام‌ها را به همراه زمان ارسال ثبت می‌کند"""
+
+    def __init__(self):
+        super().__init__()
+        self.sent = []
+
+    def send_message(self, text):
+        self.sent.append((time.perf_counter(), text))
+        return True
+
+class ReplayService:
+    """بازپخش قطعی کندل‌های ضبط شده از مسیر واقعی CoinExSignalBot"""
+
+    def __init__(self, data_dir=REPLAY_DATA_DIR, speed=None, timeframe=TIMEFRAME,
+                 symbols=None, warmup=REPLAY_WARMUP_CANDLES):
+        if speed is not None and not REPLAY_MIN_SPEED <= speed <= REPLAY_MAX_SPEED:
+            raise ValueError(
+                f"سرعت بازپخش باید بین {REPLAY_MIN_SPEED} و {REPLAY_MAX_SPEED} باشد: {speed}"
+            )
+
+        self.data_dir = data_dir
+        self.speed = speed
+        self.timeframe = timeframe
+        self.warmup = warmup
+        self.klines = self.load_recordings(data_dir, symbols)
+        self.api = ReplayCoinExAPI(self.klines)
+        self.telegram_bot = ReplayTelegramBot()
+
+    @staticmethod
+    def load_recordings(data_dir, symbols=None):
+        """خواندن فایل‌های {SYMBOL}.json (پاسخ خام API یا لیست کندل‌ها)"""
+        klines = {}
+        for path in sorted(glob.glob(os.path.join(data_dir, '*.json'))):
+            symbol = os.path.splitext(os.path.basename(path))[0]
+            if symbols is not None and symbol not in symbols:
+                continue
+
+            with open(path, 'r', encoding='utf-8') as f:
+                payload = json.load(f)
+
+            rows = payload.get('data') if isinstance(payload, dict) else payload
+            if not isinstance(rows, list) or not rows:
+                logger.warning(f"فایل ضبط شده {path} داده کندل ندارد")
+                continue
+
+            # مرتب‌سازی بر اساس زمان و حذف کندل‌های تکراری
+            unique = {int(row[0]): row for row in rows}
+            klines[symbol] = [unique[ts] for ts in sorted(unique)]
+
+        if not klines:
+            raise ValueError(f"هیچ فایل کندلی در {data_dir} یافت نشد")
+        return klines
+
+    @staticmethod
+    def record_market_data(coinex_api, symbols, data_dir, timeframe=TIMEFRAME, limit=1000):
+        """ضبط کندل‌های فعلی بازار برای بازپخش‌های بعدی"""
+        os.makedirs(data_dir, exist_ok=True)
+        recorded = {}
+        for symbol in symbols:
+            rows = coinex_api.get_market_data(symbol, 'kline', limit, timeframe)
+            if not rows:
+                logger.warning(f"داده‌ای برای ضبط {symbol} دریافت نشد")
+                continue
+            with open(os.path.join(data_dir, f"{symbol}.json"), 'w', encoding='utf-8') as f:
+                json.dump(rows, f)
+            recorded[symbol] = len(rows)
+        return recorded
+
+    def build_timeline(self):
+        """ساخت ترتیب قطعی رویدادها: زمان بسته شدن کندل -> [(نماد، اندیس)]"""
+        events = {}
+        for symbol in sorted(self.klines):
+            rows = self.klines[symbol]
+            for index in range(max(self.warmup - 1, 0), len(rows)):
+                close_ts = candle_close_time(rows[index][0], self.timeframe)
+                events.setdefault(close_ts, []).append((symbol, index))
+        return sorted(events.items())
+
+    def run(self, bot, limit=100):
+        """اجرای بازپخش و اندازه‌گیری تاخیر بسته شدن کندل تا ارسال سیگنال"""
+        # جایگزینی اجزای خارجی ربات با نسخه‌های بازپخش
+        bot.coinex_api = self.api
+        bot.telegram_bot = self.telegram_bot
+        bot.test_mode = False
+        bot.send_delay = 0
+        # هر سیگنال جداگانه ارسال می‌شود تا تاخیر هر نماد قابل اندازه‌گیری باشد
+        bot.digest_mode = False
+        # ساعت ربات روی زمان بازپخش تنظیم می‌شود تا دریافت افزایشی قطعی باشد
+        replay_now = {'time': 0}
+        bot.clock = lambda: replay_now['time']
+
+        timeline = self.build_timeline()
+        if not timeline:
+            raise ValueError("کندل کافی برای بازپخش وجود ندارد")
+
+        candle_latencies = []
+        emission_latencies = []
+        emitted = []
+        first_close = timeline[0][0]
+        wall_start = time.perf_counter()
+
+        for close_ts, entries in timeline:
+            if self.speed:
+                release = wall_start + (close_ts - first_close) / self.speed
+                wait = release - time.perf_counter()
+                if wait > 0:
+                    time.sleep(wait)
+            else:
+                release = time.perf_counter()
+
+            replay_now['time'] = close_ts
+            for symbol, index in entries:
+                self.api.set_cursor(symbol, index + 1)
+                sent_before = len(self.telegram_bot.sent)
+
+                df = bot.fetch_market_data(symbol, self.timeframe, limit)
+                signals = bot.generate_signals(df, symbol) if df is not None else []
+                if signals:
+                    bot.send_signals(signals, symbol)
+
+                candle_latencies.append(time.perf_counter() - release)
+                for sent_at, _ in self.telegram_bot.sent[sent_before:]:
+                    emission_latencies.append(sent_at - release)
+
+                for signal in signals:
+                    emitted.append({
+                        'symbol': symbol,
+                        'close_time': close_ts,
+                        'type': signal['type'],
+                        'entry': float(signal['entry']),
+                        'sl': float(signal['sl']),
+                        'tp1': float(signal['tp1']),
+                        'tp2': float(signal['tp2']),
+                        'tp3': float(signal['tp3']),
+                        'confidence': float(signal['confidence']),
+                    })
+
+        wall_time = time.perf_counter() - wall_start
+        messages = [text for _, text in self.telegram_bot.sent]
+
+        return {
+            'timestamp': datetime.now().isoformat(),
+            'speed': self.speed or 'max',
+            'timeframe': self.timeframe,
+            'symbols': sorted(self.klines),
+            'candles_processed': len(candle_latencies),
+            'signals_emitted': len(emitted),
+            'messages_sent': len(messages),
+            'wall_time_seconds': round(wall_time, 4),
+            'candle_latency_ms': self._latency_stats(candle_latencies),
+            'emission_latency_ms': self._latency_stats(emission_latencies),
+            'digest': self.compute_digest(emitted, messages),
+            'signals': emitted,
+        }
+
+    @staticmethod
+    def compute_digest(signals, messages):
+        """هش SHA256 از خروجی‌ها برای مقایسه بیت به بیت اجراها"""
+        canonical = json.dumps(
+            {'signals': signals, 'messages': messages},
+            sort_keys=True, ensure_ascii=False, separators=(',', ':')
+        )
+        return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def _latency_stats(samples):
+        """آمار تاخیر به میلی‌ثانیه"""
+        if not samples:
+            return {'count': 0}
+        values = np.asarray(samples) * 1000
+        return {
+            'count': len(values),
+            'mean': round(float(values.mean()), 3),
+            'p50': round(float(np.percentile(values, 50)), 3),
+            'p95': round(float(np.percentile(values, 95)), 3),
+            'p99': round(float(np.percentile(values, 99)), 3),
+            'max': round(float(values.max()), 3),
+        }
+
+    def save_report(self, report, path="logs/replay_report.json"):
+        """ذخیره گزارش بازپخش"""
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        return path
@@ -0,0 +1,163 @@
+import logging
+import threading
+import time
+
+from config.config import (
+    GOVERNOR_INITIAL_CONCURRENCY, GOVERNOR_MIN_CONCURRENCY, GOVERNOR_MAX_CONCURRENCY,
+    GOVERNOR_LATENCY_TARGET_SECONDS, GOVERNOR_DECREASE_FACTOR,
+    CIRCUIT_FAILURE_THRESHOLD, CIRCUIT_OPEN_SECONDS
+)
+
+logger = logging.getLogger(__name__)
+
+class CircuitOpenError(Exception):
+    """مدار باز است؛ درخواست بدون ارسال به صرافی رد شد"""
+
+class RequestGovernor:
+    """کنترل همزمانی تطبیقی (AIMD) و قطع‌کننده مدار برای درخواست‌های صرافی"""
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    SUCCESS = 'success'
+    THROTTLED = 'throttled'
+    FAILURE = 'failure'
+
+    def __init__(self, initial_limit=GOVERNOR_INITIAL_CONCURRENCY,
+                 min_limit=GOVERNOR_MIN_CONCURRENCY, max_limit=GOVERNOR_MAX_CONCURRENCY,
+                 latency_target=GOVERNOR_LATENCY_TARGET_SECONDS,
+                 decrease_factor=GOVERNOR_DECREASE_FACTOR,
+                 failure_threshold=CIRCUIT_FAILURE_THRESHOLD, open_seconds=CIRCUIT_OPEN_SECONDS,
+                 clock=time.monotonic):
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.limit = float(initial_limit)
+        self.latency_target = latency_target
+        self.decrease_factor = decrease_factor
+        self.failure_threshold = failure_threshold
+        self.open_seconds = open_seconds
+        self.clock = clock
+
+        self.state = self.CLOSED
+        self.in_flight = 0
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self._probe_in_flight = False
+        self._last_decrease = None
+        self._cond = threading.Condition()
+
+        self.counters = {
+            'requests': 0, 'successes': 0, 'throttled': 0, 'failures': 0,
+            'rejected': 0, 'circuit_opens': 0, 'max_in_flight': 0,
+        }
+        self.latency_ewma = None
+
+    @staticmethod
+    def classify(status_code):
+        """دسته‌بندی نتیجه بر اساس کد HTTP"""
+        if status_code == 429:
+            return RequestGovernor.THROTTLED
+        if status_code >= 500:
+            return RequestGovernor.FAILURE
+        return RequestGovernor.SUCCESS
+
+    def acquire(self):
+        """گرفتن مجوز ارسال درخواست؛ در حالت مدار باز CircuitOpenError"""
+        with self._cond:
+            probe = False
+            while True:
+                if self.state == self.OPEN:
+                    if self.clock() - self.opened_at < self.open_seconds:
+                        self.counters['rejected'] += 1
+                        raise CircuitOpenError("مدار درخواست‌های CoinEx باز است")
+                    self.state = self.HALF_OPEN
+                    logger.info("مدار نیمه‌باز شد؛ ارسال درخواست آزمایشی")
+
+                if self.state == self.HALF_OPEN:
+                    # در حالت نیمه‌باز فقط یک درخواست آزمایشی مجاز است
+                    if self._probe_in_flight:
+                        self.counters['rejected'] += 1
+                        raise CircuitOpenError("درخواست آزمایشی مدار در حال اجراست")
+                    self._probe_in_flight = True
+                    probe = True
+                    break
+
+                if self.in_flight < int(self.limit):
+                    break
+                self._cond.wait()
+
+            self.in_flight += 1
+            self.counters['requests'] += 1
+            self.counters['max_in_flight'] = max(self.counters['max_in_flight'], self.in_flight)
+            return self.clock(), probe
+
+    def release(self, token, outcome):
+        """ثبت نتیجه درخواست (token خروجی acquire) و تنظیم حد همزمانی و وضعیت مدار"""
+        started, probe = token
+        with self._cond:
+            now = self.clock()
+            latency = now - started
+            self.in_flight -= 1
+            if probe:
+                self._probe_in_flight = False
+
+            if outcome == self.SUCCESS:
+                self.counters['successes'] += 1
+                self.consecutive_failures = 0
+                self.latency_ewma = latency if self.latency_ewma is None else (
+                    0.8 * self.latency_ewma + 0.2 * latency
+                )
+                if probe:
+                    self.state = self.CLOSED
+                    logger.info("مدار درخواست‌های CoinEx بسته شد")
+                if latency > self.latency_target:
+                    self._decrease(now)
+                else:
+                    # افزایش جمعی: حدود +1 به ازای هر پنجره کامل از درخواست‌ها
+                    self.limit = min(self.max_limit, self.limit + 1.0 / self.limit)
+
+            elif outcome == self.THROTTLED:
+                # 429 یعنی صرافی سالم است ولی محدودیت نرخ داریم: فقط کاهش ضربی
+                self.counters['throttled'] += 1
+                self._decrease(now)
+                if probe:
+                    self.state = self.CLOSED
+
+            else:
+                self.counters['failures'] += 1
+                self.consecutive_failures += 1
+                self._decrease(now)
+                if probe or self.consecutive_failures >= self.failure_threshold:
+                    self._open(now)
+
+            self._cond.notify_all()
+
+    def _decrease(self, now):
+        """کاهش ضربی حد همزمانی، حداکثر یک بار در هر بازه latency_target"""
+        if self._last_decrease is not None and now - self._last_decrease < self.latency_target:
+            return
+        self.limit = max(self.min_limit, self.limit * self.decrease_factor)
+        self._last_decrease = now
+
+    def _open(self, now):
+        if self.state != self.OPEN:
+            self.counters['circuit_opens'] += 1
+            logger.warning(
+                f"مدار درخواست‌های CoinEx پس از {self.consecutive_failures} خطای پیاپی باز شد"
+            )
+        self.state = self.OPEN
+        self.opened_at = now
+
+    def metrics(self):
+        """وضعیت فعلی کنترل‌گر برای گزارش"""
+        with self._cond:
+            return {
+                'state': self.state,
+                'limit': round(self.limit, 2),
+                'in_flight': self.in_flight,
+                'consecutive_failures': self.consecutive_failures,
+                'latency_ewma_ms': round(self.latency_ewma * 1000, 2)
+                if self.latency_ewma is not None else None,
+                **self.counters,
+            }
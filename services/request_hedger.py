@@ -0,0 +1,152 @@
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+import numpy as np
+
+from config.config import (
+    HEDGE_PERCENTILE, HEDGE_BUDGET_RATIO, HEDGE_BUDGET_BURST, HEDGE_MIN_DELAY_SECONDS,
+    HEDGE_DEFAULT_DELAY_SECONDS, HEDGE_MIN_SAMPLES, GOVERNOR_MAX_CONCURRENCY
+)
+
+logger = logging.getLogger(__name__)
+
+class LatencyTracker:
+    """پنجره لغزان تاخیر هر endpoint برای محاسبه صدک‌ها"""
+
+    def __init__(self, window=200):
+        self.window = window
+        self.samples = {}
+        self._lock = threading.Lock()
+
+    def record(self, endpoint, latency):
+        with self._lock:
+            samples = self.samples.get(endpoint)
+            if samples is None:
+                samples = self.samples[endpoint] = deque(maxlen=self.window)
+            samples.append(latency)
+
+    def percentile(self, endpoint, q, min_samples=1):
+        """صدک q تاخیر endpoint؛ None اگر نمونه کافی نباشد"""
+        with self._lock:
+            samples = self.samples.get(endpoint)
+            if samples is None or len(samples) < min_samples:
+                return None
+            return float(np.percentile(np.fromiter(samples, dtype=float), q))
+
+class RequestHedger:
+    """ارسال درخواست تکراری وقتی پاسخ اول از صدک p95 دیرتر شود؛ اولین پاسخ سالم برنده است"""
+
+    def __init__(self, percentile=HEDGE_PERCENTILE, budget_ratio=HEDGE_BUDGET_RATIO,
+                 budget_burst=HEDGE_BUDGET_BURST, min_delay=HEDGE_MIN_DELAY_SECONDS,
+                 default_delay=HEDGE_DEFAULT_DELAY_SECONDS, min_samples=HEDGE_MIN_SAMPLES,
+                 max_workers=2 * GOVERNOR_MAX_CONCURRENCY):
+        self.percentile = percentile
+        self.budget_ratio = budget_ratio
+        self.budget_burst = budget_burst
+        self.min_delay = min_delay
+        self.default_delay = default_delay
+        self.min_samples = min_samples
+        self.tracker = LatencyTracker()
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='hedge')
+        self._lock = threading.Lock()
+        self.stats = {
+            'requests': 0, 'hedges_sent': 0, 'hedge_wins': 0, 'budget_denied': 0,
+            'cancelled': 0, 'saved_seconds': 0.0,
+        }
+
+    def threshold(self, endpoint):
+        """تاخیر پویا برای ارسال درخواست تکراری (صدک تاخیر endpoint)"""
+        value = self.tracker.percentile(endpoint, self.percentile, self.min_samples)
+        if value is None:
+            return self.default_delay
+        return max(self.min_delay, value)
+
+    def _take_budget(self):
+        """سهمیه درخواست‌های تکراری: حداکثر budget_ratio از کل درخواست‌ها"""
+        with self._lock:
+            allowed = self.budget_ratio * self.stats['requests'] + self.budget_burst
+            if self.stats['hedges_sent'] + 1 > allowed:
+                self.stats['budget_denied'] += 1
+                return False
+            self.stats['hedges_sent'] += 1
+            return True
+
+    def _timed(self, endpoint, send):
+        started = time.perf_counter()
+        try:
+            return send()
+        finally:
+            finished = time.perf_counter()
+            self.tracker.record(endpoint, finished - started)
+
+    def execute(self, endpoint, send, is_good):
+        """اجرای send با hedging؛ خروجی اولین پاسخ سالم (یا آخرین پاسخ)"""
+        with self._lock:
+            self.stats['requests'] += 1
+
+        started = time.perf_counter()
+        primary = self.executor.submit(self._timed, endpoint, send)
+        done, _ = wait([primary], timeout=self.threshold(endpoint))
+        if done or not self._take_budget():
+            return primary.result()
+
+        hedge = self.executor.submit(self._timed, endpoint, send)
+        pending = {primary, hedge}
+        fallback = None
+        error = None
+        winner = None
+
+        while pending and winner is None:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                try:
+                    result = future.result()
+                except Exception as e:
+                    error = e
+                    continue
+                if is_good(result):
+                    winner = future
+                    break
+                fallback = result
+
+        if winner is None:
+            if fallback is not None or error is None:
+                return fallback
+            raise error
+
+        won_at = time.perf_counter()
+        for future in pending:
+            # درخواست بازنده اگر هنوز شروع نشده لغو می‌شود؛ در غیر این صورت نتیجه‌اش دور ریخته می‌شود
+            if future.cancel():
+                with self._lock:
+                    self.stats['cancelled'] += 1
+            elif winner is hedge:
+                future.add_done_callback(lambda _: self._record_saving(won_at))
+
+        if winner is hedge:
+            with self._lock:
+                self.stats['hedge_wins'] += 1
+        logger.debug(f"hedge برای {endpoint}: برنده {'تکراری' if winner is hedge else 'اصلی'} "
+                     f"پس از {won_at - started:.3f}s")
+        return winner.result()
+
+    def _record_saving(self, won_at):
+        """صرفه‌جویی = زمان پایان درخواست اصلی منهای زمان پاسخ برنده"""
+        saved = time.perf_counter() - won_at
+        with self._lock:
+            self.stats['saved_seconds'] += saved
+
+    def metrics(self):
+        """نرخ hedge و صرفه‌جویی تاخیر"""
+        with self._lock:
+            stats = dict(self.stats)
+        requests = stats['requests'] or 1
+        stats['hedge_rate'] = round(stats['hedges_sent'] / requests, 4)
+        stats['saved_ms_total'] = round(stats.pop('saved_seconds') * 1000, 2)
+        stats['saved_ms_per_win'] = round(
+            stats['saved_ms_total'] / stats['hedge_wins'], 2
+        ) if stats['hedge_wins'] else 0.0
+        return stats
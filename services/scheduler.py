@@ -0,0 +1,133 @@
+import logging
+import random
+import time
+from datetime import datetime
+
+from config.config import (
+    SCHEDULER_TIMEFRAMES, SCHEDULER_PREWARM_SECONDS, SCHEDULER_FETCH_DELAY_SECONDS,
+    SCHEDULER_FETCH_JITTER_SECONDS, SCHEDULER_LATENCY_BUDGET_SECONDS, TRADE_POLL_INTERVAL_SECONDS
+)
+from utils.time_utils import next_candle_close
+
+logger = logging.getLogger(__name__)
+
+class CandleScheduler:
+    """زمان‌بندی داخلی هم‌تراز با بسته شدن کندل‌ها برای اجرای دائمی ربات"""
+
+    # خواب دقیق: تا این فاصله مانده به هدف با sleep عادی و بعد با گام‌های کوتاه
+    FINE_SLEEP_WINDOW = 0.05
+
+    def __init__(self, bot, timeframes=None, prewarm=SCHEDULER_PREWARM_SECONDS,
+                 fetch_delay=SCHEDULER_FETCH_DELAY_SECONDS, jitter=SCHEDULER_FETCH_JITTER_SECONDS,
+                 latency_budget=SCHEDULER_LATENCY_BUDGET_SECONDS, clock=time.time,
+                 sleep=time.sleep, seed=None, trade_poll_interval=TRADE_POLL_INTERVAL_SECONDS):
+        self.bot = bot
+        self.timeframes = list(timeframes or SCHEDULER_TIMEFRAMES)
+        self.prewarm = prewarm
+        self.fetch_delay = fetch_delay
+        self.jitter = jitter
+        self.latency_budget = latency_budget
+        self.clock = clock
+        self.sleep = sleep
+        self.random = random.Random(seed)
+        self.trade_poll_interval = trade_poll_interval
+        self.total_signals = 0
+        self.total_misses = 0
+
+    def next_close(self, now=None):
+        """نزدیک‌ترین زمان بسته شدن کندل و تایم فریم‌هایی که در آن بسته می‌شوند"""
+        now = self.clock() if now is None else now
+        closes = {}
+        for timeframe in self.timeframes:
+            closes.setdefault(next_candle_close(now, timeframe), []).append(timeframe)
+        close_time = min(closes)
+        return close_time, closes[close_time]
+
+    def fire_time(self, close_time):
+        """زمان دریافت داده: کمی بعد از بسته شدن کندل با پخش تصادفی محدود"""
+        return close_time + self.fetch_delay + self.random.uniform(0, self.jitter)
+
+    def sleep_until(self, target):
+        """خواب تا زمان هدف و برگرداندن میزان تاخیر بیدار شدن (ثانیه)"""
+        while True:
+            remaining = target - self.clock()
+            if remaining <= 0:
+                return -remaining
+            if remaining > self.FINE_SLEEP_WINDOW:
+                self.sleep(remaining - self.FINE_SLEEP_WINDOW)
+            else:
+                self.sleep(min(remaining, 0.005))
+
+    def watch_until(self, target):
+        """انتظار تا زمان هدف؛ با تجمیع معاملات فعال، ارزیابی کندل موقت در این فاصله"""
+        trades = getattr(self.bot, 'trades', None)
+        if trades is None:
+            self.sleep_until(target)
+            return 0
+
+        intrabar_signals = 0
+        while self.clock() < target:
+            intrabar_signals += self.bot.run_intrabar(trades.timeframe)
+            self.sleep_until(min(target, self.clock() + self.trade_poll_interval))
+        self.total_signals += intrabar_signals
+        return intrabar_signals
+    
+    def prewarm_connections(self):
+        """باز کردن اتصال‌های CoinEx و تلگرام کمی قبل از بسته شدن کندل"""
+        warmed = {}
+        for name, client in (('coinex', self.bot.coinex_api), ('telegram', self.bot.telegram_bot)):
+            warm_up = getattr(client, 'warm_up', None)
+            if warm_up is not None:
+                warmed[name] = warm_up()
+        return warmed
+
+    def run_once(self):
+        """اجرای یک چرخه کامل: گرم کردن، انتظار برای بسته شدن و ارزیابی نمادها"""
+        close_time, timeframes = self.next_close()
+
+        self.watch_until(close_time - self.prewarm)
+        warmed = self.prewarm_connections()
+
+        target = self.fire_time(close_time)
+        lateness = self.sleep_until(target)
+        deadline = close_time + self.latency_budget
+
+        cycles = [self.bot.run_cycle(timeframe, deadline=deadline) for timeframe in timeframes]
+
+        report = {
+            'close_time': datetime.fromtimestamp(close_time).isoformat(),
+            'timeframes': timeframes,
+            'warmed': warmed,
+            'fire_delay': round(target - close_time, 4),
+            'wake_lateness_ms': round(lateness * 1000, 3),
+            'close_to_done': round(self.clock() - close_time, 4),
+            'signals_sent': sum(cycle['signals_sent'] for cycle in cycles),
+            'misses': [symbol for cycle in cycles for symbol in cycle['misses']],
+            'cycles': cycles,
+        }
+
+        self.total_signals += report['signals_sent']
+        self.total_misses += len(report['misses'])
+        if report['misses']:
+            logger.warning(
+                f"بودجه تاخیر {self.latency_budget}s برای {report['misses']} رعایت نشد "
+                f"(کندل {report['close_time']})"
+            )
+        logger.info(
+            f"چرخه {report['close_time']}: {report['signals_sent']} سیگنال، "
+            f"{report['close_to_done']}s از بسته شدن کندل"
+        )
+        return report
+
+    def run_forever(self, max_cycles=None):
+        """اجرای پیوسته چرخه‌ها تا توقف (یا تا max_cycles)"""
+        reports = []
+        while max_cycles is None or len(reports) < max_cycles:
+            report = self.run_once()
+            print(
+                f"⏰ کندل {report['close_time']}: {report['signals_sent']} سیگنال، "
+                f"{report['close_to_done']}s پس از بسته شدن، از دست رفته: {len(report['misses'])}"
+            )
+            if max_cycles is not None:
+                reports.append(report)
+        return reports
@@ -0,0 +1,267 @@
+import json
+import logging
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from config.config import SIGNAL_JOURNAL_DIR
+from utils.time_utils import timeframe_to_seconds
+
+logger = logging.getLogger(__name__)
+
+JOURNAL_VERSION = 1
+# catalog هر روز در پوشه همان روز
+CATALOG_FILE = 'catalog.json'
+SIGNAL_TYPES = ('BUY', 'SELL')
+# مقادیر اندیکاتورها در لحظه تصمیم (signal['indicators'])
+INDICATOR_COLUMNS = ('rsi', 'macd', 'macd_signal', 'bb_upper', 'bb_middle', 'bb_lower',
+                     'sma_20', 'sma_50', 'sma_100')
+# هر ستون یک فایل باینری با عرض ثابت که فقط به انتهای آن اضافه می‌شود
+COLUMNS = (
+    ('timestamp', '<i8'),     # زمان باز شدن کندل سیگنال (ثانیه یونیکس)
+    ('recorded_at', '<i8'),   # زمان ثبت (میلی‌ثانیه یونیکس)
+    ('type', 'u1'),           # اندیس در SIGNAL_TYPES
+    ('timeframe', '<i4'),     # طول کندل به ثانیه
+    ('confidence', '<f4'),
+    ('provisional', 'u1'),    # 1 برای سیگنال کندل در حال تشکیل (run_intrabar)
+    ('entry', '<f8'),
+    ('sl', '<f8'),
+    ('tp1', '<f8'),
+    ('tp2', '<f8'),
+    ('tp3', '<f8'),
+) + tuple((name, '<f8') for name in INDICATOR_COLUMNS)
+COLUMN_DTYPES = {name: np.dtype(dtype) for name, dtype in COLUMNS}
+
+def _to_seconds(value):
+    """تبدیل زمان (عدد یونیکس، رشته یا datetime) به ثانیه یونیکس"""
+    if value is None or isinstance(value, (int, float, np.integer, np.floating)):
+        return value
+    return pd.Timestamp(value).timestamp()
+
+class SignalJournal:
+    """ژورنال ستونی append-only سیگنال‌ها، پارتیشن‌بندی شده بر اساس روز و نماد
+
+    هر پارتیشن (journal/YYYY-MM-DD/SYMBOL) برای هر ستون یک فایل دارد.
+    catalog.json هر روز (journal/YYYY-MM-DD/catalog.json) تعداد ردیف‌های معتبر
+    و نقشه ناحیه پارتیشن‌های آن روز (بازه زمان، تعداد هر نوع و بیشینه اطمینان)
+    را نگه می‌دارد؛ هر append فقط catalog روز خودش را بازنویسی می‌کند و catalog
+    هر روز فقط وقتی لازم شود خوانده می‌شود. پرس‌وجو روزها و پارتیشن‌های بی‌ربط
+    را بدون باز کردن فایل رد می‌کند و در بقیه فقط بازه ردیف‌های لازم از
+    ستون‌های درخواستی را می‌خواند.
+    """
+
+    def __init__(self, root=SIGNAL_JOURNAL_DIR):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+        # روز ← {نماد: نقشه ناحیه}؛ None یعنی catalog روز هنوز خوانده نشده است
+        self.days = {
+            name: None for name in os.listdir(root)
+            if os.path.isfile(self._catalog_path(name))
+        }
+
+    def _catalog_path(self, day):
+        return os.path.join(self.root, day, CATALOG_FILE)
+
+    @staticmethod
+    def _read_catalog(path):
+        with open(path, encoding='utf-8') as f:
+            catalog = json.load(f)
+        if catalog.get('version') != JOURNAL_VERSION:
+            raise ValueError(f"نسخه ژورنال سیگنال پشتیبانی نمی‌شود: {catalog.get('version')}")
+        return catalog['partitions']
+
+    def _day_catalog(self, day):
+        """پارتیشن‌های یک روز (نماد ← نقشه ناحیه)؛ در اولین استفاده از دیسک خوانده می‌شود"""
+        catalog = self.days.get(day)
+        if catalog is None:
+            path = self._catalog_path(day)
+            catalog = self.days[day] = self._read_catalog(path) if os.path.exists(path) else {}
+        return catalog
+
+    def _save_catalog(self, day):
+        # جایگزینی اتمیک؛ بایت‌های اضافه ستون‌ها پس از خرابی با تعداد ردیف catalog نادیده گرفته می‌شوند
+        path = self._catalog_path(day)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'version': JOURNAL_VERSION, 'partitions': self.days[day]}, f,
+                      sort_keys=True, separators=(',', ':'))
+        os.replace(tmp_path, path)
+
+    @property
+    def catalog(self):
+        """همه پارتیشن‌ها (روز/نماد ← نقشه ناحیه)؛ catalog همه روزها را می‌خواند"""
+        return {
+            f"{day}/{symbol}": meta
+            for day in sorted(self.days) for symbol, meta in self._day_catalog(day).items()
+        }
+
+    def _column_path(self, key, column):
+        return os.path.join(self.root, key, f"{column}.bin")
+
+    def __len__(self):
+        return sum(meta['rows'] for day in list(self.days) for meta in self._day_catalog(day).values())
+
+    def append(self, symbol, timeframe, signals, recorded_at=None):
+        """ثبت سیگنال‌های یک نماد همراه با اندیکاتورهای لحظه تصمیم"""
+        if not signals:
+            return 0
+        recorded_at = int((time.time() if recorded_at is None else recorded_at) * 1000)
+        columns = {
+            'timestamp': [int(pd.Timestamp(signal['timestamp']).timestamp()) for signal in signals],
+            'recorded_at': [recorded_at] * len(signals),
+            'type': [SIGNAL_TYPES.index(signal['type']) for signal in signals],
+            'timeframe': [timeframe_to_seconds(timeframe)] * len(signals),
+            'provisional': [int(signal.get('provisional', False)) for signal in signals],
+        }
+        for name in ('confidence', 'entry', 'sl', 'tp1', 'tp2', 'tp3'):
+            columns[name] = [float(signal.get(name, np.nan)) for signal in signals]
+        for name in INDICATOR_COLUMNS:
+            columns[name] = [float(signal.get('indicators', {}).get(name, np.nan)) for signal in signals]
+        return self.append_columns(symbol, columns)
+
+    def append_columns(self, symbol, columns):
+        """افزودن دسته‌ای ردیف‌ها (dict نام ستون ← آرایه)؛ ستون ناموجود nan یا صفر می‌شود"""
+        timestamps = np.asarray(columns['timestamp'], dtype=COLUMN_DTYPES['timestamp'])
+        if not len(timestamps):
+            return 0
+        days = timestamps.astype('datetime64[s]').astype('datetime64[D]')
+
+        for day in np.unique(days):
+            selected = days == day
+            arrays = {}
+            for name, dtype in COLUMN_DTYPES.items():
+                values = columns.get(name)
+                if values is None:
+                    fill = np.nan if dtype.kind == 'f' else 0
+                    arrays[name] = np.full(int(selected.sum()), fill, dtype=dtype)
+                else:
+                    arrays[name] = np.asarray(values, dtype=dtype)[selected]
+            self._append_partition(str(day), symbol, arrays)
+            self._save_catalog(str(day))
+
+        return len(timestamps)
+
+    def _append_partition(self, day, symbol, arrays):
+        catalog = self._day_catalog(day)
+        key = f"{day}/{symbol}"
+        meta = catalog.get(symbol)
+        if meta is None:
+            os.makedirs(os.path.join(self.root, key), exist_ok=True)
+            meta = catalog[symbol] = {
+                'rows': 0, 'min_ts': None, 'max_ts': None, 'sorted': True,
+                'types': [0] * len(SIGNAL_TYPES), 'max_confidence': None,
+            }
+        rows = meta['rows']
+
+        for name, dtype in COLUMN_DTYPES.items():
+            with open(self._column_path(key, name), 'ab') as f:
+                expected = rows * dtype.itemsize
+                if f.tell() != expected:
+                    # بایت‌های نوشته شده پس از آخرین catalog سالم (نوشتن نیمه‌کاره)
+                    f.truncate(expected)
+                    f.seek(expected)
+                f.write(np.ascontiguousarray(arrays[name]).tobytes())
+
+        timestamps = arrays['timestamp']
+        in_order = bool(np.all(np.diff(timestamps) >= 0)) and (
+            meta['max_ts'] is None or int(timestamps[0]) >= meta['max_ts']
+        )
+        meta['sorted'] = meta['sorted'] and in_order
+        meta['rows'] = rows + len(timestamps)
+        low, high = int(timestamps.min()), int(timestamps.max())
+        meta['min_ts'] = low if meta['min_ts'] is None else min(meta['min_ts'], low)
+        meta['max_ts'] = high if meta['max_ts'] is None else max(meta['max_ts'], high)
+        counts = np.bincount(arrays['type'], minlength=len(SIGNAL_TYPES))
+        meta['types'] = [int(total + count) for total, count in zip(meta['types'], counts)]
+        confidence = arrays['confidence'][~np.isnan(arrays['confidence'])]
+        if len(confidence):
+            top = float(confidence.max())
+            meta['max_confidence'] = top if meta['max_confidence'] is None else max(meta['max_confidence'], top)
+
+    def _read(self, key, column, lo, hi):
+        """ردیف‌های [lo, hi) یک ستون پارتیشن؛ فقط همین بایت‌ها از فایل خوانده می‌شوند"""
+        dtype = COLUMN_DTYPES[column]
+        return np.fromfile(self._column_path(key, column), dtype=dtype, count=hi - lo, offset=lo * dtype.itemsize)
+
+    def _row_range(self, key, meta, start, end):
+        """بازه ردیف‌های کاندید؛ در پارتیشن مرتب با جستجوی دودویی روی memory-map زمان‌ها"""
+        rows = meta['rows']
+        if not meta['sorted'] or (start is None and end is None):
+            return 0, rows
+        timestamps = np.memmap(self._column_path(key, 'timestamp'), dtype=COLUMN_DTYPES['timestamp'],
+                               mode='r', shape=(rows,))
+        lo = int(np.searchsorted(timestamps, start, side='left')) if start is not None else 0
+        hi = int(np.searchsorted(timestamps, end, side='right')) if end is not None else rows
+        return lo, hi
+
+    def partitions(self, symbol=None, side=None, start=None, end=None, min_confidence=None):
+        """پارتیشن‌هایی که نقشه ناحیه آن‌ها با شرط‌ها سازگار است"""
+        symbols = {symbol} if isinstance(symbol, str) else set(symbol) if symbol else None
+        start_day = str(np.datetime64(int(start), 's').astype('datetime64[D]')) if start is not None else None
+        end_day = str(np.datetime64(int(end), 's').astype('datetime64[D]')) if end is not None else None
+
+        for day in sorted(self.days):
+            # روزهای بیرون از بازه بدون خواندن catalog آن‌ها رد می‌شوند
+            if (start_day is not None and day < start_day) or (end_day is not None and day > end_day):
+                continue
+            catalog = self._day_catalog(day)
+            for key_symbol in sorted(catalog if symbols is None else symbols & catalog.keys()):
+                meta = catalog[key_symbol]
+                if (start is not None and meta['max_ts'] < start) or (end is not None and meta['min_ts'] > end):
+                    continue
+                if side is not None and not meta['types'][SIGNAL_TYPES.index(side)]:
+                    continue
+                if min_confidence is not None and (meta['max_confidence'] or -np.inf) < min_confidence:
+                    continue
+                yield f"{day}/{key_symbol}", key_symbol, meta
+
+    def query(self, symbol=None, side=None, start=None, end=None, min_confidence=None, columns=None):
+        """پرس‌وجوی سیگنال‌ها؛ مثلا query('ETHUSDT', 'BUY', start='2024-01-01', min_confidence=80)
+
+        start و end (شامل) بر اساس زمان کندل هستند. خروجی DataFrame مرتب بر اساس
+        زمان با ستون symbol و ستون‌های درخواستی (پیش‌فرض همه).
+        """
+        start, end = _to_seconds(start), _to_seconds(end)
+        columns = list(columns) if columns is not None else [name for name, _ in COLUMNS]
+        symbols = []
+        parts = {name: [] for name in columns}
+
+        for key, key_symbol, meta in self.partitions(symbol, side, start, end, min_confidence):
+            lo, hi = self._row_range(key, meta, start, end)
+            if hi <= lo:
+                continue
+            mask = np.ones(hi - lo, dtype=bool)
+            if not meta['sorted']:
+                timestamps = self._read(key, 'timestamp', lo, hi)
+                if start is not None:
+                    mask &= timestamps >= start
+                if end is not None:
+                    mask &= timestamps <= end
+            if side is not None:
+                mask &= self._read(key, 'type', lo, hi) == SIGNAL_TYPES.index(side)
+            if min_confidence is not None:
+                mask &= self._read(key, 'confidence', lo, hi) >= min_confidence
+            positions = np.flatnonzero(mask)
+            if not len(positions):
+                continue
+
+            symbols.append(np.full(len(positions), key_symbol, dtype=object))
+            for name in columns:
+                parts[name].append(self._read(key, name, lo, hi)[positions])
+
+        if not symbols:
+            return pd.DataFrame(columns=['symbol'] + columns)
+        data = {'symbol': np.concatenate(symbols)}
+        for name in columns:
+            values = np.concatenate(parts[name])
+            if name == 'type':
+                values = np.array(SIGNAL_TYPES, dtype=object)[values]
+            elif name == 'timestamp':
+                values = pd.to_datetime(values, unit='s')
+            data[name] = values
+        result = pd.DataFrame(data)
+        if 'timestamp' in result:
+            result = result.sort_values('timestamp', kind='stable', ignore_index=True)
+        return result
@@ -0,0 +1,271 @@
+import logging
+import multiprocessing
+import queue
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from config.config import (
+    PIPELINE_FETCH_WORKERS, PIPELINE_COMPUTE_WORKERS, PIPELINE_QUEUE_SIZE
+)
+
+logger = logging.getLogger(__name__)
+
+# پایان ورودی هر صف
+_DONE = object()
+
+# استراتژی هر پروسس محاسبه فقط یک بار ساخته می‌شود
+_worker_strategy = None
+
+def _pool_context():
+    """روش شروع پروسس‌های محاسبه بدون fork
+
+    pool وقتی ساخته می‌شود که threadهای دیگر (دریافت، hedger، ارسال خطاها)
+    در حال اجرا هستند؛ fork فقط thread فعلی را کپی می‌کند و قفل‌هایی که آن
+    threadها گرفته‌اند در پروسس فرزند برای همیشه بسته می‌مانند.
+    """
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+
+def _compute_signals(df, symbol=None, now=None):
+    """تولید سیگنال در پروسس محاسبه؛ خروجی سیگنال‌ها، زمان محاسبه و آمار شرط‌های همین فراخوانی
+
+    آمار شرط‌ها (ارزیابی تنبل) در پروسس اصلی جمع می‌شود تا در پروسس‌ها انباشته نشود.
+    """
+    global _worker_strategy
+    if _worker_strategy is None:
+        from strategies.mutanabby_strategy import MutanabbyStrategy
+        _worker_strategy = MutanabbyStrategy()
+    _worker_strategy.condition_stats.clear()
+    begin = time.perf_counter()
+    signals = _worker_strategy.generate_signals(df, symbol, now)
+    return signals, time.perf_counter() - begin, dict(_worker_strategy.condition_stats)
+
+class StageStats:
+    """آمار یک مرحله: تعداد، زمان مشغول بودن و عمق صف ورودی"""
+
+    def __init__(self, name, workers, input_queue=None):
+        self.name = name
+        self.workers = workers
+        self.input_queue = input_queue
+        self.items = 0
+        self.busy_seconds = 0.0
+        self.max_depth = 0
+        self._lock = threading.Lock()
+
+    def record(self, busy_seconds):
+        with self._lock:
+            self.items += 1
+            self.busy_seconds += busy_seconds
+
+    def sample_depth(self):
+        if self.input_queue is not None:
+            depth = self.input_queue.qsize()
+            with self._lock:
+                self.max_depth = max(self.max_depth, depth)
+
+    def snapshot(self, elapsed):
+        with self._lock:
+            capacity = elapsed * self.workers
+            return {
+                'workers': self.workers,
+                'items': self.items,
+                'busy_seconds': round(self.busy_seconds, 4),
+                'utilization': round(self.busy_seconds / capacity, 4) if capacity > 0 else 0.0,
+                'queue_depth': self.input_queue.qsize() if self.input_queue is not None else 0,
+                'max_queue_depth': self.max_depth,
+            }
+
+class SignalPipeline:
+    """اجرای مرحله‌ای یک چرخه: دریافت (threadها) ← محاسبه (process pool) ← ارسال
+
+    مراحل با صف‌های محدود به هم وصل هستند؛ وقتی مرحله بعدی عقب بماند put مسدود
+    می‌شود و مرحله قبلی متوقف می‌ماند، پس حافظه به اندازه صف‌ها محدود است.
+    فقط حالت indicators استراتژی (بدون وضعیت بین چرخه‌ها) به process pool
+    فرستاده می‌شود؛ حالت‌های دارای وضعیت نماد (مثل atr_trailing) در همان thread
+    توزیع‌کننده با استراتژی ربات محاسبه می‌شوند تا وضعیت در پروسس‌ها پخش نشود.
+    """
+
+    def __init__(self, bot, fetch_workers=PIPELINE_FETCH_WORKERS,
+                 compute_workers=PIPELINE_COMPUTE_WORKERS, queue_size=PIPELINE_QUEUE_SIZE,
+                 clock=time.perf_counter):
+        self.bot = bot
+        self.fetch_workers = fetch_workers
+        # compute_workers=0 یعنی محاسبه در همان thread توزیع‌کننده (بدون process pool)
+        self.compute_workers = compute_workers
+        self.queue_size = queue_size
+        self.clock = clock
+        self.executor = None
+
+    def _executor(self):
+        if self.executor is None and self.compute_workers > 0:
+            # pool بین چرخه‌ها زنده می‌ماند تا هزینه ساخت پروسس‌ها تکرار نشود
+            self.executor = ProcessPoolExecutor(max_workers=self.compute_workers, mp_context=_pool_context())
+        return self.executor
+
+    def close(self, wait=True):
+        if self.executor is not None:
+            self.executor.shutdown(wait=wait, cancel_futures=not wait)
+            self.executor = None
+
+    def run(self, symbols, timeframe):
+        """اجرای pipeline برای همه نمادها؛ خروجی ارسال، زمان پایان و خطای هر نماد"""
+        symbols_queue = queue.Queue()
+        for symbol in symbols:
+            symbols_queue.put(symbol)
+        compute_queue = queue.Queue(maxsize=self.queue_size)
+        # هر آیتم در حال محاسبه یک جای صف تحویل را رزرو می‌کند
+        pending_queue = queue.Queue(maxsize=self.queue_size)
+        deliver_queue = queue.Queue(maxsize=self.queue_size)
+
+        fetch_workers = max(1, min(self.fetch_workers, len(symbols)))
+        self.stats = {
+            'fetch': StageStats('fetch', fetch_workers, symbols_queue),
+            'compute': StageStats('compute', max(self.compute_workers, 1), compute_queue),
+            'deliver': StageStats('deliver', 1, deliver_queue),
+        }
+        result = {'sent': {}, 'finished_at': {}, 'errors': []}
+        lock = threading.Lock()
+        started = self.clock()
+
+        def fail(symbol, stage, error):
+            logger.error(f"خطای مرحله {stage} برای {symbol}: {error}")
+            with lock:
+                result['errors'].append(symbol)
+                result['finished_at'][symbol] = self.bot.clock()
+
+        def fetch_worker():
+            while True:
+                try:
+                    symbol = symbols_queue.get_nowait()
+                except queue.Empty:
+                    return
+                begin = self.clock()
+                try:
+                    df = self.bot.fetch_market_data(symbol, timeframe)
+                except Exception as e:
+                    fail(symbol, 'fetch', e)
+                    continue
+                finally:
+                    self.stats['fetch'].record(self.clock() - begin)
+                if df is None or len(df) < 50:
+                    with lock:
+                        result['finished_at'][symbol] = self.bot.clock()
+                    continue
+                compute_queue.put((symbol, df))
+                self.stats['compute'].sample_depth()
+
+        def drain(source, stage, error, current=None):
+            """ثبت خطای آیتم در دست و آیتم‌های باقیمانده صف ورودی مرحله‌ای که از کار افتاده تا _DONE"""
+            logger.error(f"مرحله {stage} متوقف شد: {error}")
+            if current is not None and current not in result['finished_at']:
+                fail(current, stage, error)
+            while True:
+                item = source.get()
+                if item is _DONE:
+                    return
+                fail(item[0], stage, error)
+
+        def dispatcher():
+            symbol = None
+            try:
+                executor = self._executor() if self.bot.strategy.mode == 'indicators' else None
+                while True:
+                    item = compute_queue.get()
+                    if item is _DONE:
+                        return
+                    symbol, df = item
+                    if executor is not None:
+                        try:
+                            future = executor.submit(_compute_signals, df, symbol, self.bot.clock())
+                        except Exception as e:
+                            fail(symbol, 'compute', e)
+                            if isinstance(e, BrokenProcessPool):
+                                # pool خراب کنار گذاشته می‌شود؛ بقیه این چرخه در همین thread محاسبه می‌شوند
+                                self.close(wait=False)
+                                executor = None
+                            continue
+                        pending_queue.put((symbol, future))
+                    else:
+                        begin = self.clock()
+                        try:
+                            signals = self.bot.generate_signals(df, symbol)
+                        except Exception as e:
+                            fail(symbol, 'compute', e)
+                            continue
+                        finally:
+                            self.stats['compute'].record(self.clock() - begin)
+                        deliver_queue.put((symbol, signals))
+                        self.stats['deliver'].sample_depth()
+            except Exception as e:
+                drain(compute_queue, 'compute', e, symbol)
+            finally:
+                # پایان ورودی مرحله بعد در هر حالت ارسال می‌شود تا هیچ مرحله‌ای منتظر نماند
+                pending_queue.put(_DONE)
+
+        def collector():
+            symbol = None
+            try:
+                while True:
+                    item = pending_queue.get()
+                    if item is _DONE:
+                        return
+                    symbol, future = item
+                    try:
+                        signals, busy, condition_stats = future.result()
+                    except Exception as e:
+                        fail(symbol, 'compute', e)
+                        continue
+                    self.stats['compute'].record(busy)
+                    self.bot.strategy.condition_stats.update(condition_stats)
+                    deliver_queue.put((symbol, signals))
+                    self.stats['deliver'].sample_depth()
+            except Exception as e:
+                drain(pending_queue, 'compute', e, symbol)
+            finally:
+                deliver_queue.put(_DONE)
+
+        def deliverer():
+            symbol = None
+            try:
+                while True:
+                    item = deliver_queue.get()
+                    if item is _DONE:
+                        return
+                    symbol, signals = item
+                    begin = self.clock()
+                    try:
+                        sent = self.bot.deliver_signals(signals, symbol, timeframe)
+                    except Exception as e:
+                        fail(symbol, 'deliver', e)
+                        continue
+                    finally:
+                        self.stats['deliver'].record(self.clock() - begin)
+                    with lock:
+                        result['sent'][symbol] = sent
+                        result['finished_at'][symbol] = self.bot.clock()
+            except Exception as e:
+                drain(deliver_queue, 'deliver', e, symbol)
+
+        fetchers = [
+            threading.Thread(target=fetch_worker, name=f"pipeline-fetch-{i}", daemon=True)
+            for i in range(fetch_workers)
+        ]
+        stages = [
+            threading.Thread(target=dispatcher, name="pipeline-dispatch", daemon=True),
+            threading.Thread(target=collector, name="pipeline-collect", daemon=True),
+            threading.Thread(target=deliverer, name="pipeline-deliver", daemon=True),
+        ]
+        for thread in fetchers + stages:
+            thread.start()
+        for thread in fetchers:
+            thread.join()
+        compute_queue.put(_DONE)
+        for thread in stages:
+            thread.join()
+
+        elapsed = self.clock() - started
+        result['stats'] = {name: stats.snapshot(elapsed) for name, stats in self.stats.items()}
+        result['elapsed'] = round(elapsed, 4)
+        return result
@@ -0,0 +1,150 @@
+import json
+import logging
+import mmap
+import os
+import struct
+import time
+import zlib
+
+import numpy as np
+import pandas as pd
+
+from config.config import STATE_SNAPSHOT_MAX_AGE_SECONDS
+from services.market_state import MarketState
+from strategies.atr_trailing import TrailingState
+from utils.dtype_policy import STORAGE_DTYPE, resolve_dtype
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_MAGIC = b'CXSNAP\x00\x00'
+SNAPSHOT_VERSION = 1
+
+# magic, version, reserved, meta_len, data_len, created_at, crc32(meta + data)
+HEADER = struct.Struct('<8sHHIQdI')
+OHLCV_COLUMNS = ['open', 'high', 'low', 'close', 'volume']
+
+class SnapshotError(Exception):
+    """اسنپ‌شات خراب، ناسازگار یا قدیمی است"""
+
+def _pad8(length):
+    return (-length) % 8
+
+def save_snapshot(state, path):
+    """ذخیره وضعیت بازار در یک فایل باینری فشرده، نسخه‌دار و دارای checksum"""
+    entries = []
+    chunks = []
+    offset = 0
+
+    for (symbol, timeframe), symbol_state in sorted(state.symbols.items()):
+        window = symbol_state.window
+        if window is None or len(window) == 0:
+            continue
+
+        timestamps = np.ascontiguousarray(window.index.as_unit('s').asi8, dtype='<i8')
+        # قیمت‌ها با نوع داده پنجره ذخیره می‌شوند (float32 نصف حجم)
+        dtype = resolve_dtype(window['close'].dtype).newbyteorder('<')
+        values = np.ascontiguousarray(window[OHLCV_COLUMNS].to_numpy(dtype=dtype).T)
+
+        entries.append({
+            'symbol': symbol,
+            'timeframe': timeframe,
+            'rows': len(window),
+            'offset': offset,
+            'last_candle': symbol_state.last_candle,
+            'last_signal_candle': symbol_state.last_signal_candle,
+            'last_provisional_candle': symbol_state.last_provisional_candle,
+            'trailing': symbol_state.trailing.to_dict() if symbol_state.trailing is not None else None,
+            'dtype': dtype.str,
+        })
+        # padding تا آرایه بعدی روی مرز 8 بایت شروع شود
+        padding = np.zeros(_pad8(values.nbytes), dtype=np.uint8)
+        for array in (timestamps, values, padding):
+            chunks.append(array.tobytes())
+            offset += array.nbytes
+
+    meta = json.dumps({'window_size': state.window_size, 'entries': entries},
+                      separators=(',', ':')).encode('utf-8')
+    meta += b' ' * _pad8(HEADER.size + len(meta))
+    data = b''.join(chunks)
+    checksum = zlib.crc32(data, zlib.crc32(meta))
+    header = HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, 0, len(meta), len(data),
+                         time.time(), checksum)
+
+    # نوشتن اتمیک تا اسنپ‌شات نیمه‌کاره جایگزین نسخه سالم نشود
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(header)
+        f.write(meta)
+        f.write(data)
+    os.replace(tmp_path, path)
+    return HEADER.size + len(meta) + len(data)
+
+def load_snapshot(path, window_size=None, max_age=STATE_SNAPSHOT_MAX_AGE_SECONDS, now=None):
+    """بازیابی وضعیت از اسنپ‌شات با memory-map؛ در صورت خرابی SnapshotError"""
+    now = time.time() if now is None else now
+
+    with open(path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        if size < HEADER.size:
+            raise SnapshotError("فایل اسنپ‌شات کوتاه‌تر از هدر است")
+        # آرایه‌ها از نگاشت کپی می‌شوند و هیچ view ای بیرون نمی‌ماند، پس نگاشت
+        # با خروج از with (حتی پس از خطا) بسته می‌شود
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            return _load_mapped(mapped, size, window_size, max_age, now)
+
+def _load_mapped(mapped, size, window_size, max_age, now):
+    magic, version, _, meta_len, data_len, created_at, checksum = HEADER.unpack_from(mapped)
+    if magic != SNAPSHOT_MAGIC:
+        raise SnapshotError("امضای فایل اسنپ‌شات نامعتبر است")
+    if version != SNAPSHOT_VERSION:
+        raise SnapshotError(f"نسخه اسنپ‌شات پشتیبانی نمی‌شود: {version}")
+    if HEADER.size + meta_len + data_len != size:
+        raise SnapshotError("طول فایل اسنپ‌شات با هدر همخوانی ندارد")
+    if now - created_at > max_age:
+        raise SnapshotError(f"اسنپ‌شات قدیمی است ({now - created_at:.0f} ثانیه)")
+
+    data_offset = HEADER.size + meta_len
+    with memoryview(mapped) as view:
+        valid = zlib.crc32(view[data_offset:], zlib.crc32(view[HEADER.size:data_offset])) == checksum
+    if not valid:
+        raise SnapshotError("checksum اسنپ‌شات نادرست است")
+
+    try:
+        meta = json.loads(mapped[HEADER.size:data_offset])
+    except ValueError as e:
+        raise SnapshotError(f"متادیتای اسنپ‌شات نامعتبر است: {e}")
+    if window_size is not None and meta['window_size'] != window_size:
+        raise SnapshotError("اندازه پنجره اسنپ‌شات با تنظیمات فعلی متفاوت است")
+
+    state = MarketState(window_size=meta['window_size'])
+    for entry in meta['entries']:
+        _restore_entry(state, entry, mapped, data_offset)
+    return state, created_at
+
+def _restore_entry(state, entry, mapped, data_offset):
+    """ساخت وضعیت یک نماد از بخش داده‌های اسنپ‌شات"""
+    rows = entry['rows']
+    offset = data_offset + entry['offset']
+    # کپی مستقل از نگاشت فایل تا mmap پس از بازیابی بسته شود
+    timestamps = np.frombuffer(mapped, dtype='<i8', count=rows, offset=offset).copy()
+    offset += timestamps.nbytes
+    dtype = np.dtype(entry.get('dtype', '<f8'))
+    values = np.frombuffer(mapped, dtype=dtype, count=rows * len(OHLCV_COLUMNS), offset=offset)
+    values = values.reshape(len(OHLCV_COLUMNS), rows).astype(STORAGE_DTYPE)
+
+    window = pd.DataFrame(
+        {column: values[i] for i, column in enumerate(OHLCV_COLUMNS)},
+        index=pd.to_datetime(timestamps, unit='s')
+    )
+    window.index.name = 'timestamp'
+
+    symbol_state = state.get(entry['symbol'], entry['timeframe'])
+    symbol_state.window = window
+    symbol_state.last_candle = entry['last_candle']
+    symbol_state.last_signal_candle = entry['last_signal_candle']
+    symbol_state.last_provisional_candle = entry.get('last_provisional_candle')
+    if entry.get('trailing') is not None:
+        symbol_state.trailing = TrailingState.from_dict(entry['trailing'])
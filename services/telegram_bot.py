@@ -1,11 +1,59 @@
+import html
+import re
+
 import requests
-from config.config import TELEGRAM_BOT_TOKEN, TELEGRAM_CHAT_ID
+from config.config import TELEGRAM_BOT_TOKEN, TELEGRAM_CHAT_ID, TELEGRAM_MESSAGE_LIMIT
+
+SIGNAL_TEMPLATE = """
+{title}
+
+📊 <b>نماد:</b> {symbol}
+🎯 <b>نوع سیگنال:</b> {signal_type}
+💰 <b>ورود:</b> {entry}
+
+📉 <b>حد ضرر (SL):</b> {sl}
+📈 <b>حد سود ۱ (TP1):</b> {tp1}
+📈 <b>حد سود ۲ (TP2):</b> {tp2}
+📈 <b>حد سود ۳ (TP3):</b> {tp3}
+
+⚖️ <b>ریسک به ریوارد:</b> ۱:۳
+⏰ <b>تایم فریم:</b> ۱۵ دقیقه
+
+⚠️ <i>این یک سیگنال اتوماتیک است. مسئولیت معاملات بر عهده خودتان است.</i>
+        """
+SIGNAL_TITLE = "🚀 <b>سیگنال معاملاتی جدید</b> 🚀"
+# سیگنال کندل در حال تشکیل (بین چرخه‌ها)؛ با بسته شدن کندل ممکن است تایید نشود
+PROVISIONAL_SIGNAL_TITLE = "⏳ <b>سیگنال موقت - کندل هنوز بسته نشده</b> ⏳"
+DIGEST_HEADER_TEMPLATE = "📋 <b>خلاصه سیگنال‌ها</b> ({count} سیگنال) - بخش {part}/{parts}\n\n"
+DIGEST_LINE_TEMPLATE = "{icon} <b>{symbol}</b> {signal_type}{marker} | ورود: {entry} | SL: {sl} | TP: {tp1} / {tp2} / {tp3}"
+PROVISIONAL_DIGEST_MARKER = " ⏳ <i>(موقت)</i>"
+DIGEST_FOOTER = "\n\n⚠️ <i>این سیگنال‌ها اتوماتیک هستند. مسئولیت معاملات بر عهده خودتان است.</i>"
+
+_HTML_TAG = re.compile(r'<[^>]+>')
+
+# قالب‌ها یک بار در سطح ماژول آماده می‌شوند و برای هر سیگنال فقط پر می‌شوند
+_render_signal = SIGNAL_TEMPLATE.format
+_render_digest_header = DIGEST_HEADER_TEMPLATE.format
+_render_digest_line = DIGEST_LINE_TEMPLATE.format
 
 class TelegramBot:
     def __init__(self):
         self.token = TELEGRAM_BOT_TOKEN
         self.chat_id = TELEGRAM_CHAT_ID
         self.base_url = f"https://api.telegram.org/bot{self.token}"
+        # نشست HTTP پایدار؛ پس از warm_up اتصال باز می‌ماند
+        self.session = None
+    
+    def warm_up(self):
+        """باز کردن اتصال پایدار به API تلگرام قبل از ارسال سیگنال‌ها"""
+        if self.session is None:
+            self.session = requests.Session()
+        try:
+            response = self.session.get(f"{self.base_url}/getMe", timeout=10)
+            return response.status_code == 200
+        except Exception as e:
+            print(f"Error warming up Telegram connection: {e}")
+            return False
     
     def send_message(self, text):
         url = f"{self.base_url}/sendMessage"
@@ -16,28 +64,93 @@ class TelegramBot:
         }
         
         try:
-            response = requests.post(url, json=payload)
+            if self.session is not None:
+                response = self.session.post(url, json=payload, timeout=10)
+            else:
+                response = requests.post(url, json=payload)
             return response.status_code == 200
         except Exception as e:
             print(f"Error sending message to Telegram: {e}")
             return False
     
-    def format_signal_message(self, symbol, signal_type, entry, sl, tp1, tp2, tp3):
-        message = f"""
-🚀 <b>سیگنال معاملاتی جدید</b> 🚀
-
-📊 <b>نماد:</b> {symbol}
-🎯 <b>نوع سیگنال:</b> {signal_type}
-💰 <b>ورود:</b> {entry}
-
-📉 <b>حد ضرر (SL):</b> {sl}
-📈 <b>حد سود ۱ (TP1):</b> {tp1}
-📈 <b>حد سود ۲ (TP2):</b> {tp2}
-📈 <b>حد سود ۳ (TP3):</b> {tp3}
-
-⚖️ <b>ریسک به ریوارد:</b> ۱:۳
-⏰ <b>تایم فریم:</b> ۱۵ دقیقه
-
-⚠️ <i>این یک سیگنال اتوماتیک است. مسئولیت معاملات بر عهده خودتان است.</i>
-        """
-        return message
+    def send_digest(self, lines):
+        """ارسال خطوط خلاصه در کمترین تعداد پیام؛ خروجی وضعیت تحویل هر خط"""
+        chunks = self.split_digest(lines)
+        delivered = []
+        for part, chunk in enumerate(chunks, 1):
+            text = self.render_digest(chunk, part, len(chunks), len(lines))
+            delivered.extend([self.send_message(text)] * len(chunk))
+        return delivered
+    
+    @staticmethod
+    def signal_fields(signal, symbol):
+        """فیلدهای قالب پیام از دیکشنری سیگنال استراتژی"""
+        return {
+            'symbol': symbol,
+            'signal_type': 'خرید' if signal['type'] == 'BUY' else 'فروش',
+            'entry': round(signal['entry'], 4),
+            'sl': round(signal['sl'], 4),
+            'tp1': round(signal['tp1'], 4),
+            'tp2': round(signal['tp2'], 4),
+            'tp3': round(signal['tp3'], 4),
+            'provisional': bool(signal.get('provisional', False)),
+        }
+    
+    def format_signal_message(self, symbol, signal_type, entry, sl, tp1, tp2, tp3, provisional=False):
+        return _render_signal(
+            title=PROVISIONAL_SIGNAL_TITLE if provisional else SIGNAL_TITLE,
+            symbol=symbol, signal_type=signal_type, entry=entry,
+            sl=sl, tp1=tp1, tp2=tp2, tp3=tp3
+        )
+    
+    def format_digest_line(self, symbol, signal_type, entry, sl, tp1, tp2, tp3, provisional=False):
+        """یک خط فشرده از پیام خلاصه برای هر سیگنال"""
+        return _render_digest_line(
+            icon='🟢' if signal_type == 'خرید' else '🔴', symbol=symbol,
+            signal_type=signal_type, marker=PROVISIONAL_DIGEST_MARKER if provisional else '',
+            entry=entry, sl=sl, tp1=tp1, tp2=tp2, tp3=tp3
+        )
+    
+    @staticmethod
+    def render_digest(lines, part, parts, total):
+        header = _render_digest_header(count=total, part=part, parts=parts)
+        return header + "\n".join(lines) + DIGEST_FOOTER
+    
+    @staticmethod
+    def truncate_line(line, limit):
+        """کوتاه کردن خط HTML روی متن ساده تا برچسب یا entity نیمه‌کاره در پیام نماند"""
+        pieces = [html.escape(char, quote=False) for char in html.unescape(_HTML_TAG.sub('', line))]
+        size = 0
+        for count, piece in enumerate(pieces):
+            size += len(piece)
+            if size > limit:
+                return ''.join(pieces[:count])
+        return ''.join(pieces)
+    
+    @staticmethod
+    def split_digest(lines, limit=TELEGRAM_MESSAGE_LIMIT):
+        """تقسیم خطوط به گروه‌هایی که پیام هر گروه از محدودیت طول تلگرام بیشتر نشود"""
+        if not lines:
+            return []
+        # حداکثر طول سرصفحه: شماره بخش‌ها هرگز از تعداد خطوط بیشتر نمی‌شود
+        total = len(lines)
+        budget = limit - len(_render_digest_header(count=total, part=total, parts=total)) - len(DIGEST_FOOTER)
+        
+        chunks = []
+        current = []
+        size = 0
+        for line in lines:
+            if len(line) > budget:
+                line = TelegramBot.truncate_line(line, budget)
+            # +1 برای کاراکتر خط جدید بین خطوط
+            added = len(line) + (1 if current else 0)
+            if current and size + added > budget:
+                chunks.append(current)
+                current = []
+                size = 0
+                added = len(line)
+            current.append(line)
+            size += added
+        if current:
+            chunks.append(current)
+        return chunks
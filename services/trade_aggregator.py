@@ -0,0 +1,300 @@
+import logging
+
+import numpy as np
+import pandas as pd
+
+from config.config import TIMEFRAME, TRADE_POLL_LIMIT
+from strategies import indicators
+from utils.time_utils import timeframe_to_seconds
+
+logger = logging.getLogger(__name__)
+
+OHLCV_COLUMNS = ['open', 'high', 'low', 'close', 'volume']
+SMA_WINDOWS = (20, 50, 100)
+RSI_PERIOD = 14
+BB_WINDOW = 20
+MACD_FAST, MACD_SLOW, MACD_SIGNAL = 12, 26, 9
+# کندل‌های بسته شده از روی معاملات که هنوز با kline تایید نشده‌اند
+MAX_TRADE_CLOSED_BARS = 8
+
+def _ema_step(previous, value, span):
+    """یک گام ewm(span, adjust=False)؛ مقدار اول خود داده است"""
+    if np.isnan(previous):
+        return value
+    return previous + 2 / (span + 1) * (value - previous)
+
+class PartialCandle:
+    """انباره فشرده کندل در حال تشکیل یک نماد"""
+
+    __slots__ = ('open_time', 'open', 'high', 'low', 'close', 'volume', 'trades', 'as_of_ms', 'complete')
+
+    def __init__(self, open_time, open_, high, low, close, volume=0.0, as_of_ms=0, complete=True):
+        self.open_time = open_time  # زمان باز شدن کندل (ثانیه یونیکس)
+        self.open = open_
+        self.high = high
+        self.low = low
+        self.close = close
+        self.volume = volume
+        self.trades = 0
+        # معاملات تا این لحظه (میلی‌ثانیه) در snapshot kline آمده‌اند
+        self.as_of_ms = as_of_ms
+        # False یعنی از وسط کندل شروع شده و open/high/low آن ناقص است
+        self.complete = complete
+
+    def update(self, prices, amounts):
+        self.high = max(self.high, float(prices.max()))
+        self.low = min(self.low, float(prices.min()))
+        self.close = float(prices[-1])
+        self.volume += float(amounts.sum())
+        self.trades += len(prices)
+
+    def row(self):
+        return [self.open, self.high, self.low, self.close, self.volume]
+
+class ProvisionalIndicators:
+    """حالت اندیکاتورهای calculate_indicators تا آخرین کندل بسته شده
+
+    یک بار در هر کندل از قیمت‌های بسته شدن ساخته می‌شود و مقدار اندیکاتورهای
+    کندل موقت را برای هر قیمت جدید با O(1) می‌دهد.
+    """
+
+    __slots__ = ('key', 'last_close', 'sums', 'bb_shift', 'bb_s1', 'bb_s2',
+                 'gain', 'loss', 'ema_fast', 'ema_slow', 'signal', 'previous')
+
+    def __init__(self, closes, key=None):
+        closes = np.asarray(closes, dtype=np.float64)
+        self.key = key
+        # مقادیر آخرین کندل بسته شده (ردیف قبلی کندل موقت)
+        self._prepare(closes[:-1])
+        self.previous = self.evaluate(float(closes[-1]))
+        self._prepare(closes)
+
+    def _prepare(self, closes):
+        n = len(closes)
+        self.last_close = float(closes[-1]) if n else np.nan
+        self.sums = {
+            window: float(closes[n - window + 1:].sum()) if n >= window - 1 else np.nan
+            for window in SMA_WINDOWS
+        }
+
+        # واریانس بولینگر با مقادیر انتقال یافته حول میانگین برای دقت عددی
+        if n >= BB_WINDOW - 1:
+            tail = closes[n - BB_WINDOW + 1:]
+            self.bb_shift = float(tail.mean())
+            shifted = tail - self.bb_shift
+            self.bb_s1 = float(shifted.sum())
+            self.bb_s2 = float(shifted @ shifted)
+        else:
+            self.bb_shift = self.bb_s1 = self.bb_s2 = np.nan
+
+        # میانگین‌های Wilder سود و زیان تا آخرین کندل؛ وقتی کندل موقت اولین RSI
+        # معتبر را می‌سازد میانگین ساده RSI_PERIOD - 1 تغییر قبلی نگه داشته می‌شود
+        # تا evaluate با همان گام Wilder مقدار اولیه را بدهد
+        if n > RSI_PERIOD:
+            work = np.empty((2, n))
+            indicators.rsi(closes, RSI_PERIOD, work=work)
+            self.gain, self.loss = (float(value) for value in work[:, -1])
+        elif n == RSI_PERIOD:
+            deltas = np.diff(closes)
+            self.gain = float(deltas[deltas > 0].sum()) / (RSI_PERIOD - 1)
+            self.loss = float(-deltas[deltas < 0].sum()) / (RSI_PERIOD - 1)
+        else:
+            self.gain = self.loss = np.nan
+
+        if n:
+            series = pd.Series(closes)
+            fast = series.ewm(span=MACD_FAST, adjust=False).mean()
+            slow = series.ewm(span=MACD_SLOW, adjust=False).mean()
+            self.ema_fast = float(fast.iloc[-1])
+            self.ema_slow = float(slow.iloc[-1])
+            self.signal = float((fast - slow).ewm(span=MACD_SIGNAL, adjust=False).mean().iloc[-1])
+        else:
+            self.ema_fast = self.ema_slow = self.signal = np.nan
+
+    def evaluate(self, close):
+        """اندیکاتورهای کندل موقت با قیمت بسته شدن close"""
+        values = {f'sma_{window}': (self.sums[window] + close) / window for window in SMA_WINDOWS}
+
+        delta = close - self.last_close if not np.isnan(self.last_close) else 0.0
+        gain = np.float64(self.gain * (RSI_PERIOD - 1) + max(delta, 0.0)) / RSI_PERIOD
+        loss = np.float64(self.loss * (RSI_PERIOD - 1) + max(-delta, 0.0)) / RSI_PERIOD
+        with np.errstate(divide='ignore', invalid='ignore'):
+            values['rsi'] = float(100 - 100 / (1 + gain / loss))
+
+        macd = _ema_step(self.ema_fast, close, MACD_FAST) - _ema_step(self.ema_slow, close, MACD_SLOW)
+        signal = _ema_step(self.signal, macd, MACD_SIGNAL)
+        values['macd'] = macd
+        values['macd_signal'] = signal
+        values['macd_histogram'] = macd - signal
+
+        shifted = close - self.bb_shift
+        s1 = self.bb_s1 + shifted
+        s2 = self.bb_s2 + shifted * shifted
+        std = np.sqrt(max((s2 - s1 * s1 / BB_WINDOW) / (BB_WINDOW - 1), 0.0))
+        values['bb_middle'] = values['sma_20']
+        values['bb_upper'] = values['sma_20'] + std * 2
+        values['bb_lower'] = values['sma_20'] - std * 2
+        return values
+
+class TradeAggregator:
+    """ساخت کندل در حال تشکیل هر نماد از معاملات لحظه‌ای (polling یا وب‌سوکت)
+
+    پنجره kline آخرین snapshot کندل جاری را می‌دهد (anchor) و معاملات بعد از آن
+    به صورت دسته‌ای در انباره نماد اعمال می‌شوند؛ کندل موقت حاصل همراه با
+    اندیکاتورهای افزایشی به استراتژی داده می‌شود.
+    """
+
+    def __init__(self, timeframe=TIMEFRAME, poll_limit=TRADE_POLL_LIMIT):
+        self.timeframe = timeframe
+        self.interval = timeframe_to_seconds(timeframe)
+        self.poll_limit = poll_limit
+        self.candles = {}
+        self.last_ids = {}
+        self.closed_bars = {}
+        self.indicators = {}
+
+    def anchor(self, symbol, window, now):
+        """همگام‌سازی با پنجره kline تازه دریافت شده در لحظه now (ثانیه یونیکس)"""
+        if window is None or not len(window):
+            return
+        open_time = int(window.index[-1].timestamp())
+        self.closed_bars[symbol] = [
+            bar for bar in self.closed_bars.get(symbol, []) if bar[0] > open_time
+        ]
+
+        candle = self.candles.get(symbol)
+        if candle is not None and candle.open_time > open_time:
+            return
+        if open_time + self.interval > now:
+            # kline آخر هنوز باز است و تا لحظه now کامل است
+            row = window.iloc[-1]
+            self.candles[symbol] = PartialCandle(
+                open_time, float(row['open']), float(row['high']), float(row['low']),
+                float(row['close']), float(row['volume']), as_of_ms=int(now * 1000)
+            )
+        else:
+            self.candles.pop(symbol, None)
+
+    def ingest(self, symbol, deals):
+        """اعمال دسته معاملات ([{id, price, amount, date_ms}, ...])؛ خروجی تعداد معاملات جدید"""
+        if not deals:
+            return 0
+        ids = np.fromiter((int(deal['id']) for deal in deals), dtype=np.int64, count=len(deals))
+        fresh = ids > self.last_ids.get(symbol, 0)
+        if not fresh.any():
+            return 0
+
+        # معاملات API جدیدترین اول هستند؛ اعمال به ترتیب شناسه
+        positions = np.flatnonzero(fresh)[np.argsort(ids[fresh], kind='stable')]
+        batch = [deals[i] for i in positions]
+        prices = np.fromiter((float(deal['price']) for deal in batch), dtype=np.float64, count=len(batch))
+        amounts = np.fromiter((float(deal['amount']) for deal in batch), dtype=np.float64, count=len(batch))
+        times = np.fromiter(
+            (int(deal.get('date_ms') or int(deal['date']) * 1000) for deal in batch),
+            dtype=np.int64, count=len(batch)
+        )
+        self.last_ids[symbol] = int(ids[positions[-1]])
+        buckets = times // 1000 // self.interval * self.interval
+
+        candle = self.candles.get(symbol)
+        applied = 0
+        for bucket in np.unique(buckets):
+            bucket = int(bucket)
+            mask = buckets == bucket
+            if candle is not None and bucket < candle.open_time:
+                # معامله دیرهنگام کندل قبلی؛ kline بعدی آن را اصلاح می‌کند
+                continue
+            if candle is not None and bucket == candle.open_time:
+                mask &= times > candle.as_of_ms
+                if not mask.any():
+                    continue
+            else:
+                if candle is not None:
+                    self._close_bar(symbol, candle)
+                first = float(prices[mask][0])
+                # کندل بعد از کندل پیگیری شده از ابتدا کامل است
+                candle = PartialCandle(bucket, first, first, first, first, complete=candle is not None)
+                self.candles[symbol] = candle
+            candle.update(prices[mask], amounts[mask])
+            applied += int(mask.sum())
+        return applied
+
+    def _close_bar(self, symbol, candle):
+        bars = self.closed_bars.setdefault(symbol, [])
+        if candle.complete:
+            bars.append((candle.open_time, *candle.row()))
+            del bars[:-MAX_TRADE_CLOSED_BARS]
+        else:
+            bars.clear()
+
+    def poll(self, api, symbol):
+        """دریافت معاملات جدید نماد از API و اعمال آن‌ها"""
+        deals = api.get_deals(symbol, self.last_ids.get(symbol, 0), self.poll_limit)
+        return self.ingest(symbol, deals)
+
+    def provisional_bar(self, symbol):
+        """کندل موقت نماد ([زمان باز شدن، open، high، low، close، volume]) یا None"""
+        candle = self.candles.get(symbol)
+        if candle is None or not candle.complete:
+            return None
+        return [candle.open_time, *candle.row()]
+
+    def _history(self, symbol, candle, window):
+        """کندل‌های بسته شده پیش از کندل موقت
+
+        کندل‌های بسته شده از معاملات جایگزین ردیف‌های قدیمی‌تر پنجره kline می‌شوند.
+        """
+        bars = self.closed_bars.get(symbol, [])
+        cutoff = bars[0][0] if bars else candle.open_time
+        history = window[window.index < pd.Timestamp(cutoff, unit='s')][OHLCV_COLUMNS]
+        if bars:
+            history = pd.concat([history, pd.DataFrame(
+                [bar[1:] for bar in bars], columns=OHLCV_COLUMNS,
+                index=pd.to_datetime([bar[0] for bar in bars], unit='s')
+            )])
+        return history
+
+    def provisional_window(self, symbol, window):
+        """کل پنجره با کندل موقت به عنوان ردیف آخر (بدون اندیکاتور)؛ None اگر آماده نباشد
+
+        برای حالت‌هایی از استراتژی که به جای دو ردیف آخر کل تاریخچه را لازم دارند.
+        """
+        candle = self.candles.get(symbol)
+        if candle is None or not candle.complete or window is None or not len(window):
+            return None
+        history = self._history(symbol, candle, window)
+        if len(history) < 2:
+            return None
+        current = pd.DataFrame([candle.row()], columns=OHLCV_COLUMNS,
+                               index=[pd.Timestamp(candle.open_time, unit='s')])
+        frame = pd.concat([history, current])
+        frame.index.name = 'timestamp'
+        return frame
+
+    def provisional_frame(self, symbol, window):
+        """دو ردیف آخر با اندیکاتورها: آخرین کندل بسته شده و کندل موقت؛ None اگر آماده نباشد
+
+        اندیکاتورهای کندل‌های بسته شده فقط وقتی کندل جدیدی بسته شود دوباره
+        ساخته می‌شوند، پس هزینه هر دسته معامله O(1) است.
+        """
+        candle = self.candles.get(symbol)
+        if candle is None or not candle.complete or window is None or not len(window):
+            return None
+
+        key = (candle.open_time, window.index[-1], len(self.closed_bars.get(symbol, [])))
+        indicators = self.indicators.get(symbol)
+        if indicators is None or indicators.key != key:
+            history = self._history(symbol, candle, window)
+            if len(history) < 2:
+                return None
+            indicators = self.indicators[symbol] = ProvisionalIndicators(history['close'].to_numpy(), key)
+            indicators.previous = {
+                'time': history.index[-1], **history.iloc[-1].to_dict(), **indicators.previous
+            }
+
+        previous = dict(indicators.previous)
+        index = [previous.pop('time'), pd.Timestamp(candle.open_time, unit='s')]
+        current = dict(zip(OHLCV_COLUMNS, candle.row()), **indicators.evaluate(candle.close))
+        frame = pd.DataFrame([previous, current], index=index)
+        frame.index.name = 'timestamp'
+        return frame
@@ -0,0 +1,237 @@
+import logging
+
+import numpy as np
+import pandas as pd
+
+from utils.dtype_policy import ACCUMULATOR_DTYPE
+from strategies import indicators
+from strategies.indicators import true_range
+
+logger = logging.getLogger(__name__)
+
+LONG = 1
+SHORT = -1
+_SIDES = {LONG: 'BUY', SHORT: 'SELL', 0: None}
+
+# طول اولین بازه پیش‌بینی هر روند در کرنل دسته‌ای (با هر بار ادامه روند دو برابر می‌شود)
+_INITIAL_CHUNK = 64
+
+def _as_float(values):
+    return np.asarray(values, dtype=ACCUMULATOR_DTYPE)
+
+def _ewm_step(previous, value, alpha):
+    """یک گام ewm(adjust=False) با همان فرمول pandas"""
+    old_weight = 1 - alpha
+    return (old_weight * previous + alpha * value) / (old_weight + alpha)
+
+def heikin_ashi_candles(open_, high, low, close):
+    """کندل‌های Heikin-Ashi؛ خروجی (open, high, low, close)"""
+    open_, high, low, close = _as_float(open_), _as_float(high), _as_float(low), _as_float(close)
+    ha_close = (open_ + high + low + close) / 4
+    # ha_open[i] = (ha_open[i-1] + ha_close[i-1]) / 2 هم بازگشت خطی (ewm با alpha=0.5) است
+    seeded = np.empty(len(close))
+    if len(close):
+        seeded[0] = (open_[0] + close[0]) / 2
+        seeded[1:] = ha_close[:-1]
+    ha_open = pd.Series(seeded).ewm(alpha=0.5, adjust=False).mean().to_numpy()
+    ha_high = np.maximum(high, np.maximum(ha_open, ha_close))
+    ha_low = np.minimum(low, np.minimum(ha_open, ha_close))
+    return ha_open, ha_high, ha_low, ha_close
+
+def trailing_stop(source, loss):
+    """حد ضرر متحرک ATR (UT Bot) روی کل تاریخچه؛ خروجی (stop, direction)
+
+    بازگشت stop غیرخطی است ولی در هر روند فقط بیشینه (یا کمینه) تجمعی
+    source ∓ loss است. به جای حلقه کندل به کندل، هر روند با np.maximum.accumulate
+    (یا minimum) روی یک بازه پیش رو محاسبه و اولین کندل شکست با argmax پیدا
+    می‌شود؛ تعداد گام‌های پایتونی به تعداد تغییر روندها بستگی دارد.
+    direction برای کندل‌های گرم شدن ATR صفر و stop آن‌ها nan است.
+    """
+    source, loss = _as_float(source), _as_float(loss)
+    n = len(source)
+    stop = np.full(n, np.nan)
+    direction = np.zeros(n, dtype=np.int8)
+    valid = np.flatnonzero(~np.isnan(loss))
+    if not len(valid):
+        return stop, direction
+
+    # حد قبلی پیش از اولین ATR معتبر صفر است (nz در Pine) پس روند اول صعودی است
+    start = int(valid[0])
+    stop[start] = max(0.0, source[start] - loss[start])
+    direction[start] = LONG
+    chunk = _INITIAL_CHUNK
+
+    while start < n - 1:
+        end = min(n, start + 1 + chunk)
+        x = source[start + 1:end]
+        if direction[start] == LONG:
+            run = np.maximum.accumulate(np.maximum(x - loss[start + 1:end], stop[start]))
+        else:
+            run = np.minimum.accumulate(np.minimum(x + loss[start + 1:end], stop[start]))
+        previous = np.empty(len(run))
+        previous[0] = stop[start]
+        previous[1:] = run[:-1]
+        # روند صعودی تا وقتی ادامه دارد که قیمت بالای حد قبلی بماند (نزولی برعکس)
+        broken = x <= previous if direction[start] == LONG else x >= previous
+
+        if not broken.any():
+            stop[start + 1:end] = run
+            direction[start + 1:end] = direction[start]
+            start = end - 1
+            chunk *= 2
+            continue
+
+        k = int(np.argmax(broken))
+        stop[start + 1:start + 1 + k] = run[:k]
+        direction[start + 1:start + 1 + k] = direction[start]
+        at = start + 1 + k
+        # شروع روند جدید؛ برابری قیمت با حد قبلی روند نزولی را از نو شروع می‌کند
+        if x[k] > previous[k]:
+            stop[at], direction[at] = x[k] - loss[at], LONG
+        else:
+            stop[at], direction[at] = x[k] + loss[at], SHORT
+        start = at
+        chunk = _INITIAL_CHUNK
+
+    return stop, direction
+
+def crossings(direction):
+    """سیگنال‌های هر کندل: 1 خرید (شروع روند صعودی)، -1 فروش، 0 بدون سیگنال"""
+    signals = np.zeros(len(direction), dtype=np.int8)
+    if len(direction) > 1:
+        changed = (direction[1:] != direction[:-1]) & (direction[:-1] != 0)
+        signals[1:][changed] = direction[1:][changed]
+    return signals
+
+class TrailingState:
+    """وضعیت افزایشی حد ضرر متحرک یک نماد برای به‌روزرسانی O(1) با هر کندل بسته شده
+
+    from_history همان کرنل دسته‌ای را اجرا و وضعیت انتهای آن را نگه می‌دارد؛
+    update برای کندل بعدی همان نتیجه trailing_stop روی تاریخچه کامل را می‌دهد
+    (ATR افزایشی تا خطای گرد کردن با indicators.atr برابر است).
+    """
+
+    __slots__ = ('sensitivity', 'period', 'heikin_ashi', 'last_time', 'count', 'tr_sum',
+                 'previous_close', 'atr', 'ha_open', 'ha_close', 'source', 'stop', 'direction', 'signal')
+
+    def __init__(self, sensitivity, period, heikin_ashi=False):
+        self.sensitivity = sensitivity
+        self.period = period
+        self.heikin_ashi = heikin_ashi
+        self.last_time = None
+        self.count = 0
+        self.tr_sum = 0.0
+        self.previous_close = None
+        self.atr = np.nan
+        self.ha_open = None
+        self.ha_close = None
+        self.source = None
+        self.stop = np.nan
+        self.direction = 0
+        # سیگنال آخرین کندل اعمال شده
+        self.signal = None
+
+    def copy(self):
+        """کپی مستقل وضعیت (برای ارزیابی کندل در حال تشکیل بدون تغییر وضعیت اصلی)"""
+        clone = TrailingState.__new__(TrailingState)
+        for name in self.__slots__:
+            setattr(clone, name, getattr(self, name))
+        return clone
+
+    def to_dict(self):
+        """وضعیت به صورت dict قابل ذخیره در JSON (زمان آخرین کندل به ثانیه یونیکس)"""
+        values = {name: getattr(self, name) for name in self.__slots__}
+        if values['last_time'] is not None:
+            values['last_time'] = int(pd.Timestamp(values['last_time']).timestamp())
+        return values
+
+    @classmethod
+    def from_dict(cls, values):
+        """ساخت دوباره وضعیت از خروجی to_dict"""
+        state = cls.__new__(cls)
+        for name in cls.__slots__:
+            setattr(state, name, values[name])
+        if state.last_time is not None:
+            state.last_time = pd.Timestamp(state.last_time, unit='s')
+        return state
+
+    @classmethod
+    def from_history(cls, open_, high, low, close, sensitivity, period, heikin_ashi=False, last_time=None):
+        """ساخت وضعیت از تاریخچه با کرنل دسته‌ای"""
+        state = cls(sensitivity, period, heikin_ashi)
+        n = len(close)
+        if not n:
+            return state
+        open_, high, low, close = _as_float(open_), _as_float(high), _as_float(low), _as_float(close)
+        atr = indicators.atr(high, low, close, period)
+        source = close
+        if heikin_ashi:
+            ha_open, _, _, source = heikin_ashi_candles(open_, high, low, close)
+            state.ha_open, state.ha_close = float(ha_open[-1]), float(source[-1])
+        stop, direction = trailing_stop(source, sensitivity * atr)
+
+        state.last_time = last_time
+        state.count = n
+        state.tr_sum = float(np.add.accumulate(true_range(high, low, close))[-1]) if n < period else 0.0
+        state.previous_close = float(close[-1])
+        state.atr = float(atr[-1])
+        state.source = float(source[-1])
+        state.stop = float(stop[-1])
+        state.direction = int(direction[-1])
+        state.signal = _SIDES[int(crossings(direction[-2:])[-1])]
+        return state
+
+    def _update_atr(self, high, low, close):
+        if self.previous_close is None:
+            tr = high - low
+        else:
+            tr = max(high - low, abs(high - self.previous_close), abs(low - self.previous_close))
+        self.previous_close = close
+        self.count += 1
+        if self.count < self.period:
+            self.tr_sum += tr
+        elif self.count == self.period:
+            self.atr = (self.tr_sum + tr) / self.period
+        else:
+            self.atr = _ewm_step(self.atr, tr, 1 / self.period)
+        return self.atr
+
+    def _update_source(self, open_, high, low, close):
+        if not self.heikin_ashi:
+            return close
+        ha_close = (open_ + high + low + close) / 4
+        if self.ha_open is None:
+            self.ha_open = (open_ + close) / 2
+        else:
+            self.ha_open = _ewm_step(self.ha_open, self.ha_close, 0.5)
+        self.ha_close = ha_close
+        return ha_close
+
+    def update(self, open_, high, low, close, candle_time=None):
+        """اعمال یک کندل بسته شده؛ خروجی 'BUY'، 'SELL' یا None"""
+        atr = self._update_atr(float(high), float(low), float(close))
+        source = self._update_source(float(open_), float(high), float(low), float(close))
+        previous_source, previous_stop, previous_direction = self.source, self.stop, self.direction
+        self.source = source
+        self.last_time = candle_time
+
+        self.signal = None
+        if np.isnan(atr):
+            return None
+        loss = self.sensitivity * atr
+        if previous_direction == 0:
+            self.stop, self.direction = max(0.0, source - loss), LONG
+            return None
+
+        if previous_direction == LONG and source > previous_stop:
+            self.stop = max(previous_stop, source - loss)
+        elif previous_direction == SHORT and source < previous_stop:
+            self.stop = min(previous_stop, source + loss)
+        elif source > previous_stop:
+            self.stop, self.direction = source - loss, LONG
+        else:
+            self.stop, self.direction = source + loss, SHORT
+
+        if self.direction != previous_direction:
+            self.signal = _SIDES[self.direction]
+        return self.signal
@@ -0,0 +1,200 @@
+import numpy as np
+
+from utils.dtype_policy import ACCUMULATOR_DTYPE
+
+# کرنل‌های numpy اندیکاتورها روی محور آخر (زمان)
+#
+# ورودی یک سری (n,) یا چند سری هم‌طول (نماد، n) است و باید متناهی باشد.
+# هر کرنل بافر خروجی اختیاری out= با همان شکل (یا (3, ...) برای خروجی‌های
+# سه‌تایی) و نوع float64 می‌پذیرد تا استراتژی‌ها بتوانند حافظه را بین چرخه‌ها
+# دوباره استفاده کنند. کندل‌های گرم شدن مثل pandas با nan پر می‌شوند.
+
+# حداکثر ضریب w^-k در هر بلوک فیلتر بازگشتی (کنترل خطای ممیز شناور)
+_MAX_BLOCK_GAIN = 1e8
+_MAX_BLOCK = 256
+
+def _prepare(values):
+    values = np.asarray(values, dtype=ACCUMULATOR_DTYPE)
+    if values.ndim not in (1, 2):
+        raise ValueError(f"ورودی اندیکاتور باید یک یا دو بعدی باشد، نه {values.ndim} بعدی")
+    return values
+
+def _output(out, shape):
+    if out is None:
+        return np.empty(shape, dtype=ACCUMULATOR_DTYPE)
+    if out.shape != tuple(shape) or out.dtype != ACCUMULATOR_DTYPE:
+        raise ValueError(f"بافر خروجی باید {tuple(shape)} از نوع float64 باشد، نه {out.shape} {out.dtype}")
+    return out
+
+def _check_window(values, window):
+    if window < 1:
+        raise ValueError(f"طول پنجره باید مثبت باشد: {window}")
+    return min(window, values.shape[-1] + 1)
+
+def linear_filter(values, alpha, previous, out):
+    """فیلتر بازگشتی out[t] = (1 - alpha) * out[t-1] + alpha * values[t] با out[-1] = previous
+
+    به جای حلقه روی کندل‌ها، هر بلوک با فرم بسته آن (cumsum وزن‌دار) محاسبه
+    می‌شود؛ طول بلوک طوری است که ضریب w^-k از _MAX_BLOCK_GAIN بیشتر نشود.
+    values و out می‌توانند یک آرایه باشند (محاسبه درجا).
+    """
+    n = values.shape[-1]
+    if not n:
+        return out
+    decay = 1.0 - alpha
+    block = _MAX_BLOCK if decay <= 0 else int(min(_MAX_BLOCK, max(1, np.log(_MAX_BLOCK_GAIN) / -np.log(decay))))
+    steps = np.arange(block)
+    inverse = decay ** -steps if decay > 0 else (steps == 0).astype(ACCUMULATOR_DTYPE)
+    forward = alpha * decay ** steps
+    carry = decay ** (steps + 1)
+
+    previous = np.asarray(previous, dtype=ACCUMULATOR_DTYPE)
+    for start in range(0, n, block):
+        length = min(block, n - start)
+        segment = out[..., start:start + length]
+        np.multiply(values[..., start:start + length], inverse[:length], out=segment)
+        np.cumsum(segment, axis=-1, out=segment)
+        segment *= forward[:length]
+        segment += previous[..., None] * carry[:length]
+        previous = segment[..., -1]
+    return out
+
+def sma(values, window, out=None):
+    """میانگین متحرک ساده (rolling(window).mean())"""
+    values = _prepare(values)
+    out = _output(out, values.shape)
+    window = _check_window(values, window)
+    np.cumsum(values, axis=-1, out=out)
+    # numpy برای عملوندهای هم‌پوشان خودش کپی موقت می‌سازد
+    out[..., window:] -= out[..., :-window]
+    out[..., window - 1:] /= window
+    out[..., :window - 1] = np.nan
+    return out
+
+def rolling_std(values, window, ddof=1, out=None, work=None):
+    """انحراف معیار متحرک (rolling(window).std(ddof))
+
+    هر پنجره حول اولین مقدار خودش مرکز می‌شود تا حذف ارقام در قیمت‌های بزرگ
+    با نوسان کم رخ ندهد و پنجره ثابت دقیقا صفر بدهد؛ جمع‌ها با window گذر
+    برداری روی کل سری ساخته می‌شوند. work بافر کمکی (2، ...) است.
+    """
+    values = _prepare(values)
+    out = _output(out, values.shape)
+    work = _output(work, (2,) + values.shape)
+    window = _check_window(values, window)
+    n = values.shape[-1]
+    out[..., :window - 1] = np.nan
+    if window > n:
+        return out
+    if window <= ddof:
+        out[...] = np.nan
+        return out
+
+    count = n - window + 1
+    first = values[..., :count]
+    total, deviation = work[0][..., :count], work[1][..., :count]
+    squares = out[..., window - 1:]
+    total[...] = 0
+    squares[...] = 0
+    for offset in range(1, window):
+        np.subtract(values[..., offset:offset + count], first, out=deviation)
+        total += deviation
+        np.square(deviation, out=deviation)
+        squares += deviation
+    # var = (Σd² - (Σd)²/w) / (w - ddof) با d فاصله از اولین مقدار پنجره
+    np.square(total, out=total)
+    total /= window
+    squares -= total
+    squares /= window - ddof
+    np.maximum(squares, 0, out=squares)
+    return np.sqrt(out, out=out)
+
+def ema(values, span=None, alpha=None, out=None):
+    """میانگین متحرک نمایی (ewm(span, adjust=False).mean()) با مقدار اولیه اولین کندل"""
+    if (span is None) == (alpha is None):
+        raise ValueError("دقیقا یکی از span یا alpha لازم است")
+    values = _prepare(values)
+    out = _output(out, values.shape)
+    alpha = 2 / (span + 1) if alpha is None else alpha
+    if values.shape[-1]:
+        out[..., 0] = values[..., 0]
+        linear_filter(values[..., 1:], alpha, values[..., 0], out[..., 1:])
+    return out
+
+def _wilder(values, period, out):
+    """میانگین Wilder درجا: مقدار اولیه میانگین ساده values[1:period+1]"""
+    n = values.shape[-1]
+    if n <= period:
+        out[...] = np.nan
+        return out
+    out[..., period] = values[..., 1:period + 1].mean(axis=-1)
+    out[..., :period] = np.nan
+    linear_filter(values[..., period + 1:], 1 / period, out[..., period], out[..., period + 1:])
+    return out
+
+def rsi(values, period=14, out=None, work=None):
+    """RSI با میانگین Wilder؛ work بافر کمکی (2، ...) برای میانگین سود و زیان"""
+    values = _prepare(values)
+    out = _output(out, values.shape)
+    work = _output(work, (2,) + values.shape)
+    gain, loss = work[0], work[1]
+    gain[..., 0] = 0
+    np.subtract(values[..., 1:], values[..., :-1], out=gain[..., 1:])
+    np.negative(gain, out=loss)
+    np.maximum(gain, 0, out=gain)
+    np.maximum(loss, 0, out=loss)
+    _wilder(gain, period, gain)
+    _wilder(loss, period, loss)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        np.divide(gain, loss, out=out)
+    out += 1
+    np.divide(100, out, out=out)
+    return np.subtract(100, out, out=out)
+
+def macd(values, fast=12, slow=26, signal=9, out=None):
+    """MACD؛ خروجی (3، ...): خط macd، خط سیگنال و هیستوگرام"""
+    values = _prepare(values)
+    out = _output(out, (3,) + values.shape)
+    line, signal_line, histogram = out
+    ema(values, span=fast, out=line)
+    ema(values, span=slow, out=signal_line)
+    line -= signal_line
+    ema(line, span=signal, out=signal_line)
+    np.subtract(line, signal_line, out=histogram)
+    return out
+
+def bollinger(values, window=20, num_std=2, out=None):
+    """باندهای بولینگر؛ خروجی (3، ...): میانی، بالا و پایین"""
+    values = _prepare(values)
+    out = _output(out, (3,) + values.shape)
+    middle, upper, lower = out
+    # میانی و بالا تا پایان محاسبه انحراف معیار بافر کمکی آن هستند
+    rolling_std(values, window, out=lower, work=out[:2])
+    sma(values, window, out=middle)
+    np.multiply(lower, num_std, out=upper)
+    np.subtract(middle, upper, out=lower)
+    upper += middle
+    return out
+
+def true_range(high, low, close, out=None):
+    """دامنه واقعی؛ برای اولین کندل (بدون بسته شدن قبلی) high - low"""
+    high, low, close = _prepare(high), _prepare(low), _prepare(close)
+    out = _output(out, close.shape)
+    np.subtract(high, low, out=out)
+    if close.shape[-1] > 1:
+        previous = close[..., :-1]
+        np.maximum(out[..., 1:], np.abs(high[..., 1:] - previous), out=out[..., 1:])
+        np.maximum(out[..., 1:], np.abs(low[..., 1:] - previous), out=out[..., 1:])
+    return out
+
+def atr(high, low, close, period=14, out=None):
+    """ATR با میانگین Wilder؛ مقدار اولیه میانگین ساده period دامنه اول"""
+    out = true_range(high, low, close, out=out)
+    n = out.shape[-1]
+    if n < period:
+        out[...] = np.nan
+        return out
+    out[..., period - 1] = out[..., :period].mean(axis=-1)
+    linear_filter(out[..., period:], 1 / period, out[..., period - 1], out[..., period:])
+    out[..., :period - 1] = np.nan
+    return out
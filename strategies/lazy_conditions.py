@@ -0,0 +1,170 @@
+import logging
+
+import numpy as np
+import pandas as pd
+
+from utils.dtype_policy import STORAGE_DTYPE, ACCUMULATOR_DTYPE
+from strategies import indicators
+
+logger = logging.getLogger(__name__)
+
+# حداقل شرط‌های برقرار برای صدور سیگنال
+REQUIRED_VOTES = 3
+
+class LastBarIndicators:
+    """اندیکاتورهای calculate_indicators فقط برای آخرین کندل، با محاسبه تنبل و cache
+
+    هر مقدار در اولین درخواست از انتهای پنجره محاسبه (با float64) و با نوع
+    داده ذخیره برگردانده می‌شود تا مقایسه‌ها با مسیر کامل یکسان باشند.
+    """
+
+    __slots__ = ('close', 'dtype', 'values')
+
+    def __init__(self, close, dtype=STORAGE_DTYPE):
+        self.close = np.asarray(close, dtype=ACCUMULATOR_DTYPE)
+        self.dtype = dtype
+        self.values = {'close': dtype.type(self.close[-1])}
+
+    def __getitem__(self, name):
+        value = self.values.get(name)
+        if value is None:
+            value = self.values[name] = self.dtype.type(getattr(self, f'_{name}')())
+        return value
+
+    def computed(self):
+        return set(self.values)
+
+    def _sma(self, window):
+        if len(self.close) < window:
+            return np.nan
+        return self.close[-window:].mean()
+
+    def _sma_20(self):
+        return self._sma(20)
+
+    def _sma_50(self):
+        return self._sma(50)
+
+    def _sma_100(self):
+        return self._sma(100)
+
+    def _bb_middle(self):
+        return self._sma(20)
+
+    def _bb_std(self):
+        if len(self.close) < 20:
+            return np.nan
+        return self.close[-20:].std(ddof=1)
+
+    def _bb_upper(self):
+        return self._sma(20) + self._bb_std() * 2
+
+    def _bb_lower(self):
+        return self._sma(20) - self._bb_std() * 2
+
+    def _rsi(self, period=14):
+        # میانگین Wilder بازگشتی است و به کل پنجره وابسته است
+        return indicators.rsi(self.close, period)[-1]
+
+    def _macd(self):
+        # تنها اندیکاتور وابسته به کل پنجره (ewm بازگشتی)؛ خط سیگنال هم cache می‌شود
+        series = pd.Series(self.close)
+        macd = series.ewm(span=12, adjust=False).mean() - series.ewm(span=26, adjust=False).mean()
+        signal = macd.ewm(span=9, adjust=False).mean()
+        self.values['macd_signal'] = self.dtype.type(signal.iloc[-1])
+        return macd.iloc[-1]
+
+    def _macd_signal(self):
+        self['macd']
+        return self.values['macd_signal']
+
+class Condition:
+    """یک شرط رای‌گیری با نسخه خرید و فروش و هزینه تقریبی محاسبه
+
+    buy_margin و sell_margin فاصله علامت‌دار از مرز شرط را (در واحدی که ±1
+    یعنی کاملا برقرار یا کاملا نقض شده) برمی‌گردانند؛ شرط برقرار است اگر و
+    فقط اگر فاصله مثبت باشد.
+    """
+
+    __slots__ = ('name', 'cost', 'buy', 'sell', 'buy_margin', 'sell_margin')
+
+    def __init__(self, name, cost, buy, sell, buy_margin, sell_margin):
+        self.name = name
+        self.cost = cost
+        self.buy = buy
+        self.sell = sell
+        self.buy_margin = buy_margin
+        self.sell_margin = sell_margin
+
+    def test(self, side, indicators):
+        return bool((self.buy if side == 'BUY' else self.sell)(indicators))
+
+    def score(self, side, indicators):
+        """امتیاز پیوسته بین 0 و 1؛ بیشتر از 0.5 دقیقا وقتی شرط برقرار است (nan یعنی 0)"""
+        with np.errstate(divide='ignore', invalid='ignore'):
+            margin = float((self.buy_margin if side == 'BUY' else self.sell_margin)(indicators))
+        if np.isnan(margin):
+            return 0.0
+        return min(1.0, max(0.0, 0.5 + margin / 2))
+
+def _relative(value, reference, scale):
+    """فاصله نسبی value از reference به واحد scale (مثلا 0.02 یعنی 2٪)"""
+    return (value - reference) / reference / scale
+
+def _band_position(ind):
+    """فاصله قیمت از میانه باندها به واحد نصف پهنای باند (±1 روی باندها)"""
+    return (ind['close'] - (ind['bb_upper'] + ind['bb_lower']) / 2) / ((ind['bb_upper'] - ind['bb_lower']) / 2)
+
+# شرط‌های analyze_signals به ترتیب هزینه (تعداد کندل‌های لازم از انتهای پنجره)
+CONDITIONS = tuple(sorted((
+    Condition('price_vs_sma_20', 20,
+              lambda ind: ind['close'] > ind['sma_20'],
+              lambda ind: ind['close'] < ind['sma_20'],
+              lambda ind: _relative(ind['close'], ind['sma_20'], 0.02),
+              lambda ind: -_relative(ind['close'], ind['sma_20'], 0.02)),
+    Condition('price_vs_bands', 40,
+              lambda ind: ind['close'] < ind['bb_lower'],
+              lambda ind: ind['close'] > ind['bb_upper'],
+              lambda ind: -1 - _band_position(ind),
+              lambda ind: _band_position(ind) - 1),
+    Condition('rsi', 15,
+              lambda ind: ind['rsi'] < 40,
+              lambda ind: ind['rsi'] > 60,
+              lambda ind: (40 - ind['rsi']) / 20,
+              lambda ind: (ind['rsi'] - 60) / 20),
+    Condition('sma_20_vs_sma_50', 50,
+              lambda ind: ind['sma_20'] > ind['sma_50'],
+              lambda ind: ind['sma_20'] < ind['sma_50'],
+              lambda ind: _relative(ind['sma_20'], ind['sma_50'], 0.02),
+              lambda ind: -_relative(ind['sma_20'], ind['sma_50'], 0.02)),
+    Condition('macd', 1000,
+              lambda ind: ind['macd'] > ind['macd_signal'],
+              lambda ind: ind['macd'] < ind['macd_signal'],
+              lambda ind: (ind['macd'] - ind['macd_signal']) / ind['close'] / 0.002,
+              lambda ind: (ind['macd_signal'] - ind['macd']) / ind['close'] / 0.002),
+), key=lambda condition: condition.cost))
+
+def count_votes(indicators, conditions=CONDITIONS, required=REQUIRED_VOTES):
+    """رای‌گیری کوتاه‌شونده؛ خروجی (رای سمت‌های پذیرفته شده، تعداد شرط‌های ارزیابی شده)
+
+    سمتی که حتی با برقراری همه شرط‌های باقیمانده به required نرسد کنار گذاشته
+    می‌شود و ارزیابی با کنار رفتن هر دو سمت متوقف می‌شود. برای سمت پذیرفته شده
+    شرط‌های باقیمانده فقط برای محاسبه اطمینان (تعداد رای کامل) ارزیابی می‌شوند.
+    """
+    votes = {'BUY': 0, 'SELL': 0}
+    open_sides = ['BUY', 'SELL']
+    remaining = len(conditions)
+    evaluated = 0
+
+    for condition in conditions:
+        if not open_sides:
+            break
+        for side in open_sides:
+            evaluated += 1
+            if condition.test(side, indicators):
+                votes[side] += 1
+        remaining -= 1
+        open_sides = [side for side in open_sides if votes[side] + remaining >= required]
+
+    accepted = {side: count for side, count in votes.items() if count >= required}
+    return accepted, evaluated
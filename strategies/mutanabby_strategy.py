@@ -2,12 +2,43 @@ import pandas as pd
 import numpy as np
 from typing import List, Dict, Any, Optional
 import logging
+import time
+from collections import Counter
+
+from config.config import SENSITIVITY, SIGNAL_TUNER, STOP_LOSS_MULTIPLIER, RISK_REWARD_RATIOS
+from config.config import LAZY_SIGNAL_EVALUATION, STRATEGY_MODE, HEIKIN_ASHI
+from utils.dtype_policy import STORAGE_DTYPE, ACCUMULATOR_DTYPE, exact_value
+from strategies.lazy_conditions import LastBarIndicators, CONDITIONS, count_votes
+from strategies.atr_trailing import TrailingState
+from strategies import indicators as kernels
 
 logger = logging.getLogger(__name__)
 
+# اندیکاتورهای لحظه تصمیم که همراه سیگنال ثبت می‌شوند (signal['indicators'])
+SNAPSHOT_INDICATORS = ('rsi', 'macd', 'macd_signal', 'bb_upper', 'bb_middle', 'bb_lower',
+                       'sma_20', 'sma_50', 'sma_100')
+STRATEGY_MODES = ('indicators', 'atr_trailing')
+
 class MutanabbyStrategy:
     def __init__(self):
         self.name = "Mutanabby Trading Strategy"
+        self.sensitivity = SENSITIVITY
+        self.signal_tuner = SIGNAL_TUNER
+        self.stop_loss_multiplier = STOP_LOSS_MULTIPLIER
+        self.risk_reward_ratios = dict(RISK_REWARD_RATIOS)
+        # نوع ذخیره ستون‌های قیمت و اندیکاتورها
+        self.dtype = STORAGE_DTYPE
+        # ارزیابی تنبل شرط‌ها به جای محاسبه همه اندیکاتورها روی کل پنجره
+        self.lazy = LAZY_SIGNAL_EVALUATION
+        self.condition_stats = Counter()
+        if STRATEGY_MODE not in STRATEGY_MODES:
+            raise ValueError(f"حالت استراتژی پشتیبانی نمی‌شود: {STRATEGY_MODE} (مجاز: {', '.join(STRATEGY_MODES)})")
+        self.mode = STRATEGY_MODE
+        self.heikin_ashi = HEIKIN_ASHI
+        # وضعیت افزایشی حد ضرر متحرک هر نماد (حالت atr_trailing)
+        self.trailing_states = {}
+        # بافرهای float64 اندیکاتورها برای طول فعلی پنجره (بین چرخه‌ها دوباره استفاده می‌شوند)
+        self.buffers = None
         print("✅ استراتژی Mutanabby بارگذاری شد")
     
     def safe_data_access(self, data: Any, symbol: str = '') -> Optional[List[Dict]]:
@@ -93,42 +124,77 @@ class MutanabbyStrategy:
             logger.error(f"خطا در تبدیل لیست به دیکشنری برای {symbol}: {e}")
             return []
     
-    def generate_signals(self, market_data: Any) -> List[Dict[str, Any]]:
+    def prepare_dataframe(self, df: pd.DataFrame) -> Optional[pd.DataFrame]:
+        """آماده‌سازی DataFrame ورودی بدون تغییر داده‌های فراخوان"""
+        required_columns = ['open', 'high', 'low', 'close', 'volume']
+        if df.empty:
+            logger.warning("DataFrame داده‌ها خالی است")
+            return None
+
+        missing = [col for col in required_columns if col not in df.columns]
+        if missing:
+            logger.error(f"ستون‌های ضروری {missing} در DataFrame وجود ندارد")
+            return None
+
+        return df[required_columns].copy()
+
+    def generate_signals(self, market_data: Any, symbol: Optional[str] = None,
+                         now: Optional[float] = None, commit: bool = True) -> List[Dict[str, Any]]:
         """
         تولید سیگنال‌های معاملاتی - نسخه اصلاح شده
+
+        با symbol، حالت atr_trailing وضعیت نماد را بین فراخوانی‌ها نگه می‌دارد؛
+        now (ثانیه یونیکس، پیش‌فرض زمان فعلی) کندل‌های بسته شده را مشخص می‌کند
+        و commit=False (ارزیابی کندل موقت) وضعیت نماد را تغییر نمی‌دهد.
         """
         try:
-            # اعتبارسنجی و پردازش داده‌ها
-            processed_data = self.safe_data_access(market_data, 'unknown_symbol')
-            
-            if processed_data is None or len(processed_data) < 50:
-                logger.warning("داده‌های ناکافی برای تولید سیگنال")
-                return []
-            
-            # تبدیل به DataFrame برای پردازش
-            df = pd.DataFrame(processed_data)
-            
-            # اطمینان از وجود ستون‌های ضروری
-            required_columns = ['timestamp', 'open', 'high', 'low', 'close', 'volume']
-            for col in required_columns:
-                if col not in df.columns:
-                    logger.error(f"ستون ضروری '{col}' در داده‌ها وجود ندارد")
+            if isinstance(market_data, pd.DataFrame):
+                # DataFrame آماده (مثلا خروجی fetch_market_data) با ایندکس زمانی
+                df = self.prepare_dataframe(market_data)
+                if df is None:
                     return []
-            
-            # تبدیل تاریخ و تنظیم ایندکس
-            df['timestamp'] = pd.to_datetime(df['timestamp'])
-            df.set_index('timestamp', inplace=True)
-            
+            else:
+                # اعتبارسنجی و پردازش داده‌ها
+                processed_data = self.safe_data_access(market_data, 'unknown_symbol')
+
+                if processed_data is None or len(processed_data) < 50:
+                    logger.warning("داده‌های ناکافی برای تولید سیگنال")
+                    return []
+
+                # تبدیل به DataFrame برای پردازش
+                df = pd.DataFrame(processed_data)
+
+                # اطمینان از وجود ستون‌های ضروری
+                required_columns = ['timestamp', 'open', 'high', 'low', 'close', 'volume']
+                for col in required_columns:
+                    if col not in df.columns:
+                        logger.error(f"ستون ضروری '{col}' در داده‌ها وجود ندارد")
+                        return []
+
+                # تبدیل تاریخ و تنظیم ایندکس
+                df['timestamp'] = pd.to_datetime(df['timestamp'])
+                df.set_index('timestamp', inplace=True)
+
             # تبدیل مقادیر به عدد
             for col in ['open', 'high', 'low', 'close', 'volume']:
-                df[col] = pd.to_numeric(df[col], errors='coerce')
-            
+                df[col] = pd.to_numeric(df[col], errors='coerce').astype(self.dtype)
+
             df = df.dropna()
             
             if len(df) < 50:
                 logger.warning("داده‌های کافی پس از پاکسازی وجود ندارد")
                 return []
             
+            if self.mode == 'atr_trailing':
+                signals = self.analyze_trailing(df, symbol, now, commit)
+                logger.info(f"تعداد سیگنال‌های تولید شده: {len(signals)}")
+                return signals
+            
+            if self.lazy:
+                signals = self.analyze_lazy(df)
+                logger.info(f"تعداد سیگنال‌های تولید شده: {len(signals)}")
+                return signals
+            
             # محاسبه اندیکاتورها
             df = self.calculate_indicators(df)
             
@@ -144,45 +210,71 @@ class MutanabbyStrategy:
             logger.error(traceback.format_exc())
             return []
     
+    def indicator_buffers(self, length: int) -> Dict[str, np.ndarray]:
+        """بافرهای out=/work= کرنل‌های اندیکاتور برای پنجره‌ای با length کندل"""
+        if self.buffers is None or self.buffers['rsi'].shape[-1] != length:
+            self.buffers = {
+                'sma': np.empty((3, length), dtype=ACCUMULATOR_DTYPE),
+                'rsi': np.empty(length, dtype=ACCUMULATOR_DTYPE),
+                'work': np.empty((2, length), dtype=ACCUMULATOR_DTYPE),
+                'macd': np.empty((3, length), dtype=ACCUMULATOR_DTYPE),
+                'bands': np.empty((3, length), dtype=ACCUMULATOR_DTYPE),
+            }
+        return self.buffers
+    
     def calculate_indicators(self, df: pd.DataFrame) -> pd.DataFrame:
-        """محاسبه اندیکاتورهای تکنیکال"""
+        """محاسبه اندیکاتورهای تکنیکال
+
+        محاسبات با کرنل‌های strategies.indicators در بافرهای float64 استراتژی
+        انجام و نتیجه با نوع داده ذخیره (self.dtype) در ستون‌ها کپی می‌شود.
+        """
         try:
+            close = df['close'].to_numpy(dtype=ACCUMULATOR_DTYPE)
+            buffers = self.indicator_buffers(len(close))
+            indicators = {}
+            
             # میانگین متحرک
-            df['sma_20'] = df['close'].rolling(window=20).mean()
-            df['sma_50'] = df['close'].rolling(window=50).mean()
-            df['sma_100'] = df['close'].rolling(window=100).mean()
+            for row, window in enumerate((20, 50, 100)):
+                indicators[f'sma_{window}'] = kernels.sma(close, window, out=buffers['sma'][row])
             
             # RSI
-            df['rsi'] = self.calculate_rsi(df['close'], 14)
+            indicators['rsi'] = kernels.rsi(close, 14, out=buffers['rsi'], work=buffers['work'])
             
             # MACD
-            exp12 = df['close'].ewm(span=12, adjust=False).mean()
-            exp26 = df['close'].ewm(span=26, adjust=False).mean()
-            df['macd'] = exp12 - exp26
-            df['macd_signal'] = df['macd'].ewm(span=9, adjust=False).mean()
-            df['macd_histogram'] = df['macd'] - df['macd_signal']
+            indicators['macd'], indicators['macd_signal'], indicators['macd_histogram'] = kernels.macd(
+                close, out=buffers['macd'])
             
             # بولینگر باندز
-            df['bb_middle'] = df['close'].rolling(window=20).mean()
-            bb_std = df['close'].rolling(window=20).std()
-            df['bb_upper'] = df['bb_middle'] + (bb_std * 2)
-            df['bb_lower'] = df['bb_middle'] - (bb_std * 2)
+            indicators['bb_middle'], indicators['bb_upper'], indicators['bb_lower'] = kernels.bollinger(
+                close, 20, 2, out=buffers['bands'])
             
+            for name, values in indicators.items():
+                # astype کپی می‌سازد پس ستون‌ها به بافرهای مشترک اشاره نمی‌کنند
+                df[name] = values.astype(self.dtype)
             return df
             
         except Exception as e:
             logger.error(f"خطا در محاسبه اندیکاتورها: {e}")
             return df
     
+    def calculate_ema(self, df: pd.DataFrame, period: int) -> pd.Series:
+        """محاسبه EMA قیمت بسته شدن"""
+        return pd.Series(kernels.ema(df['close'].to_numpy(dtype=ACCUMULATOR_DTYPE), span=period), index=df.index)
+    
+    def calculate_atr(self, df: pd.DataFrame, period: int = 14) -> pd.Series:
+        """محاسبه ATR با میانگین Wilder"""
+        atr = kernels.atr(df['high'].to_numpy(), df['low'].to_numpy(), df['close'].to_numpy(), period)
+        return pd.Series(atr, index=df.index)
+    
+    def calculate_macd(self, df: pd.DataFrame, fast: int = 12, slow: int = 26, signal: int = 9):
+        """محاسبه MACD؛ خروجی (macd، خط سیگنال، هیستوگرام)"""
+        lines = kernels.macd(df['close'].to_numpy(dtype=ACCUMULATOR_DTYPE), fast, slow, signal)
+        return tuple(pd.Series(values, index=df.index) for values in lines)
+    
     def calculate_rsi(self, prices: pd.Series, period: int = 14) -> pd.Series:
-        """محاسبه RSI"""
+        """محاسبه RSI با میانگین Wilder"""
         try:
-            delta = prices.diff()
-            gain = (delta.where(delta > 0, 0)).rolling(window=period).mean()
-            loss = (-delta.where(delta < 0, 0)).rolling(window=period).mean()
-            rs = gain / loss
-            rsi = 100 - (100 / (1 + rs))
-            return rsi
+            return pd.Series(kernels.rsi(prices.to_numpy(dtype=ACCUMULATOR_DTYPE), period), index=prices.index)
         except:
             return pd.Series([50] * len(prices), index=prices.index)
     
@@ -215,37 +307,150 @@ class MutanabbyStrategy:
             
             # تولید سیگنال خرید
             if sum(buy_conditions) >= 3:
-                entry = latest['close']
-                sl = entry * 0.95  # استاپ لاس 5%
-                signals.append({
-                    'type': 'BUY',
-                    'entry': round(entry, 6),
-                    'sl': round(sl, 6),  # تغییر از $l به sl
-                    'tp1': round(entry * 1.05, 6),  # تیک پروفیت 5%
-                    'tp2': round(entry * 1.08, 6),  # تیک پروفیت 8%
-                    'tp3': round(entry * 1.12, 6),  # تیک پروفیت 12%
-                    'timestamp': latest.name,
-                    'confidence': min(sum(buy_conditions) / 5 * 100, 100),
-                    'symbol': 'SYMBOL'  # بعداً پر خواهد شد
-                })
+                signals.append(self.build_signal('BUY', latest['close'], latest.name, sum(buy_conditions),
+                                                 self.indicator_snapshot(latest)))
             
             # تولید سیگنال فروش
             if sum(sell_conditions) >= 3:
-                entry = latest['close']
-                sl = entry * 1.05  # استاپ لاس 5%
-                signals.append({
-                    'type': 'SELL',
-                    'entry': round(entry, 6),
-                    'sl': round(sl, 6),  # تغییر از $l به sl
-                    'tp1': round(entry * 0.95, 6),  # تیک پروفیت 5%
-                    'tp2': round(entry * 0.92, 6),  # تیک پروفیت 8%
-                    'tp3': round(entry * 0.88, 6),  # تیک پروفیت 12%
-                    'timestamp': latest.name,
-                    'confidence': min(sum(sell_conditions) / 5 * 100, 100),
-                    'symbol': 'SYMBOL'  # بعداً پر خواهد شد
-                })
+                signals.append(self.build_signal('SELL', latest['close'], latest.name, sum(sell_conditions),
+                                                 self.indicator_snapshot(latest)))
             
         except Exception as e:
             logger.error(f"خطا در تحلیل سیگنال‌ها: {e}")
         
         return signals
+    
+    @staticmethod
+    def indicator_snapshot(values):
+        """مقادیر اندیکاتورهای لحظه تصمیم از ردیف آخر (یا LastBarIndicators)"""
+        return {name: float(values[name]) for name in SNAPSHOT_INDICATORS}
+    
+    def build_signal(self, side, close, timestamp, votes, indicators=None):
+        """ساخت سیگنال با حد ضرر و اهداف درصدی از قیمت بسته شدن"""
+        entry = exact_value(close)
+        if side == 'BUY':
+            sl = entry * 0.95  # استاپ لاس 5%
+            targets = (1.05, 1.08, 1.12)  # تیک پروفیت 5%، 8% و 12%
+        else:
+            sl = entry * 1.05  # استاپ لاس 5%
+            targets = (0.95, 0.92, 0.88)
+        signal = {
+            'type': side,
+            'entry': round(entry, 6),
+            'sl': round(sl, 6),  # تغییر از $l به sl
+            'tp1': round(entry * targets[0], 6),
+            'tp2': round(entry * targets[1], 6),
+            'tp3': round(entry * targets[2], 6),
+            'timestamp': timestamp,
+            'confidence': min(votes / 5 * 100, 100),
+            'symbol': 'SYMBOL'  # بعداً پر خواهد شد
+        }
+        if indicators is not None:
+            signal['indicators'] = indicators
+        return signal
+    
+    def analyze_lazy(self, df: pd.DataFrame) -> List[Dict[str, Any]]:
+        """تحلیل تنبل: فقط اندیکاتورهای لازم هر شرط روی آخرین کندل و توقف پس از قطعی شدن رای"""
+        signals = []
+        try:
+            indicators = LastBarIndicators(df['close'].to_numpy(), self.dtype)
+            accepted, evaluated = count_votes(indicators)
+            self.condition_stats['symbols'] += 1
+            self.condition_stats['evaluated'] += evaluated
+            for side, votes in accepted.items():
+                # اندیکاتورهای باقیمانده فقط برای سیگنال‌های پذیرفته شده محاسبه می‌شوند
+                signals.append(self.build_signal(side, indicators['close'], df.index[-1], votes,
+                                                 self.indicator_snapshot(indicators)))
+        except Exception as e:
+            logger.error(f"خطا در تحلیل تنبل سیگنال‌ها: {e}")
+        return signals
+    
+    def trailing_state(self, df: pd.DataFrame, symbol: Optional[str] = None, now: Optional[float] = None,
+                       commit: bool = True) -> TrailingState:
+        """وضعیت حد ضرر متحرک پس از آخرین کندل پنجره
+
+        فقط کندل‌هایی که تا now بسته شده‌اند (زمان باز شدن + طول کندل) در وضعیت
+        نماد اعمال می‌شوند؛ از آخرین کندل اعمال شده به بعد به صورت افزایشی و اگر
+        آن کندل در پنجره نباشد با ساخت دوباره از پنجره. کندل در حال تشکیل (که
+        چرخه بعد دوباره دریافت و اصلاح می‌شود) روی یک کپی ارزیابی می‌شود.
+        با commit=False وضعیت ذخیره شده نماد تغییر نمی‌کند.
+        """
+        closed = len(df)
+        key = None
+        if len(df) > 1:
+            interval = df.index[-1] - df.index[-2]
+            now = time.time() if now is None else now
+            closed = int(df.index.searchsorted(pd.Timestamp(int(now), unit='s') - interval, side='right'))
+            # کلید شامل فاصله کندل‌هاست تا تایم‌فریم‌های مختلف یک نماد وضعیت جدا داشته باشند
+            key = (symbol, interval) if symbol is not None else None
+
+        state = self.trailing_states.get(key) if key is not None else None
+        start = None
+        if state is not None and state.last_time is not None:
+            position = int(df.index.get_indexer([state.last_time])[0])
+            if 0 <= position < closed:
+                start = position + 1
+
+        columns = [df[name].to_numpy() for name in ('open', 'high', 'low', 'close')]
+        if start is None:
+            state = TrailingState.from_history(
+                *(values[:closed] for values in columns), self.sensitivity, self.signal_tuner,
+                self.heikin_ashi, last_time=df.index[closed - 1] if closed else None
+            )
+            start = closed
+        elif not commit:
+            state = state.copy()
+        self._advance_trailing(state, df.index, columns, start, closed)
+        if key is not None and commit and closed:
+            self.trailing_states[key] = state
+
+        if closed < len(df):
+            state = state.copy()
+            self._advance_trailing(state, df.index, columns, closed, len(df))
+        return state
+    
+    @staticmethod
+    def _advance_trailing(state, index, columns, start, end):
+        """اعمال کندل‌های [start, end) پنجره در وضعیت"""
+        open_, high, low, close = columns
+        for position in range(start, end):
+            state.update(open_[position], high[position], low[position], close[position], index[position])
+    
+    def analyze_trailing(self, df: pd.DataFrame, symbol: Optional[str] = None, now: Optional[float] = None,
+                         commit: bool = True) -> List[Dict[str, Any]]:
+        """سیگنال Mutanabby: عبور قیمت (یا Heikin-Ashi) از حد ضرر متحرک SENSITIVITY × ATR(SIGNAL_TUNER)"""
+        signals = []
+        try:
+            state = self.trailing_state(df, symbol, now, commit)
+            if state.signal is None:
+                return signals
+            indicators = LastBarIndicators(df['close'].to_numpy(), self.dtype)
+            # اطمینان: خود عبور به علاوه شرط‌های رای‌گیری هم‌جهت
+            votes = 1 + sum(condition.test(state.signal, indicators) for condition in CONDITIONS)
+            snapshot = self.indicator_snapshot(indicators)
+            snapshot.update(atr=state.atr, trailing_stop=state.stop)
+            signals.append(self.build_trailing_signal(state.signal, indicators['close'], df.index[-1], state.atr,
+                                                      votes / (len(CONDITIONS) + 1) * 100, snapshot))
+        except Exception as e:
+            logger.error(f"خطا در تحلیل حد ضرر متحرک: {e}")
+        return signals
+    
+    def build_trailing_signal(self, side, close, timestamp, atr, confidence, indicators=None):
+        """ساخت سیگنال با حد ضرر STOP_LOSS_MULTIPLIER × ATR و اهداف به نسبت RISK_REWARD_RATIOS"""
+        entry = exact_value(close)
+        risk = self.stop_loss_multiplier * atr
+        direction = 1 if side == 'BUY' else -1
+        signal = {
+            'type': side,
+            'entry': round(entry, 6),
+            'sl': round(entry - direction * risk, 6),
+            'tp1': round(entry + direction * risk * self.risk_reward_ratios['TP1'], 6),
+            'tp2': round(entry + direction * risk * self.risk_reward_ratios['TP2'], 6),
+            'tp3': round(entry + direction * risk * self.risk_reward_ratios['TP3'], 6),
+            'timestamp': timestamp,
+            'confidence': round(min(confidence, 100), 2),
+            'symbol': 'SYMBOL'  # بعداً پر خواهد شد
+        }
+        if indicators is not None:
+            signal['indicators'] = indicators
+        return signal
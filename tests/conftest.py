@@ -0,0 +1,29 @@
+import numpy as np
+import pandas as pd
+
+START = 1700000000  # زمان باز شدن اولین کندل پیش‌فرض (مرز کندل 15 دقیقه)
+
+def make_ohlcv(seed=0, rows=200, base=100.0, volatility=0.01, drift=0.0, returns=None,
+               spread=0.01, decimals=None, start=START, interval=900):
+    """پنجره OHLCV تصادفی با گام تصادفی لگاریتمی برای تست‌ها
+
+    returns بازده‌های لگاریتمی آماده (مثلا با عامل مشترک برای نمادهای همبسته) به
+    جای نمونه‌گیری با drift و volatility است. open هر کندل close کندل قبلی و
+    سقف و کف تا spread بیرون از بدنه کندل هستند. decimals قیمت‌ها را گرد می‌کند
+    (کمینه یک واحد آخر) تا حالت‌های برابری قیمت‌ها هم پوشش داده شوند.
+    """
+    rng = np.random.default_rng(seed)
+    if returns is None:
+        returns = rng.normal(drift, volatility, rows)
+    rows = len(returns)
+    close = base * np.exp(np.cumsum(returns))
+    open_ = np.r_[close[0], close[:-1]]
+    high = np.maximum(open_, close) * (1 + rng.uniform(0, spread, rows))
+    low = np.minimum(open_, close) * (1 - rng.uniform(0, spread, rows))
+    if decimals is not None:
+        open_, high, low, close = (np.maximum(np.round(values, decimals), 10.0 ** -decimals)
+                                   for values in (open_, high, low, close))
+    index = pd.to_datetime(start + np.arange(rows) * interval, unit='s')
+    index.name = 'timestamp'
+    return pd.DataFrame({'open': open_, 'high': high, 'low': low, 'close': close,
+                         'volume': rng.uniform(1, 1000, rows)}, index=index)
@@ -0,0 +1,146 @@
+import pytest
+import numpy as np
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from strategies.atr_trailing import TrailingState, trailing_stop, crossings, heikin_ashi_candles, LONG, SHORT
+from strategies import indicators
+from strategies.mutanabby_strategy import MutanabbyStrategy
+from conftest import make_ohlcv
+
+def reference_stop(source, loss):
+    """پیاده‌سازی مستقیم کندل به کندل حد ضرر متحرک UT Bot برای مقایسه"""
+    stop = np.full(len(source), np.nan)
+    previous = None
+    for i in range(len(source)):
+        if np.isnan(loss[i]):
+            continue
+        prev_stop = 0.0 if previous is None else previous
+        x, prev_x = source[i], source[i - 1] if i else np.nan
+        if x > prev_stop and (previous is None or prev_x > prev_stop):
+            previous = max(prev_stop, x - loss[i])
+        elif x < prev_stop and prev_x < prev_stop:
+            previous = min(prev_stop, x + loss[i])
+        elif x > prev_stop:
+            previous = x - loss[i]
+        else:
+            previous = x + loss[i]
+        stop[i] = previous
+    return stop
+
+class TestAtrTrailing:
+
+    def test_atr_matches_wilder_recursion(self):
+        """تست ATR در برابر بازگشت مستقیم Wilder"""
+        df = make_ohlcv(1, rows=60)
+        atr = indicators.atr(df['high'], df['low'], df['close'], 10)
+
+        # اولین کندل بسته شدن قبلی ندارد و دامنه آن high - low است
+        tr = np.fmax(df['high'] - df['low'],
+                     np.fmax((df['high'] - df['close'].shift()).abs(), (df['low'] - df['close'].shift()).abs()))
+        expected = tr.iloc[:10].mean()
+        assert np.isnan(atr[:9]).all()
+        assert atr[9] == pytest.approx(expected, rel=1e-12)
+        for i in range(10, 60):
+            expected = (expected * 9 + tr.iloc[i]) / 10
+            assert atr[i] == pytest.approx(expected, rel=1e-9)
+
+    def test_heikin_ashi(self):
+        """تست کندل‌های Heikin-Ashi"""
+        df = make_ohlcv(2, rows=30)
+        ha_open, ha_high, ha_low, ha_close = heikin_ashi_candles(df['open'], df['high'], df['low'], df['close'])
+
+        assert ha_open[0] == pytest.approx((df['open'].iloc[0] + df['close'].iloc[0]) / 2)
+        for i in range(1, 30):
+            assert ha_open[i] == pytest.approx((ha_open[i - 1] + ha_close[i - 1]) / 2, rel=1e-12)
+        assert (ha_high >= np.maximum(ha_open, ha_close)).all()
+        assert (ha_low <= np.minimum(ha_open, ha_close)).all()
+
+    @pytest.mark.parametrize('seed', range(40))
+    def test_kernel_matches_reference(self, seed):
+        """تست برابری کرنل برداری با پیاده‌سازی کندل به کندل"""
+        df = make_ohlcv(seed, rows=2000, decimals=0 if seed % 4 == 0 else None)
+        loss = 2.4 * indicators.atr(df['high'], df['low'], df['close'], 10)
+
+        stop, direction = trailing_stop(df['close'].to_numpy(), loss)
+
+        np.testing.assert_array_equal(stop, reference_stop(df['close'].to_numpy(), loss))
+        assert set(np.unique(direction[9:])) <= {LONG, SHORT}
+
+    @pytest.mark.parametrize('heikin_ashi', [False, True])
+    def test_incremental_matches_batch(self, heikin_ashi):
+        """تست یکسان بودن به‌روزرسانی افزایشی با کرنل دسته‌ای روی کل تاریخچه"""
+        for seed in range(10):
+            df = make_ohlcv(seed, rows=400, decimals=0 if seed % 3 == 0 else None)
+            open_, high, low, close = (df[name].to_numpy() for name in ('open', 'high', 'low', 'close'))
+            source = heikin_ashi_candles(open_, high, low, close)[3] if heikin_ashi else close
+            stop, direction = trailing_stop(source, 2.4 * indicators.atr(high, low, close, 10))
+            expected = [{1: 'BUY', -1: 'SELL', 0: None}[int(value)] for value in crossings(direction)]
+
+            split = 5 + seed * 30
+            state = TrailingState.from_history(open_[:split], high[:split], low[:split], close[:split],
+                                               2.4, 10, heikin_ashi)
+            actual = [state.update(open_[i], high[i], low[i], close[i]) for i in range(split, len(df))]
+
+            assert actual == expected[split:], seed
+            assert state.stop == pytest.approx(stop[-1], rel=1e-12) and state.direction == direction[-1]
+
+    def test_strategy_trailing_mode(self):
+        """تست حالت atr_trailing استراتژی با حد ضرر ATR و وضعیت افزایشی نماد"""
+        strategy = MutanabbyStrategy()
+        strategy.mode = 'atr_trailing'
+        df = make_ohlcv(7, rows=300)
+
+        produced = []
+        for end in range(100, 300):
+            window = df.iloc[end - 100:end]
+            for signal in strategy.generate_signals(window, 'ETHUSDT'):
+                produced.append(signal)
+                risk = strategy.stop_loss_multiplier * signal['indicators']['atr']
+                direction = 1 if signal['type'] == 'BUY' else -1
+                assert signal['timestamp'] == window.index[-1]
+                assert signal['sl'] == pytest.approx(signal['entry'] - direction * risk, abs=1e-5)
+                assert signal['tp3'] == pytest.approx(signal['entry'] + direction * 3 * risk, abs=1e-5)
+                assert 0 < signal['confidence'] <= 100
+
+        assert produced
+        # یک وضعیت برای نماد و تایم‌فریم که کندل به کندل جلو رفته است
+        assert len(strategy.trailing_states) == 1
+        state = next(iter(strategy.trailing_states.values()))
+        assert state.last_time == df.index[-2] and state.count == 299
+
+    def test_forming_candle_not_committed(self):
+        """تست اصلاح کندل در حال تشکیل بین دو فراخوانی: وضعیت نماد فقط با کندل‌های بسته شده جلو می‌رود"""
+        strategy = MutanabbyStrategy()
+        df = make_ohlcv(11, rows=200)
+        final = df.iloc[:151]
+        # کندل آخر در میانه تشکیل: سقف و کف و بسته شدن ناقص
+        partial = final.copy()
+        partial.iloc[-1, partial.columns.get_indexer(['high', 'low', 'close'])] = final['open'].iloc[-1]
+        forming_now = int(df.index[150].timestamp()) + 450
+
+        first = strategy.trailing_state(partial.iloc[-100:], 'ETHUSDT', now=forming_now)
+        key = next(iter(strategy.trailing_states))
+        assert strategy.trailing_states[key].last_time == df.index[149]
+        assert first.last_time == df.index[150]
+
+        # همان کندل با مقادیر نهایی به علاوه کندل در حال تشکیل بعدی
+        second = strategy.trailing_state(df.iloc[52:152], 'ETHUSDT', now=forming_now + 900)
+        committed = strategy.trailing_states[key]
+        # مرجع: کرنل دسته‌ای روی همان تاریخچه (از ابتدای پنجره اول تا کندل بسته شده) با مقادیر نهایی
+        open_, high, low, close = (df[name].to_numpy()[51:151] for name in ('open', 'high', 'low', 'close'))
+        atr = indicators.atr(high, low, close, strategy.signal_tuner)
+        stop, _ = trailing_stop(close, strategy.sensitivity * atr)
+
+        assert committed.last_time == df.index[150] and committed.count == 100
+        assert committed.atr == pytest.approx(atr[-1], rel=1e-12)
+        assert committed.stop == pytest.approx(stop[-1], rel=1e-12)
+        assert second.last_time == df.index[151] and second.count == 101
+
+        # ارزیابی موقت (commit=False) وضعیت ذخیره شده را تغییر نمی‌دهد
+        strategy.trailing_state(df.iloc[53:153], 'ETHUSDT', now=forming_now + 1800, commit=False)
+        assert strategy.trailing_states[key] is committed and committed.count == 100
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -1,9 +1,11 @@
 import pytest
+import numpy as np
 import sys
 import os
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 
 from services.coinex_api import CoinExAPI
+from services.kline_decoder import decode_klines, _decode_numeric, _decode_parsed
 from unittest.mock import patch, Mock
 
 class TestCoinExAPI:
@@ -71,6 +73,98 @@ class TestCoinExAPI:
         
         assert price == 29500.50
 
+    @patch('services.coinex_api.requests.get')
+    def test_get_klines_decodes_to_arrays(self, mock_get, coinex_api):
+        """تست دیکود مستقیم کندل‌ها به آرایه‌های numpy"""
+        mock_response = Mock()
+        mock_response.status_code = 200
+        mock_response.content = (
+            b'{"code":0,"data":[[1609459200,"29000","29050","29100","28900","1000"],'
+            b'[1609459260,"29050","29100","29150","29000","1200"]],"message":"OK"}'
+        )
+        mock_get.return_value = mock_response
+        
+        candles = coinex_api.get_klines('BTCUSDT', 2, '15min')
+        
+        assert len(candles) == 2
+        assert candles.timestamp.dtype == 'int64'
+        assert candles.close.tolist() == [29050.0, 29100.0]
+        df = candles.to_dataframe()
+        assert list(df.columns) == ['open', 'high', 'low', 'close', 'volume']
+        assert df['volume'].iloc[-1] == 1200.0
+    
+    @patch('services.coinex_api.requests.get')
+    def test_get_depth(self, mock_get, coinex_api):
+        """تست دریافت دفتر سفارش"""
+        mock_response = Mock()
+        mock_response.status_code = 200
+        mock_response.json.return_value = {
+            'code': 0,
+            'data': {'asks': [["29001", "1.5"]], 'bids': [["28999", "2"]], 'last': "29000", 'time': 1}
+        }
+        mock_get.return_value = mock_response
+        
+        depth = coinex_api.get_depth('BTCUSDT', 20)
+        
+        assert depth['asks'] == [["29001", "1.5"]]
+        assert mock_get.call_args.kwargs['params'] == {'market': 'BTCUSDT', 'merge': '0', 'limit': 20}
+    
+    @patch('services.coinex_api.requests.get')
+    def test_get_deals(self, mock_get, coinex_api):
+        """تست دریافت افزایشی معاملات بازار"""
+        mock_response = Mock()
+        mock_response.status_code = 200
+        mock_response.json.return_value = {
+            'code': 0,
+            'data': [{'id': 12, 'price': "29000", 'amount': "0.1", 'date_ms': 1609459200123, 'type': 'buy'}]
+        }
+        mock_get.return_value = mock_response
+        
+        deals = coinex_api.get_deals('BTCUSDT', last_id=11, limit=1000)
+        
+        assert deals[0]['id'] == 12
+        assert mock_get.call_args.kwargs['params'] == {'market': 'BTCUSDT', 'last_id': 11, 'limit': 1000}
+    
+    @patch('services.coinex_api.requests.get')
+    def test_get_market_list(self, mock_get, coinex_api):
+        """تست دریافت فهرست بازارها"""
+        mock_response = Mock()
+        mock_response.status_code = 200
+        mock_response.json.return_value = {'code': 0, 'data': ['BTCUSDT', 'ETHUSDT', 'ETHBTC']}
+        mock_get.return_value = mock_response
+        
+        assert coinex_api.get_market_list() == ['BTCUSDT', 'ETHUSDT', 'ETHBTC']
+        assert mock_get.call_args.args[0].endswith('/market/list')
+    
+    def test_decode_klines_with_non_numeric_fields(self):
+        """تست مسیر سریع برای ردیف واقعی CoinEx (8 فیلد با مبلغ و نام بازار)"""
+        # [time, open, close, high, low, volume, amount, market] با high > close > low
+        payload = (
+            b'{"code": 0, "data": [[1609459200, "29000", "29050", "29100", "28900", "1000", '
+            b'"29000000", "BTCUSDT"], [1609460100, "29050", "29150.5", "29200", "29000", "12.5", '
+            b'"364000", "BTCUSDT"]], "message": "OK"}'
+        )
+        
+        candles = decode_klines(payload)
+        
+        assert len(candles) == 2
+        assert candles.timestamp.tolist() == [1609459200, 1609460100]
+        assert candles.open.tolist() == [29000.0, 29050.0]
+        assert candles.close.tolist() == [29050.0, 29150.5]
+        assert candles.high.tolist() == [29100.0, 29200.0]
+        assert candles.low.tolist() == [28900.0, 29000.0]
+        assert candles.volume.tolist() == [1000.0, 12.5]
+        # بدون بازگشت به مسیر پارس JSON و با همان نتیجه در هر دو مسیر
+        fast = _decode_numeric(payload)
+        assert fast is not None
+        np.testing.assert_array_equal(fast.values, candles.values)
+        np.testing.assert_array_equal(_decode_parsed(payload).values, candles.values)
+    
+    def test_decode_klines_error_code(self):
+        """تست برگرداندن None برای پاسخ خطای API"""
+        assert decode_klines(b'{"code": 1, "data": [], "message": "error"}') is None
+        assert len(decode_klines(b'{"code": 0, "data": []}')) == 0
+
 # خطای تورفتگی اینجا رفع شده است
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
@@ -0,0 +1,177 @@
+import pytest
+import time
+from unittest.mock import Mock
+import numpy as np
+import pandas as pd
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from services.correlation_service import CorrelationService
+from conftest import make_ohlcv
+
+def make_closes(n_candles=300, seed=0):
+    """BTC و ETH با یک عامل مشترک همبسته‌اند و XRP مستقل است"""
+    rng = np.random.default_rng(seed)
+    market = rng.normal(0, 0.01, n_candles)
+    returns = {
+        'BTCUSDT': market + rng.normal(0, 0.002, n_candles),
+        'ETHUSDT': market + rng.normal(0, 0.003, n_candles),
+        'XRPUSDT': rng.normal(0, 0.01, n_candles),
+    }
+    return pd.DataFrame({symbol: make_ohlcv(returns=r)['close'] for symbol, r in returns.items()})
+
+class TestCorrelationService:
+
+    def test_incremental_matches_seed(self):
+        """تست برابری به‌روزرسانی افزایشی کندل به کندل با ساخت یکجا"""
+        closes = make_closes()
+        seeded = CorrelationService(halflife=48)
+        seeded.seed(closes)
+
+        incremental = CorrelationService(halflife=48, capacity=1)
+        for timestamp, row in closes.iterrows():
+            for symbol, close in row.items():
+                incremental.observe(symbol, int(timestamp.timestamp()), close)
+            incremental.commit()
+
+        symbols = list(closes.columns)
+        np.testing.assert_allclose(incremental.correlation(symbols), seeded.correlation(symbols))
+        assert incremental.updates == len(closes) - 1
+
+    def test_correlation_structure(self):
+        """تست تشخیص همبستگی بالا و پایین"""
+        service = CorrelationService(halflife=48)
+        service.seed(make_closes())
+
+        corr = service.correlation(['BTCUSDT', 'ETHUSDT', 'XRPUSDT', 'UNKNOWN'])
+
+        assert corr[0, 1] > 0.9
+        assert abs(corr[0, 2]) < 0.4
+        assert corr[3].tolist() == [0.0, 0.0, 0.0, 1.0]
+
+    def test_decluster_keeps_one_signal_per_cluster(self):
+        """تست حذف سیگنال هم‌جهت نماد همبسته و نگه داشتن سیگنال مستقل"""
+        service = CorrelationService(halflife=48)
+        service.seed(make_closes())
+        signals = {
+            'BTCUSDT': [{'type': 'BUY', 'confidence': 60}],
+            'ETHUSDT': [{'type': 'BUY', 'confidence': 80}],
+            'XRPUSDT': [{'type': 'BUY', 'confidence': 60}],
+        }
+
+        kept, suppressed = service.decluster(signals)
+
+        assert kept['ETHUSDT'][0]['cluster_size'] == 2
+        assert kept['BTCUSDT'] == []
+        assert len(kept['XRPUSDT']) == 1
+        assert [(symbol, leader) for symbol, _, leader, _ in suppressed] == [('BTCUSDT', 'ETHUSDT')]
+
+    def test_opposite_directions_are_not_clustered(self):
+        """تست عدم گروه‌بندی سیگنال‌های خلاف جهت"""
+        service = CorrelationService(halflife=48)
+        service.seed(make_closes())
+
+        kept, suppressed = service.decluster({
+            'BTCUSDT': [{'type': 'BUY', 'confidence': 60}],
+            'ETHUSDT': [{'type': 'SELL', 'confidence': 60}],
+        })
+
+        assert suppressed == []
+        assert len(kept['BTCUSDT']) == len(kept['ETHUSDT']) == 1
+
+    def test_large_universe_update(self):
+        """تست به‌روزرسانی یک کندل برای 600 نماد"""
+        rng = np.random.default_rng(1)
+        service = CorrelationService()
+        symbols = [f"S{i}USDT" for i in range(600)]
+        for candle in range(3):
+            for symbol in symbols:
+                service.observe(symbol, 1700000000 + candle * 900, 100 + rng.normal())
+            started = time.perf_counter()
+            service.commit()
+            elapsed = time.perf_counter() - started
+
+        assert len(service) == 600
+        assert service.updates == 2
+        assert elapsed < 0.5
+
+    @pytest.fixture
+    def bot(self):
+        from main import CoinExSignalBot
+
+        telegram = Mock()
+        telegram.send_message.return_value = True
+        telegram.signal_fields.return_value = {}
+        bot = CoinExSignalBot(coinex_api=Mock(), telegram_bot=telegram)
+        bot.correlation = CorrelationService(halflife=48)
+        bot.correlation.seed(make_closes())
+        bot.update_correlation = Mock()
+        bot.digest_mode = False
+        bot.send_delay = 0
+        return bot
+
+    @staticmethod
+    def stash(bot, candle):
+        bot.cycle_signals = {
+            'BTCUSDT': [{'type': 'BUY', 'confidence': 60, 'timestamp': candle}],
+            'ETHUSDT': [{'type': 'BUY', 'confidence': 80, 'timestamp': candle}],
+        }
+
+    def test_bot_filters_liquidity_before_declustering(self, bot):
+        """تست اینکه رهبر حذف شده به دلیل نقدینگی کم کل گروه را از بین نمی‌برد"""
+        candle = pd.Timestamp(1700000000, unit='s')
+        bot.order_books = Mock()
+        bot.filter_by_liquidity = lambda signals, symbol: [] if symbol == 'ETHUSDT' else signals
+        self.stash(bot, candle)
+
+        assert bot.deliver_declustered('15min') == 1
+        assert not bot.state.is_new_signal_candle('BTCUSDT', '15min', 1700000000)
+
+    def test_bot_marks_followers_after_leader_delivered(self, bot):
+        """تست علامت خوردن سیگنال حذف شده فقط پس از تحویل سیگنال رهبر"""
+        candle = pd.Timestamp(1700000000, unit='s')
+        bot.telegram_bot.send_message.return_value = False
+        self.stash(bot, candle)
+
+        assert bot.deliver_declustered('15min') == 0
+        assert bot.state.is_new_signal_candle('BTCUSDT', '15min', 1700000000)
+        assert bot.state.is_new_signal_candle('ETHUSDT', '15min', 1700000000)
+
+        bot.telegram_bot.send_message.return_value = True
+        self.stash(bot, candle)
+
+        assert bot.deliver_declustered('15min') == 1
+        assert not bot.state.is_new_signal_candle('BTCUSDT', '15min', 1700000000)
+        assert not bot.state.is_new_signal_candle('ETHUSDT', '15min', 1700000000)
+
+    def test_bot_keys_followers_per_leader_signal(self, bot):
+        """تست نگه داشتن حذف شده‌ها با همان سیگنال رهبری که به خاطر آن حذف شده‌اند"""
+        candle = pd.Timestamp(1700000000, unit='s')
+        bot.cycle_signals = {
+            'BTCUSDT': [{'type': 'BUY', 'confidence': 60, 'timestamp': candle},
+                        {'type': 'SELL', 'confidence': 60, 'timestamp': candle}],
+            'ETHUSDT': [{'type': 'BUY', 'confidence': 80, 'timestamp': candle},
+                        {'type': 'SELL', 'confidence': 80, 'timestamp': candle}],
+        }
+        # رهبر خرید تحویل می‌شود و رهبر فروش همان کندل نه
+        bot.telegram_bot.send_message.side_effect = [True, False]
+
+        assert bot.deliver_declustered('15min') == 1
+        assert ('ETHUSDT', '15min', 1700000000, 'BUY') not in bot.cluster_followers
+        followers = bot.cluster_followers[('ETHUSDT', '15min', 1700000000, 'SELL')]
+        assert [(symbol, signal['type']) for symbol, signal in followers] == [('BTCUSDT', 'SELL')]
+
+    def test_bot_marks_every_delivered_candle(self, bot):
+        """تست علامت خوردن کندل هر سیگنال تحویل شده حتی اگر سیگنال آخر ارسال نشود"""
+        bot.correlation = None
+        bot.telegram_bot.send_message.side_effect = [True, False]
+        signals = [{'type': 'BUY', 'confidence': 60, 'timestamp': pd.Timestamp(1700000000, unit='s')},
+                   {'type': 'SELL', 'confidence': 60, 'timestamp': pd.Timestamp(1700000900, unit='s')}]
+
+        assert bot.deliver_signals(signals, 'BTCUSDT', '15min') == 1
+        assert not bot.state.is_new_signal_candle('BTCUSDT', '15min', 1700000000)
+        assert bot.state.is_new_signal_candle('BTCUSDT', '15min', 1700000900)
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,69 @@
+import pytest
+import json
+import numpy as np
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from services.debug_service import DebugService, PIPELINE_STAGES
+from unittest.mock import Mock
+
+def make_payload(n=300, seed=1):
+    """پاسخ خام /market/kline با قیمت‌های گام تصادفی"""
+    rng = np.random.default_rng(seed)
+    close = 100 + np.cumsum(rng.normal(0, 1, n))
+    rows = [
+        [1700000000 + i * 900, f"{c:.4f}", f"{c:.4f}", f"{c + 1:.4f}", f"{c - 1:.4f}", "1000"]
+        for i, c in enumerate(close)
+    ]
+    return json.dumps({"code": 0, "data": rows, "message": "OK"}).encode()
+
+class TestDebugService:
+
+    @pytest.fixture
+    def debug_service(self, tmp_path):
+        api = Mock()
+        api.get_kline_payload.return_value = make_payload()
+        return DebugService(coinex_api=api, debug_dir=str(tmp_path / 'debug'))
+
+    def test_profile_symbol_writes_stats_and_collapsed_stacks(self, debug_service, tmp_path):
+        """تست پروفایل یک نماد با هر دو پروفایلر و تفکیک مراحل"""
+        result = debug_service.profile_symbol('BTCUSDT', profiler='both', output_dir=str(tmp_path), repeat=3)
+
+        assert result['status'] == 'success'
+        assert result['data_points'] == 300
+        assert set(result['stages']) == set(PIPELINE_STAGES)
+        assert os.path.exists(result['files']['pstats'])
+        assert os.path.exists(result['files']['stats_text'])
+        assert result['top_functions']
+
+        with open(result['files']['collapsed'], encoding='utf-8') as f:
+            lines = f.read().splitlines()
+        # ریشه هر پشته نام مرحله pipeline است
+        roots = {line.split(';', 1)[0] for line in lines}
+        assert roots & set(PIPELINE_STAGES)
+        assert all(line.rsplit(' ', 1)[1].isdigit() for line in lines)
+
+    def test_profile_symbol_reports_failure(self, debug_service, tmp_path):
+        """تست گزارش خطا وقتی داده‌ای دریافت نشود"""
+        debug_service.coinex_api.get_kline_payload.return_value = None
+
+        result = debug_service.profile_symbol('BTCUSDT', profiler='cprofile', output_dir=str(tmp_path))
+
+        assert result['status'] == 'failed'
+        assert result['error'] == 'No data'
+        assert list(result['stages']) == ['fetch']
+
+    def test_comprehensive_merges_profiles(self, debug_service):
+        """تست ادغام پروفایل نمادها در حالت جامع"""
+        results = debug_service.run_comprehensive_test(
+            symbols=['BTCUSDT', 'ETHUSDT'], profiler='both', parallel=False
+        )
+
+        assert [r['status'] for r in results.values()] == ['success', 'success']
+        output_dir = os.path.dirname(results['BTCUSDT']['files']['pstats'])
+        assert os.path.exists(os.path.join(output_dir, 'combined.prof'))
+        assert os.path.exists(os.path.join(output_dir, 'combined.collapsed'))
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,88 @@
+import pytest
+import numpy as np
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from services.kline_decoder import decode_klines, _decode_parsed
+from services.market_state import MarketState
+from services.state_snapshot import save_snapshot, load_snapshot
+from strategies.mutanabby_strategy import MutanabbyStrategy
+from utils.dtype_policy import resolve_dtype, frame_nbytes
+from conftest import make_ohlcv
+
+def make_window(seed, rows=200):
+    """پنجره تصادفی با قیمت‌های دو رقم اعشار (مثل داده صرافی) در مقیاس‌های متنوع"""
+    rng = np.random.default_rng(seed)
+    return make_ohlcv(seed, rows, base=rng.uniform(0.5, 50000), volatility=rng.uniform(0.002, 0.03), decimals=2)
+
+def strategy_with_dtype(name):
+    strategy = MutanabbyStrategy()
+    strategy.dtype = resolve_dtype(name)
+    return strategy
+
+class TestDtypePolicy:
+
+    def test_resolve_dtype(self):
+        """تست نوع‌های داده مجاز"""
+        assert resolve_dtype('float32') == np.float32
+        with pytest.raises(ValueError):
+            resolve_dtype('float16')
+
+    def test_decode_float32(self):
+        """تست دیکود مستقیم کندل‌ها به float32 در هر دو مسیر"""
+        numeric = b'{"code":0,"data":[[1609459200,"29000.5","29050","29100","28900","1000"]]}'
+        market = b'{"code":0,"data":[[1609459200,"29000.5","29050","29100","28900","1000","x","BTCUSDT"]]}'
+
+        for candles in (decode_klines(numeric, np.float32), decode_klines(market, np.float32),
+                        _decode_parsed(market, np.float32)):
+            assert candles.values.dtype == np.float32
+            assert candles.timestamp.tolist() == [1609459200]
+            assert candles.open[0] == np.float32(29000.5)
+
+    def test_snapshot_keeps_float32(self, tmp_path):
+        """تست ذخیره float32 با تعداد ردیف فرد (هم‌ترازی) و حجم کمتر اسنپ‌شات"""
+        window = make_window(1, rows=99).astype(np.float32)
+        sizes = {}
+        for name, frame in (('float32', window), ('float64', window.astype(np.float64))):
+            state = MarketState()
+            state.merge('BTCUSDT', '15min', frame)
+            sizes[name] = save_snapshot(state, str(tmp_path / f'{name}.bin'))
+
+        restored, _ = load_snapshot(str(tmp_path / 'float32.bin'))
+        loaded = restored.get('BTCUSDT', '15min')
+        np.testing.assert_array_equal(loaded.window['close'].to_numpy(), window['close'].to_numpy())
+        assert sizes['float64'] - sizes['float32'] >= 99 * 5 * 4 - 8
+
+    def test_indicator_memory_halved(self):
+        """تست حجم پنجره با اندیکاتورها در float32"""
+        window = make_window(2)
+        full = strategy_with_dtype('float64').calculate_indicators(window.copy())
+        compact = strategy_with_dtype('float32').calculate_indicators(window.astype(np.float32))
+
+        assert (compact.dtypes == np.float32).all()
+        index_bytes = window.index.nbytes
+        assert frame_nbytes(compact) - index_bytes == (frame_nbytes(full) - index_bytes) // 2
+
+    def test_signal_decisions_match_float64(self):
+        """تست یکسان بودن تصمیم‌های سیگنال float32 و float64 روی پنجره‌های متنوع"""
+        reference = strategy_with_dtype('float64')
+        compact = strategy_with_dtype('float32')
+        decisions = 0
+
+        for seed in range(120):
+            window = make_window(seed)
+            expected = reference.generate_signals(window)
+            actual = compact.generate_signals(window.astype(np.float32))
+
+            assert [(s['type'], s['confidence'], s['timestamp']) for s in actual] == \
+                [(s['type'], s['confidence'], s['timestamp']) for s in expected], seed
+            for got, want in zip(actual, expected):
+                assert got['entry'] == pytest.approx(want['entry'], rel=1e-6)
+            decisions += len(expected)
+
+        # مجموعه آزمون باید واقعا سیگنال تولید کند
+        assert decisions > 50
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,75 @@
+import pytest
+import json
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from utils.error_sink import ErrorSink
+from utils import error_handler as error_handler_module
+from utils.error_handler import ErrorHandler
+
+def fail(message="exchange down"):
+    raise ConnectionError(message)
+
+def read_records(path):
+    with open(path, encoding='utf-8') as f:
+        return [json.loads(line) for line in f]
+
+class TestErrorSink:
+
+    @pytest.fixture
+    def sink(self, tmp_path):
+        sink = ErrorSink(path=str(tmp_path / 'logs' / 'errors.jsonl'), flush_interval=60)
+        yield sink
+        sink.close()
+
+    def test_storm_collapses_into_one_record(self, sink):
+        """تست تجمیع خطاهای یکسان در یک رکورد با شمارش"""
+        for i in range(1000):
+            try:
+                fail(f"attempt {i}")
+            except ConnectionError as e:
+                sink.record('fetch_market_data', e)
+
+        sink.flush()
+        records = read_records(sink.path)
+
+        assert len(records) == 1
+        assert records[0]['count'] == 1000
+        assert records[0]['exception_type'] == 'ConnectionError'
+        assert records[0]['exception_message'] == 'attempt 999'
+        assert records[0]['first_seen'] <= records[0]['last_seen']
+        assert 'fail' in records[0]['location']
+
+    def test_different_contexts_are_separate(self, sink):
+        """تست جدا ماندن خطاهای با context متفاوت"""
+        for context in ('BTCUSDT', 'ETHUSDT', 'BTCUSDT'):
+            try:
+                fail()
+            except ConnectionError as e:
+                sink.record(context, e)
+
+        sink.flush()
+        counts = {r['context']: r['count'] for r in read_records(sink.path)}
+
+        assert counts == {'BTCUSDT': 2, 'ETHUSDT': 1}
+
+    def test_handle_error_uses_sink(self, sink, monkeypatch):
+        """تست ثبت خطای دکوراتور handle_error در sink"""
+        monkeypatch.setattr(error_handler_module, 'error_sink', sink)
+
+        @ErrorHandler.handle_error(context="decorated")
+        def broken():
+            fail()
+
+        assert broken() is None
+        assert broken() is None
+        sink.close()
+
+        records = read_records(sink.path)
+        assert len(records) == 1
+        assert records[0]['context'] == 'decorated'
+        assert records[0]['count'] == 2
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,116 @@
+import pytest
+import numpy as np
+import pandas as pd
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from strategies import indicators
+
+def make_prices(seed, rows=500, base=30000.0, scale=50.0):
+    rng = np.random.default_rng(seed)
+    return base + np.cumsum(rng.normal(0, scale, rows))
+
+def wilder_reference(values, period):
+    """میانگین Wilder با pandas: مقدار اولیه میانگین ساده و سپس ewm(alpha=1/period)"""
+    result = pd.Series(np.nan, index=values.index)
+    if len(values) > period:
+        seeded = values.iloc[period:].copy()
+        seeded.iloc[0] = values.iloc[1:period + 1].mean()
+        result.iloc[period:] = seeded.ewm(alpha=1 / period, adjust=False).mean()
+    return result
+
+def assert_matches(actual, expected, scale=1.0):
+    np.testing.assert_allclose(actual, np.asarray(expected, dtype=float), rtol=1e-9, atol=1e-9 * scale)
+
+class TestIndicators:
+
+    @pytest.mark.parametrize('rows', [5, 30, 500])
+    def test_matches_pandas(self, rows):
+        """تست برابری همه کرنل‌ها با محاسبات مرجع pandas"""
+        close = make_prices(rows, rows)
+        series = pd.Series(close)
+
+        assert_matches(indicators.sma(close, 20), series.rolling(20).mean(), 30000)
+        np.testing.assert_allclose(indicators.rolling_std(close, 20), series.rolling(20).std(), rtol=1e-7)
+        assert_matches(indicators.ema(close, span=12), series.ewm(span=12, adjust=False).mean(), 30000)
+
+        fast = series.ewm(span=12, adjust=False).mean() - series.ewm(span=26, adjust=False).mean()
+        line, signal, histogram = indicators.macd(close)
+        assert_matches(line, fast, 30000)
+        assert_matches(signal, fast.ewm(span=9, adjust=False).mean(), 30000)
+        assert_matches(histogram, fast - fast.ewm(span=9, adjust=False).mean(), 30000)
+
+        middle, upper, lower = indicators.bollinger(close)
+        std = series.rolling(20).std()
+        np.testing.assert_allclose(upper, series.rolling(20).mean() + 2 * std, rtol=1e-9)
+        np.testing.assert_allclose(lower, series.rolling(20).mean() - 2 * std, rtol=1e-9)
+
+        delta = series.diff()
+        gain = wilder_reference(delta.clip(lower=0), 14)
+        loss = wilder_reference((-delta).clip(lower=0), 14)
+        assert_matches(indicators.rsi(close, 14), 100 - 100 / (1 + gain / loss), 100)
+
+    def test_atr_matches_pandas(self):
+        """تست ATR در برابر دامنه واقعی و ewm در pandas"""
+        close = make_prices(1)
+        high, low = close + 20, close - 20
+        frame = pd.DataFrame({'high': high, 'low': low, 'close': close})
+        tr = pd.concat([frame['high'] - frame['low'], (frame['high'] - frame['close'].shift()).abs(),
+                        (frame['low'] - frame['close'].shift()).abs()], axis=1).max(axis=1)
+        seeded = tr.iloc[13:].copy()
+        seeded.iloc[0] = tr.iloc[:14].mean()
+        expected = pd.concat([pd.Series([np.nan] * 13), seeded.ewm(alpha=1 / 14, adjust=False).mean()])
+
+        assert_matches(indicators.atr(high, low, close, 14), expected, 100)
+
+    def test_two_dimensional_rows_are_independent(self):
+        """تست ورودی دو بعدی: هر ردیف (نماد) برابر با محاسبه جداگانه آن"""
+        prices = np.vstack([make_prices(seed, base=base, scale=base / 500)
+                            for seed, base in enumerate((30000.0, 2000.0, 0.5))])
+
+        for kernel in (lambda x: indicators.sma(x, 20), lambda x: indicators.ema(x, span=26),
+                       lambda x: indicators.rsi(x), lambda x: indicators.rolling_std(x, 20)):
+            batch = kernel(prices)
+            for row, values in zip(batch, prices):
+                np.testing.assert_allclose(row, kernel(values), rtol=1e-12, equal_nan=True)
+        np.testing.assert_allclose(indicators.macd(prices)[:, 2], indicators.macd(prices[2]), rtol=1e-12)
+
+    def test_reuses_output_buffers(self):
+        """تست نوشتن در بافرهای از پیش تخصیص داده شده و رد بافر نامعتبر"""
+        close = make_prices(2, rows=100)
+        out = np.empty(100)
+        triple = np.empty((3, 100))
+        work = np.empty((2, 100))
+
+        assert indicators.sma(close, 20, out=out) is out
+        assert indicators.rsi(close, out=out, work=work) is out
+        assert indicators.macd(close, out=triple) is triple
+        assert indicators.bollinger(close, out=triple) is triple
+        np.testing.assert_allclose(triple, indicators.bollinger(close), equal_nan=True)
+
+        with pytest.raises(ValueError):
+            indicators.sma(close, 20, out=np.empty(99))
+        with pytest.raises(ValueError):
+            indicators.ema(close, span=12, out=np.empty(100, dtype=np.float32))
+        with pytest.raises(ValueError):
+            indicators.sma(np.ones((2, 2, 2)), 2)
+
+    def test_low_volatility_std(self):
+        """تست انحراف معیار قیمت بزرگ با نوسان بسیار کم بدون حذف ارقام"""
+        close = 65000 + make_prices(3, base=0.0, scale=1e-4)
+
+        np.testing.assert_allclose(indicators.rolling_std(close, 20)[19:],
+                                   pd.Series(close).rolling(20).std()[19:], rtol=1e-5)
+
+    def test_flat_segment_std_is_zero(self):
+        """تست انحراف معیار دقیقا صفر روی پنجره‌های ثابت بعد از یک روند"""
+        close = np.r_[np.linspace(65000.1, 65100.7, 30), np.full(40, 65100.7)]
+
+        std = indicators.rolling_std(close, 20)
+
+        assert (std[-21:] == 0).all()
+        assert np.isnan(std[:19]).all()
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
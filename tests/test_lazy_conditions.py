@@ -0,0 +1,91 @@
+import pytest
+import numpy as np
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from strategies.lazy_conditions import LastBarIndicators, CONDITIONS, count_votes
+from strategies.mutanabby_strategy import MutanabbyStrategy
+from conftest import make_ohlcv
+
+def make_window(seed, rows=200):
+    rng = np.random.default_rng(seed)
+    return make_ohlcv(seed, rows, volatility=rng.uniform(0.002, 0.03), decimals=4)
+
+class TestLazyConditions:
+
+    @pytest.fixture
+    def strategies(self):
+        eager, lazy = MutanabbyStrategy(), MutanabbyStrategy()
+        eager.lazy, lazy.lazy = False, True
+        return eager, lazy
+
+    def test_last_bar_indicators_match_full_window(self):
+        """تست برابری اندیکاتورهای آخرین کندل با calculate_indicators"""
+        window = make_window(3)
+        expected = MutanabbyStrategy().calculate_indicators(window.copy()).iloc[-1]
+        indicators = LastBarIndicators(window['close'].to_numpy())
+
+        for name in ['sma_20', 'sma_50', 'rsi', 'bb_upper', 'bb_lower', 'macd', 'macd_signal']:
+            assert indicators[name] == pytest.approx(expected[name], rel=1e-9), name
+
+    def test_conditions_ordered_by_cost(self):
+        """تست مرتب بودن شرط‌ها از ارزان به گران و گران بودن MACD"""
+        costs = [condition.cost for condition in CONDITIONS]
+        assert costs == sorted(costs)
+        assert CONDITIONS[-1].name == 'macd'
+
+    def test_same_signals_as_full_evaluation(self, strategies):
+        """تست یکسان بودن سیگنال‌های مسیر تنبل و مسیر کامل"""
+        eager, lazy = strategies
+        produced = 0
+        for seed in range(150):
+            window = make_window(seed)
+            expected = eager.generate_signals(window)
+            actual = lazy.generate_signals(window)
+            # اندیکاتورهای ثبت شده همراه سیگنال فقط در حد خطای ممیز شناور برابرند
+            snapshots = [signal.pop('indicators') for signal in actual]
+            assert actual == [{k: v for k, v in s.items() if k != 'indicators'} for s in expected], seed
+            for snapshot, signal in zip(snapshots, expected):
+                assert snapshot == pytest.approx(signal['indicators'], rel=1e-9, nan_ok=True)
+            produced += len(expected)
+        assert produced > 20
+        # به طور میانگین کمتر از همه 10 ارزیابی (5 شرط × 2 سمت)
+        assert lazy.condition_stats['evaluated'] < 10 * lazy.condition_stats['symbols']
+
+    def test_early_rejection_skips_expensive_indicators(self):
+        """تست رد زودهنگام: وقتی هیچ سمتی به 3 رای نمی‌رسد MACD محاسبه نمی‌شود"""
+        class FixedIndicators(dict):
+            def __init__(self, values):
+                super().__init__(values)
+                self.requested = []
+
+            def __getitem__(self, name):
+                self.requested.append(name)
+                return super().__getitem__(name)
+
+        # RSI خنثی، قیمت زیر میانگین 20 و داخل باندها، میانگین 20 بالای 50
+        indicators = FixedIndicators({
+            'close': 100.0, 'rsi': 50.0, 'sma_20': 101.0, 'sma_50': 99.0,
+            'bb_upper': 110.0, 'bb_lower': 90.0, 'macd': 1.0, 'macd_signal': 0.5,
+        })
+
+        accepted, evaluated = count_votes(indicators)
+
+        assert accepted == {}
+        assert 'macd' not in indicators.requested
+        assert evaluated < 2 * len(CONDITIONS)
+
+    def test_accepted_side_counts_all_votes(self):
+        """تست محاسبه کامل رای سمت پذیرفته شده برای اطمینان سیگنال"""
+        indicators = {
+            'close': 80.0, 'rsi': 25.0, 'sma_20': 79.0, 'sma_50': 78.0,
+            'bb_upper': 95.0, 'bb_lower': 85.0, 'macd': 1.0, 'macd_signal': 0.5,
+        }
+
+        accepted, _ = count_votes(indicators)
+
+        assert accepted == {'BUY': 5}
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
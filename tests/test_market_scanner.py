@@ -0,0 +1,133 @@
+import pytest
+import numpy as np
+from unittest.mock import Mock
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from services.market_scanner import MarketScanner
+from services.kline_decoder import OHLCV
+from strategies.lazy_conditions import LastBarIndicators, CONDITIONS
+from conftest import make_ohlcv
+
+def make_windows(count, rows=100, seed=0):
+    rng = np.random.default_rng(seed)
+    return {
+        f"M{i:04d}USDT": make_ohlcv(int(rng.integers(2**32)), rows, drift=rng.normal(0, 0.003),
+                                    volatility=rng.uniform(0.002, 0.03))['close'].to_numpy()
+        for i in range(count)
+    }
+
+def full_score(closes):
+    """امتیاز بهترین سمت بدون هرس (مرجع)"""
+    indicators = LastBarIndicators(closes)
+    totals = {side: sum(condition.score(side, indicators) for condition in CONDITIONS)
+              for side in ('BUY', 'SELL')}
+    side = max(totals, key=totals.get)
+    return totals[side], side
+
+class TestMarketScanner:
+
+    def test_condition_scores_agree_with_votes(self):
+        """تست سازگاری امتیاز پیوسته با شرط‌ها: بیشتر از 0.5 فقط وقتی شرط برقرار است"""
+        for closes in make_windows(100, seed=1).values():
+            indicators = LastBarIndicators(closes)
+            for condition in CONDITIONS:
+                for side in ('BUY', 'SELL'):
+                    score = condition.score(side, indicators)
+                    assert 0 <= score <= 1
+                    assert (score > 0.5) == condition.test(side, indicators)
+
+    def test_top_k_matches_full_evaluation(self):
+        """تست یکسان بودن فهرست برتر با امتیازدهی کامل همه نمادها و هرس نمادهای ضعیف"""
+        windows = make_windows(400)
+        scanner = MarketScanner(top_k=10)
+
+        ranked = scanner.scan(windows)
+
+        expected = sorted(((*full_score(closes), symbol) for symbol, closes in windows.items()),
+                          key=lambda item: (-item[0], item[2]))[:10]
+        assert [(entry['symbol'], entry['type']) for entry in ranked] == [(s, side) for _, side, s in expected]
+        assert [entry['score'] for entry in ranked] == [round(score, 4) for score, _, _ in expected]
+        assert scanner.stats['pruned'] > 0
+        assert scanner.stats['pruned'] + scanner.stats['scored'] == len(windows)
+        # هرس باعث می‌شود کمتر از همه شرط‌ها (5 شرط × 2 سمت) ارزیابی شوند
+        assert scanner.stats['conditions'] < 2 * len(CONDITIONS) * len(windows)
+
+    def test_previous_scores_order_next_scan(self):
+        """تست ترتیب اسکن بر اساس امتیاز چرخه قبل و هرس بیشتر در چرخه دوم"""
+        windows = make_windows(300, seed=2)
+        scanner = MarketScanner(top_k=5)
+        first = scanner.scan(windows)
+        pruned_first = scanner.stats['pruned']
+
+        second = scanner.scan(windows)
+
+        assert second == first
+        assert scanner.stats['pruned'] - pruned_first >= pruned_first
+
+    def test_time_budget(self):
+        """تست توقف اسکن با پایان بودجه زمانی"""
+        ticks = iter(range(1000))
+        scanner = MarketScanner(top_k=3, clock=lambda: next(ticks))
+
+        ranked = scanner.scan(make_windows(20), deadline=5)
+
+        assert scanner.stats['over_budget'] == 15
+        assert scanner.stats['scored'] + scanner.stats['pruned'] == 5
+        assert len(ranked) == 3
+
+    def test_bot_scan_markets(self):
+        """تست چرخه اسکن ربات روی بازارهای USDT و ارسال فهرست"""
+        from main import CoinExSignalBot
+
+        windows = make_windows(30, seed=3)
+        api = Mock()
+        api.get_market_list.return_value = list(windows) + ['ETHBTC']
+        api.get_klines_many.side_effect = lambda requests, timeframe: {
+            symbol: OHLCV(np.arange(100, dtype=np.int64), np.vstack([windows[symbol]] * 5))
+            for symbol in requests
+        }
+        telegram = Mock()
+        telegram.send_message.return_value = True
+        bot = CoinExSignalBot(coinex_api=api, telegram_bot=telegram)
+
+        ranked = bot.scan_markets(MarketScanner(top_k=5))
+
+        assert len(ranked) == 5
+        assert 'ETHBTC' not in api.get_klines_many.call_args.args[0]
+        text = telegram.send_message.call_args.args[0]
+        assert ranked[0]['symbol'] in text and text.count('\n') >= 5
+
+    def test_bot_scan_fetch_within_budget(self, monkeypatch):
+        """تست دریافت دسته‌ای کندل‌ها در همان بودجه زمانی و رتبه‌بندی دسته‌های دریافت شده"""
+        import main
+
+        monkeypatch.setattr(main, 'SCANNER_FETCH_BATCH', 10)
+        monkeypatch.setattr(main, 'SCANNER_TIME_BUDGET_SECONDS', 60)
+        windows = make_windows(30, seed=4)
+        now = {'time': 0.0}
+
+        def slow_fetch(requests, timeframe):
+            # هر دسته 40 ثانیه طول می‌کشد
+            now['time'] += 40
+            return {symbol: OHLCV(np.arange(100, dtype=np.int64), np.vstack([windows[symbol]] * 5))
+                    for symbol in requests}
+
+        api = Mock()
+        api.get_market_list.return_value = list(windows)
+        api.get_klines_many.side_effect = slow_fetch
+        bot = main.CoinExSignalBot(coinex_api=api, telegram_bot=Mock())
+        scanner = MarketScanner(top_k=5, clock=lambda: now['time'])
+
+        ranked = bot.scan_markets(scanner)
+
+        # دسته سوم پس از پایان بودجه درخواست نمی‌شود و دسته اول رتبه‌بندی شده است
+        assert api.get_klines_many.call_count == 2
+        assert len(ranked) == 5
+        assert {entry['symbol'] for entry in ranked} <= set(api.get_klines_many.call_args_list[0].args[0])
+        assert scanner.stats['scored'] + scanner.stats['pruned'] == 10
+        assert scanner.stats['over_budget'] == 10
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,72 @@
+import pytest
+import numpy as np
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from utils.memory_profiler import MemoryProfiler
+from utils.performance_monitor import PerformanceMonitor
+
+class TestMemoryProfiler:
+
+    @pytest.fixture
+    def monitor(self):
+        monitor = PerformanceMonitor()
+        profiler = monitor.enable_memory_profiling(growth_cycles=3, growth_min_bytes=1024)
+        monitor.start_monitoring()
+        yield monitor
+        profiler.stop()
+
+    def test_stage_reports_peak_and_allocation_site(self, monitor):
+        """تست ثبت بیشینه حافظه و محل تخصیص هر مرحله"""
+        kept = []
+        with monitor.stage('fetch', 'BTCUSDT'):
+            temporary = np.ones(500_000)  # ~4MB که پایان مرحله آزاد می‌شود
+            kept.append(list(range(10_000)))
+            del temporary
+
+        report = monitor.get_performance_report()['memory_profile']['stages']['fetch']
+
+        assert report['count'] == 1
+        assert report['peak_bytes'] >= 4_000_000
+        assert 0 < report['net_bytes'] < report['peak_bytes']
+        assert report['peak_by_symbol']['BTCUSDT'] == report['peak_bytes']
+        assert any(site['site'].startswith('test_memory_profiler.py') for site in report['top_sites'])
+
+    def test_nested_stage_does_not_hide_outer_peak(self, monitor):
+        """تست حفظ بیشینه مرحله بیرونی هنگام reset_peak مرحله داخلی"""
+        with monitor.stage('cycle'):
+            temporary = np.ones(500_000)
+            del temporary
+            with monitor.stage('send'):
+                pass
+
+        stages = monitor.get_performance_report()['memory_profile']['stages']
+
+        assert stages['cycle']['peak_bytes'] >= 4_000_000
+        assert stages['send']['peak_bytes'] < 4_000_000
+
+    def test_monotonic_growth_is_flagged(self):
+        """تست تشخیص رشد پیوسته حافظه بین چرخه‌ها"""
+        profiler = MemoryProfiler(growth_cycles=3, growth_min_bytes=1000)
+
+        profiler.cycle_memory = [5000, 4000, 5000, 4000]
+        assert profiler.detect_growth() is None
+
+        profiler.cycle_memory = [1000, 2000, 3000, 4000]
+        growth = profiler.detect_growth()
+        assert growth['growth_bytes'] == 3000
+        assert growth['bytes_per_cycle'] == 1000
+
+    def test_end_cycle_without_profiling(self):
+        """تست عدم سربار وقتی پروفایل حافظه فعال نیست"""
+        monitor = PerformanceMonitor()
+        monitor.start_monitoring()
+        with monitor.stage('fetch'):
+            pass
+
+        assert monitor.end_cycle() is None
+        assert monitor.get_performance_report()['memory_profile'] is None
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,93 @@
+import pytest
+import numpy as np
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from services.order_book import OrderBook, OrderBookStore
+
+DEPTH = {
+    'bids': [["99.9", "10"], ["99.5", "20"], ["99.0", "50"]],
+    'asks': [["100.1", "10"], ["100.5", "20"], ["101.0", "50"]],
+    'time': 1700000000000,
+}
+
+class TestOrderBook:
+
+    @pytest.fixture
+    def book(self):
+        return OrderBook('BTCUSDT').apply(DEPTH)
+
+    def test_snapshot_queries(self, book):
+        """تست spread، عمق بازه و ترتیب سطوح"""
+        assert book.bids.best == 99.9
+        assert book.asks.best == 100.1
+        assert book.mid == pytest.approx(100.0)
+        assert book.spread_bps() == pytest.approx(20.0)
+        # بازه ±0.6% از 100: سطوح 99.5 تا 100.5
+        assert book.depth_within(0.6) == pytest.approx(99.9 * 10 + 99.5 * 20 + 100.1 * 10 + 100.5 * 20)
+        assert book.depth_within(0.2, price=100.3) == pytest.approx(100.1 * 10 + 100.5 * 20)
+
+    def test_slippage_walks_levels(self, book):
+        """تست لغزش سفارش بزرگ‌تر از بهترین سطح"""
+        assert book.slippage_bps(500) == pytest.approx(0.0)
+
+        notional = 100.1 * 10 + 100.5 * 10
+        average = notional / 20
+        assert book.slippage_bps(notional) == pytest.approx((average - 100.1) / 100.1 * 10000)
+        # عمق ناکافی
+        assert book.slippage_bps(1e9) is None
+
+    def test_incremental_update(self, book):
+        """تست حذف، تغییر و افزودن سطح بدون ساخت دوباره دفتر"""
+        book.apply({'bids': [["99.9", "0"], ["99.7", "5"], ["99.5", "1"], ["99.5", "25"]],
+                    'asks': [["100.05", "3"]]}, clean=False)
+
+        assert book.bids.prices.tolist() == [99.7, 99.5, 99.0]
+        assert book.bids.sizes.tolist() == [5.0, 25.0, 50.0]
+        assert book.asks.best == 100.05
+        assert book.updated_at == 1700000000000
+        assert book.updates == 2
+
+    def test_random_updates_match_rebuild(self):
+        """تست برابری به‌روزرسانی افزایشی با ساخت دوباره دفتر از همه سطوح پس از هر دسته تغییر"""
+        rng = np.random.default_rng(0)
+        book = OrderBook('BTCUSDT')
+        levels = {'bids': {}, 'asks': {}}
+        for _ in range(300):
+            diff = {}
+            for side, low in (('bids', 90.0), ('asks', 100.0)):
+                prices = np.round(low + rng.integers(0, 60, rng.integers(1, 12)) * 0.25, 2)
+                sizes = np.where(rng.random(len(prices)) < 0.3, 0.0, rng.integers(1, 50, len(prices)))
+                diff[side] = [[str(price), str(size)] for price, size in zip(prices, sizes)]
+                for price, size in zip(prices, sizes):
+                    if size > 0:
+                        levels[side][price] = size
+                    else:
+                        levels[side].pop(price, None)
+            book.apply(diff, clean=False)
+
+            for side, descending in (('bids', True), ('asks', False)):
+                expected = sorted(levels[side].items(), reverse=descending)
+                actual = getattr(book, side)
+                assert actual.prices.tolist() == [price for price, _ in expected]
+                assert actual.sizes.tolist() == [size for _, size in expected]
+
+    def test_liquidity_filter(self):
+        """تست حاشیه‌نویسی و حذف سیگنال کم‌نقدینگی"""
+        store = OrderBookStore(band_pct=0.5, order_notional=1000, max_spread_bps=30,
+                               max_slippage_bps=30, min_depth_notional=3000)
+        store.apply('BTCUSDT', DEPTH)
+        store.apply('THINUSDT', {'bids': [["9.0", "1"]], 'asks': [["11.0", "1"]]})
+        signals = [{'type': 'BUY', 'entry': 100.0}]
+
+        accepted = store.filter_signals(signals, 'BTCUSDT')
+        assert accepted == signals
+        assert accepted[0]['liquidity']['spread_bps'] == pytest.approx(20.0)
+
+        assert store.filter_signals([{'type': 'SELL', 'entry': 10.0}], 'THINUSDT') == []
+        # نماد بدون دفتر سفارش فیلتر نمی‌شود
+        assert len(store.filter_signals([{'type': 'BUY', 'entry': 1.0}], 'ETHUSDT')) == 1
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
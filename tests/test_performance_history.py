@@ -0,0 +1,70 @@
+import pytest
+import numpy as np
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from utils.performance_history import PerformanceHistory
+
+def make_report(fetch_mean, indicators_mean, memory=120.0):
+    """گزارش نمونه با قالب خروجی PerformanceMonitor"""
+    return {
+        'timestamp': '2026-01-01T00:00:00',
+        'total_duration_seconds': fetch_mean * 3 + indicators_mean * 3,
+        'memory_usage_mb': memory,
+        'cpu_percent': 10.0,
+        'stages': {
+            'fetch': {'total_seconds': fetch_mean * 3, 'count': 3,
+                      'mean_seconds': fetch_mean, 'max_seconds': fetch_mean * 1.2},
+            'signals': {'total_seconds': indicators_mean * 3, 'count': 3,
+                        'mean_seconds': indicators_mean, 'max_seconds': indicators_mean},
+        },
+        'counts': {'symbols': 3, 'signals_sent': 1},
+    }
+
+class TestPerformanceHistory:
+
+    @pytest.fixture
+    def history(self, tmp_path):
+        history = PerformanceHistory(str(tmp_path / 'history.sqlite'))
+        rng = np.random.default_rng(7)
+        for i in range(15):
+            history.ingest(make_report(0.30 + rng.normal(0, 0.01), 0.05 + rng.normal(0, 0.002)),
+                           run_id=f"run-{i}")
+        yield history
+        history.close()
+
+    def test_ingest_is_append_only_and_idempotent(self, history):
+        """تست عدم ثبت دوباره یک اجرا"""
+        assert history.ingest(make_report(0.3, 0.05), run_id='run-0') is None
+        assert history.run_count() == 15
+
+    def test_stable_run_has_no_regression(self, history):
+        """تست عدم علامت‌گذاری اجرای عادی"""
+        history.ingest(make_report(0.305, 0.051), run_id='run-new')
+
+        regressions = [r for r in history.detect_regressions() if r['regression']]
+
+        assert regressions == []
+
+    def test_slow_stage_is_flagged(self, history):
+        """تست تشخیص کندشدن مرحله fetch"""
+        history.ingest(make_report(0.60, 0.05), run_id='run-slow')
+
+        flagged = {r['metric'] for r in history.detect_regressions() if r['regression']}
+
+        assert 'stage.fetch.mean_seconds' in flagged
+        assert 'stage.signals.mean_seconds' not in flagged
+
+    def test_trend_report(self, history):
+        """تست تولید گزارش روند"""
+        history.ingest(make_report(0.60, 0.05), run_id='run-slow')
+
+        report, regressions = history.trend_report()
+
+        assert 'Regressions' in report
+        assert 'stage.fetch.mean_seconds' in report
+        assert len(regressions) >= 1
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,68 @@
+import pytest
+import json
+import numpy as np
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from services.replay_service import ReplayService
+from main import CoinExSignalBot
+
+def write_recording(directory, symbol, candles=120, seed=0):
+    """ضبط ساختگی کندل‌ها با قیمت‌های تصادفی قطعی (ترتیب CoinEx: زمان، open، close، high، low، حجم)"""
+    rng = np.random.default_rng(seed)
+    close = 30000 + np.cumsum(rng.normal(0, 150, candles))
+    rows = []
+    for i, price in enumerate(close):
+        rows.append([
+            1700000000 + i * 900,
+            str(round(price - 20, 2)),
+            str(round(price, 2)),
+            str(round(price + 60, 2)),
+            str(round(price - 60, 2)),
+            str(round(rng.uniform(100, 500), 3))
+        ])
+    with open(os.path.join(directory, f"{symbol}.json"), 'w') as f:
+        json.dump({'code': 0, 'data': rows}, f)
+
+class TestReplayService:
+
+    @pytest.fixture
+    def data_dir(self, tmp_path):
+        write_recording(tmp_path, 'BTCUSDT', seed=1)
+        write_recording(tmp_path, 'ETHUSDT', seed=2)
+        return str(tmp_path)
+
+    def run_replay(self, data_dir, speed=None):
+        replay = ReplayService(data_dir=data_dir, speed=speed)
+        bot = CoinExSignalBot(coinex_api=replay.api, telegram_bot=replay.telegram_bot)
+        return replay.run(bot)
+
+    def test_window_never_exposes_future_candles(self, data_dir):
+        """تست اینکه API بازپخش فقط کندل‌های بسته شده را برمی‌گرداند"""
+        replay = ReplayService(data_dir=data_dir)
+        replay.api.set_cursor('BTCUSDT', 60)
+
+        rows = replay.api.get_market_data('BTCUSDT', 'kline', 100, '15min')
+
+        assert len(rows) == 60
+        assert rows[-1][0] == 1700000000 + 59 * 900
+
+    def test_replay_is_reproducible(self, data_dir):
+        """تست یکسان بودن خروجی دو بازپخش روی داده یکسان"""
+        first = self.run_replay(data_dir)
+        second = self.run_replay(data_dir)
+
+        assert first['candles_processed'] == 2 * (120 - 49)
+        assert first['candle_latency_ms']['count'] == first['candles_processed']
+        assert first['signals_emitted'] > 0
+        assert first['digest'] == second['digest']
+        assert first['signals'] == second['signals']
+
+    def test_invalid_speed(self, data_dir):
+        """تست رد سرعت خارج از محدوده"""
+        with pytest.raises(ValueError):
+            ReplayService(data_dir=data_dir, speed=5000)
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
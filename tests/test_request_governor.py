@@ -0,0 +1,92 @@
+import pytest
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from services.request_governor import RequestGovernor, CircuitOpenError
+from services.coinex_api import CoinExAPI
+from unittest.mock import patch, Mock
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+class TestRequestGovernor:
+
+    @pytest.fixture
+    def clock(self):
+        return FakeClock()
+
+    @pytest.fixture
+    def governor(self, clock):
+        return RequestGovernor(initial_limit=4, min_limit=1, max_limit=8, latency_target=1.0,
+                               decrease_factor=0.5, failure_threshold=3, open_seconds=30,
+                               clock=clock)
+
+    def complete(self, governor, clock, outcome, latency=0.1):
+        token = governor.acquire()
+        clock.now += latency
+        governor.release(token, outcome)
+
+    def test_additive_increase_on_fast_success(self, governor, clock):
+        """تست افزایش تدریجی همزمانی با پاسخ‌های سریع"""
+        for _ in range(40):
+            self.complete(governor, clock, RequestGovernor.SUCCESS)
+
+        assert governor.limit == 8
+
+    def test_multiplicative_decrease_on_throttle(self, governor, clock):
+        """تست کاهش ضربی با پاسخ 429"""
+        self.complete(governor, clock, RequestGovernor.classify(429))
+
+        assert governor.limit == 2
+        assert governor.state == RequestGovernor.CLOSED
+        assert governor.metrics()['throttled'] == 1
+
+    def test_circuit_opens_and_fails_fast(self, governor, clock):
+        """تست باز شدن مدار پس از خطاهای پیاپی و رد سریع درخواست‌ها"""
+        for _ in range(3):
+            self.complete(governor, clock, RequestGovernor.classify(503))
+
+        assert governor.state == RequestGovernor.OPEN
+        with pytest.raises(CircuitOpenError):
+            governor.acquire()
+        assert governor.metrics()['rejected'] == 1
+
+    def test_half_open_probe(self, governor, clock):
+        """تست درخواست آزمایشی نیمه‌باز: شکست مدار را دوباره باز و موفقیت آن را می‌بندد"""
+        for _ in range(3):
+            self.complete(governor, clock, RequestGovernor.FAILURE)
+
+        clock.now += 31
+        probe = governor.acquire()
+        with pytest.raises(CircuitOpenError):
+            governor.acquire()
+        governor.release(probe, RequestGovernor.FAILURE)
+        assert governor.state == RequestGovernor.OPEN
+
+        clock.now += 31
+        self.complete(governor, clock, RequestGovernor.SUCCESS)
+        assert governor.state == RequestGovernor.CLOSED
+
+    @patch('services.coinex_api.requests.get')
+    def test_coinex_api_skips_requests_when_open(self, mock_get):
+        """تست عدم ارسال درخواست به صرافی وقتی مدار باز است"""
+        mock_response = Mock()
+        mock_response.status_code = 503
+        mock_get.return_value = mock_response
+        api = CoinExAPI()
+
+        for _ in range(10):
+            assert api.get_market_data('BTCUSDT', 'kline', 2, '15min') is None
+
+        metrics = api.get_governor_metrics()
+        assert mock_get.call_count == api.governor.failure_threshold
+        assert metrics['state'] == 'open'
+        assert metrics['rejected'] == 10 - api.governor.failure_threshold
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,84 @@
+import pytest
+import time
+import threading
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from services.request_hedger import RequestHedger
+from services.coinex_api import CoinExAPI
+from unittest.mock import patch, Mock
+
+def make_send(delays, results):
+    """send ساختگی: فراخوانی iام پس از delays[i] ثانیه results[i] را برمی‌گرداند"""
+    calls = []
+    lock = threading.Lock()
+
+    def send():
+        with lock:
+            index = len(calls)
+            calls.append(index)
+        time.sleep(delays[index])
+        return results[index]
+    return send, calls
+
+class TestRequestHedger:
+
+    def make_hedger(self, **kwargs):
+        options = dict(percentile=95, budget_ratio=0.05, budget_burst=1, min_delay=0.01,
+                       default_delay=0.05, min_samples=1000, max_workers=4)
+        options.update(kwargs)
+        return RequestHedger(**options)
+
+    def test_fast_response_is_not_hedged(self):
+        """تست عدم ارسال درخواست تکراری برای پاسخ سریع"""
+        hedger = self.make_hedger()
+        send, calls = make_send([0.0], ['ok'])
+
+        assert hedger.execute('/market/kline', send, lambda r: r == 'ok') == 'ok'
+        assert len(calls) == 1
+        assert hedger.metrics()['hedges_sent'] == 0
+
+    def test_hedge_wins_over_slow_primary(self):
+        """تست برنده شدن درخواست تکراری وقتی درخواست اصلی کند است"""
+        hedger = self.make_hedger()
+        send, calls = make_send([0.5, 0.0], ['slow', 'fast'])
+
+        started = time.perf_counter()
+        result = hedger.execute('/market/kline', send, lambda r: r is not None)
+        elapsed = time.perf_counter() - started
+
+        assert result == 'fast'
+        assert elapsed < 0.4
+        hedger.executor.shutdown(wait=True)
+        metrics = hedger.metrics()
+        assert metrics['hedge_wins'] == 1
+        assert metrics['hedge_rate'] == 1.0
+        assert metrics['saved_ms_total'] > 0
+
+    def test_budget_caps_hedges(self):
+        """تست محدود شدن درخواست‌های تکراری با سهمیه"""
+        hedger = self.make_hedger(budget_ratio=0.0, budget_burst=0)
+        send, calls = make_send([0.1], ['slow'])
+
+        assert hedger.execute('/market/kline', send, lambda r: True) == 'slow'
+        assert len(calls) == 1
+        assert hedger.metrics()['budget_denied'] == 1
+
+    @patch('services.coinex_api.requests.get')
+    def test_coinex_api_uses_hedger(self, mock_get):
+        """تست استفاده get_market_data از hedging در صورت فعال بودن"""
+        mock_response = Mock()
+        mock_response.status_code = 200
+        mock_response.json.return_value = {'code': 0, 'data': [[1609459200, '1', '1.5', '2', '0.5', '10']]}
+        mock_get.return_value = mock_response
+        api = CoinExAPI()
+        api.hedger = self.make_hedger()
+
+        data = api.get_market_data('BTCUSDT', 'kline', 1, '15min')
+
+        assert data[0][2] == '1.5'
+        assert api.get_hedge_metrics()['requests'] == 1
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
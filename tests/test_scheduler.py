@@ -0,0 +1,86 @@
+import pytest
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from services.scheduler import CandleScheduler
+from unittest.mock import Mock
+
+class FakeClock:
+    """ساعت ساختگی که با sleep جلو می‌رود"""
+
+    def __init__(self, now):
+        self.now = now
+
+    def time(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+class TestCandleScheduler:
+
+    @pytest.fixture
+    def clock(self):
+        return FakeClock(1700000100.0)  # 100 ثانیه بعد از مرز 15 دقیقه
+
+    @pytest.fixture
+    def bot(self, clock):
+        bot = Mock()
+        bot.trades = None
+        bot.run_cycle.side_effect = lambda timeframe, deadline: {
+            'signals_sent': 1, 'misses': ['BTCUSDT'] if clock.now > deadline else []
+        }
+        return bot
+
+    def make_scheduler(self, bot, clock, **kwargs):
+        return CandleScheduler(bot, timeframes=['15min', '1hour'], clock=clock.time,
+                               sleep=clock.sleep, seed=1, **kwargs)
+
+    def test_next_close(self, bot, clock):
+        """تست محاسبه نزدیک‌ترین بسته شدن کندل"""
+        scheduler = self.make_scheduler(bot, clock)
+
+        close_time, timeframes = scheduler.next_close()
+
+        assert close_time == 1700000100 - 1700000100 % 900 + 900
+        assert timeframes == ['15min']
+
+    def test_run_once_fires_after_close(self, bot, clock):
+        """تست گرم کردن قبل از بسته شدن و دریافت بعد از آن"""
+        scheduler = self.make_scheduler(bot, clock, fetch_delay=1.0, jitter=0.5)
+        close_time, _ = scheduler.next_close()
+
+        report = scheduler.run_once()
+
+        bot.coinex_api.warm_up.assert_called_once()
+        bot.telegram_bot.warm_up.assert_called_once()
+        assert 1.0 <= report['fire_delay'] <= 1.5
+        assert close_time + 1.0 <= clock.now <= close_time + 1.5 + 0.01
+        assert report['signals_sent'] == 1
+        assert report['misses'] == []
+
+    def test_misses_reported(self, bot, clock):
+        """تست گزارش نمادهایی که از بودجه تاخیر عبور کرده‌اند"""
+        scheduler = self.make_scheduler(bot, clock, fetch_delay=5.0, jitter=0, latency_budget=2)
+
+        report = scheduler.run_once()
+
+        assert report['misses'] == ['BTCUSDT']
+        assert scheduler.total_misses == 1
+
+    def test_watch_until_polls_trades(self, bot, clock):
+        """تست ارزیابی کندل موقت در فاصله انتظار تا گرم کردن"""
+        bot.trades = Mock(timeframe='15min')
+        bot.run_intrabar.return_value = 1
+        scheduler = self.make_scheduler(bot, clock, trade_poll_interval=10)
+
+        sent = scheduler.watch_until(clock.now + 35)
+
+        assert bot.run_intrabar.call_count == 4
+        bot.run_intrabar.assert_called_with('15min')
+        assert sent == 4
+        assert scheduler.total_signals == 4
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,164 @@
+import pytest
+import time
+import numpy as np
+import pandas as pd
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from services.signal_journal import SignalJournal, COLUMN_DTYPES
+
+DAY = 24 * 60 * 60
+START = 1704067200  # 2024-01-01 UTC
+
+def make_signal(timestamp, side='BUY', confidence=60.0, rsi=35.0):
+    return {
+        'type': side, 'entry': 100.0, 'sl': 95.0, 'tp1': 105.0, 'tp2': 108.0, 'tp3': 112.0,
+        'timestamp': pd.Timestamp(timestamp, unit='s'), 'confidence': confidence, 'symbol': 'SYMBOL',
+        'indicators': {'rsi': rsi, 'macd': 1.5, 'sma_20': 99.0},
+    }
+
+class TestSignalJournal:
+
+    @pytest.fixture
+    def journal(self, tmp_path):
+        return SignalJournal(str(tmp_path / 'journal'))
+
+    def test_append_partitions_and_query(self, journal):
+        """تست پارتیشن‌بندی روز/نماد و پرس‌وجوی ترکیبی"""
+        journal.append('ETHUSDT', '15min', [
+            make_signal(START + 900, 'BUY', 80.0),
+            make_signal(START + 1800, 'SELL', 100.0),
+            make_signal(START + DAY + 900, 'BUY', 60.0, rsi=28.0),
+        ], recorded_at=START + 2000)
+        journal.append('BTCUSDT', '15min', [make_signal(START + 900, 'BUY', 100.0)])
+
+        assert sorted(journal.catalog) == ['2024-01-01/BTCUSDT', '2024-01-01/ETHUSDT', '2024-01-02/ETHUSDT']
+        assert len(journal) == 4
+
+        result = journal.query('ETHUSDT', 'BUY', start='2024-01-01', min_confidence=80)
+        assert len(result) == 1
+        row = result.iloc[0]
+        assert row['timestamp'] == pd.Timestamp(START + 900, unit='s')
+        assert row['type'] == 'BUY'
+        assert row['rsi'] == 35.0 and row['macd'] == 1.5
+        assert np.isnan(row['bb_upper'])
+        assert row['timeframe'] == 900
+        assert row['recorded_at'] == (START + 2000) * 1000
+
+        buys = journal.query(side='BUY', columns=['confidence', 'rsi'])
+        assert list(buys.columns) == ['symbol', 'confidence', 'rsi']
+        assert len(buys) == 3
+        assert journal.query('ETHUSDT', end=START + 1800)['type'].tolist() == ['BUY', 'SELL']
+
+    def test_zone_maps_prune_partitions(self, journal):
+        """تست رد پارتیشن‌ها با نقشه ناحیه بدون خواندن ستون‌ها"""
+        journal.append('ETHUSDT', '15min', [make_signal(START + 900, 'SELL', 60.0)])
+        journal.append('ETHUSDT', '15min', [make_signal(START + DAY, 'BUY', 100.0)])
+
+        assert list(journal.partitions('ETHUSDT', side='BUY'))[0][0] == '2024-01-02/ETHUSDT'
+        assert list(journal.partitions(min_confidence=80))[0][0] == '2024-01-02/ETHUSDT'
+        assert list(journal.partitions(start=START + DAY + 1)) == []
+
+    def test_reopen_and_recover_partial_write(self, journal, tmp_path):
+        """تست بازگشایی ژورنال و نادیده گرفتن بایت‌های نوشتن نیمه‌کاره"""
+        journal.append('ETHUSDT', '15min', [make_signal(START + 900)])
+        path = os.path.join(journal.root, '2024-01-01', 'ETHUSDT', 'entry.bin')
+        with open(path, 'ab') as f:
+            f.write(b'\x00\x01\x02')
+
+        reopened = SignalJournal(journal.root)
+        assert len(reopened.query()) == 1
+        reopened.append('ETHUSDT', '15min', [make_signal(START + 1800)])
+
+        result = reopened.query('ETHUSDT')
+        assert result['entry'].tolist() == [100.0, 100.0]
+        assert os.path.getsize(path) == 2 * COLUMN_DTYPES['entry'].itemsize
+
+    def test_catalog_sharded_per_day(self, journal):
+        """تست catalog جدا برای هر روز: append فقط catalog روز خودش را می‌نویسد و روزها با نیاز خوانده می‌شوند"""
+        journal.append('ETHUSDT', '15min', [make_signal(START + 900)])
+        first_day = os.path.join(journal.root, '2024-01-01', 'catalog.json')
+        written = os.stat(first_day).st_mtime_ns
+        journal.append('BTCUSDT', '15min', [make_signal(START + DAY + 900)])
+
+        assert os.stat(first_day).st_mtime_ns == written
+        assert not os.path.exists(os.path.join(journal.root, 'catalog.json'))
+
+        reopened = SignalJournal(journal.root)
+        assert reopened.days == {'2024-01-01': None, '2024-01-02': None}
+        assert len(reopened.query(start=START + DAY)) == 1
+        # روز خارج از بازه پرس‌وجو خوانده نشده است
+        assert reopened.days['2024-01-01'] is None
+        assert len(reopened) == 2
+
+    @pytest.mark.parametrize('digest_mode', [False, True])
+    def test_bot_records_only_delivered_signals(self, journal, digest_mode):
+        """تست ثبت سیگنال در ژورنال فقط پس از تحویل؛ تلاش دوباره ردیف تکراری نمی‌سازد"""
+        from unittest.mock import Mock
+        from main import CoinExSignalBot
+
+        telegram = Mock()
+        telegram.signal_fields.return_value = {}
+        telegram.format_digest_line.return_value = 'line'
+        telegram.split_digest.side_effect = lambda lines: [lines]
+        bot = CoinExSignalBot(coinex_api=Mock(), telegram_bot=telegram)
+        bot.journal = journal
+        bot.correlation = None
+        bot.order_books = None
+        bot.digest_mode = digest_mode
+        bot.send_delay = 0
+        telegram.send_message.return_value = False
+        telegram.send_digest.side_effect = lambda lines: [False] * len(lines)
+
+        signal = make_signal(START + 900)
+        bot.deliver_signals([dict(signal)], 'ETHUSDT', '15min')
+        bot.flush_digest()
+        assert len(journal) == 0
+
+        telegram.send_message.return_value = True
+        telegram.send_digest.side_effect = lambda lines: [True] * len(lines)
+        provisional = dict(signal, provisional=True, timestamp=pd.Timestamp(START + 1800, unit='s'))
+        bot.deliver_signals([provisional], 'ETHUSDT', '15min')
+        bot.deliver_signals([dict(signal)], 'ETHUSDT', '15min')
+        bot.flush_digest()
+
+        result = journal.query('ETHUSDT')
+        assert len(result) == 2
+        assert result['provisional'].tolist() == [0, 1]
+
+    def test_unsorted_appends(self, journal):
+        """تست پرس‌وجوی بازه زمانی در پارتیشن نامرتب"""
+        journal.append('ETHUSDT', '15min', [make_signal(START + 1800)])
+        journal.append('ETHUSDT', '15min', [make_signal(START + 900)])
+
+        assert not journal.catalog['2024-01-01/ETHUSDT']['sorted']
+        result = journal.query('ETHUSDT', start=START + 1000)
+        assert result['timestamp'].tolist() == [pd.Timestamp(START + 1800, unit='s')]
+
+    def test_query_large_journal(self, journal):
+        """تست پرس‌وجوی انتخابی روی یک میلیون ردیف در چند میلی‌ثانیه"""
+        rng = np.random.default_rng(0)
+        symbols = [f"SYM{i}USDT" for i in range(20)]
+        rows = 50000
+        for symbol in symbols:
+            journal.append_columns(symbol, {
+                'timestamp': np.sort(rng.integers(START, START + 60 * DAY, rows)),
+                'type': rng.integers(0, 2, rows),
+                'confidence': rng.choice([60.0, 80.0, 100.0], rows),
+                'rsi': rng.uniform(0, 100, rows),
+            })
+        assert len(journal) == rows * len(symbols)
+
+        begin = time.perf_counter()
+        result = journal.query('SYM3USDT', 'BUY', start=START + 30 * DAY, end=START + 45 * DAY,
+                               min_confidence=80)
+        elapsed = time.perf_counter() - begin
+
+        assert len(result) > 0
+        assert (result['type'] == 'BUY').all() and (result['confidence'] >= 80).all()
+        assert result['timestamp'].min() >= pd.Timestamp(START + 30 * DAY, unit='s')
+        assert elapsed < 0.5
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,195 @@
+import pytest
+import threading
+import time
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from services import signal_pipeline
+from services.signal_pipeline import SignalPipeline
+from strategies.mutanabby_strategy import MutanabbyStrategy
+from conftest import make_ohlcv
+
+class FakeBot:
+    """ربات ساختگی با تاخیر قابل تنظیم برای هر مرحله"""
+
+    def __init__(self, fetch_delay=0.0, deliver_delay=0.0, mode='indicators'):
+        self.fetch_delay = fetch_delay
+        self.deliver_delay = deliver_delay
+        self.clock = time.time
+        self.strategy = MutanabbyStrategy()
+        self.strategy.mode = mode
+        self.computed = []
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.delivered = []
+
+    def fetch_market_data(self, symbol, timeframe):
+        time.sleep(self.fetch_delay)
+        if symbol == 'BROKEN':
+            raise RuntimeError("fetch failed")
+        with self.lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        return make_ohlcv(rows=100)
+
+    def generate_signals(self, df, symbol):
+        self.computed.append(symbol)
+        return [{'type': 'BUY', 'symbol': symbol}]
+
+    def deliver_signals(self, signals, symbol, timeframe):
+        time.sleep(self.deliver_delay)
+        with self.lock:
+            self.in_flight -= 1
+        self.delivered.append(symbol)
+        return len(signals)
+
+class FailingExecutor:
+    """executor ساختگی: submit خطای pool خراب می‌دهد یا آینده‌ای با خروجی نامعتبر"""
+
+    def __init__(self, broken=True):
+        self.broken = broken
+        self.submitted = 0
+
+    def submit(self, function, *args):
+        self.submitted += 1
+        if self.broken:
+            raise BrokenProcessPool("worker died")
+        future = Future()
+        # آمار شرط‌های نامعتبر باعث خطا در خود مرحله جمع‌آوری (بیرون از future.result) می‌شود
+        future.set_result(([], 0.0, 5))
+        return future
+
+    def shutdown(self, wait=True, cancel_futures=False):
+        pass
+
+def run_with_timeout(pipeline, symbols, timeout=10):
+    """اجرای pipeline در thread جدا تا قفل شدن به جای گیر کردن تست شکست بخورد"""
+    outcome = {}
+    thread = threading.Thread(target=lambda: outcome.update(pipeline.run(symbols, '15min')), daemon=True)
+    thread.start()
+    thread.join(timeout)
+    assert not thread.is_alive(), "pipeline قفل شد"
+    return outcome
+
+class TestSignalPipeline:
+
+    def test_all_symbols_flow_through_stages(self):
+        """تست عبور همه نمادها از مراحل و ثبت خطای مرحله دریافت"""
+        bot = FakeBot()
+        pipeline = SignalPipeline(bot, fetch_workers=3, compute_workers=0, queue_size=2)
+        symbols = [f"S{i}" for i in range(10)] + ['BROKEN']
+
+        result = pipeline.run(symbols, '15min')
+
+        assert sorted(bot.delivered) == sorted(symbols[:-1])
+        assert sum(result['sent'].values()) == 10
+        assert result['errors'] == ['BROKEN']
+        assert set(result['finished_at']) == set(symbols)
+        assert result['stats']['fetch']['items'] == 11
+        assert result['stats']['deliver']['items'] == 10
+
+    def test_backpressure_bounds_in_flight_items(self):
+        """تست محدود ماندن آیتم‌های در جریان وقتی ارسال کند است"""
+        bot = FakeBot(deliver_delay=0.01)
+        pipeline = SignalPipeline(bot, fetch_workers=4, compute_workers=0, queue_size=2)
+
+        result = pipeline.run([f"S{i}" for i in range(30)], '15min')
+
+        # ظرفیت صف‌ها + آیتم در دست هر thread
+        assert bot.max_in_flight <= 2 * 2 + 4 + 2
+        assert result['stats']['deliver']['max_queue_depth'] <= 2
+        assert result['stats']['deliver']['utilization'] > 0.5
+
+    def test_stages_overlap(self):
+        """تست همپوشانی دریافت و ارسال"""
+        bot = FakeBot(fetch_delay=0.02, deliver_delay=0.02)
+        pipeline = SignalPipeline(bot, fetch_workers=4, compute_workers=0)
+
+        started = time.perf_counter()
+        pipeline.run([f"S{i}" for i in range(12)], '15min')
+        elapsed = time.perf_counter() - started
+
+        # اجرای سریالی حدود 12 * 0.04 ثانیه طول می‌کشد
+        assert elapsed < 12 * 0.04 * 0.8
+
+    def test_process_pool_compute(self):
+        """تست محاسبه سیگنال‌ها در process pool"""
+        bot = FakeBot()
+        pipeline = SignalPipeline(bot, fetch_workers=2, compute_workers=2)
+        try:
+            result = pipeline.run(['BTCUSDT', 'ETHUSDT'], '15min')
+        finally:
+            pipeline.close()
+
+        assert sorted(bot.delivered) == ['BTCUSDT', 'ETHUSDT']
+        assert result['errors'] == []
+        assert result['stats']['compute']['items'] == 2
+
+    def test_pool_does_not_fork(self):
+        """تست ساخت pool بدون fork (threadهای در حال اجرا قفل‌ها را در پروسس فرزند نگه می‌دارند)"""
+        pipeline = SignalPipeline(FakeBot(), compute_workers=1)
+        try:
+            assert pipeline._executor()._mp_context.get_start_method() != 'fork'
+        finally:
+            pipeline.close()
+
+    def test_broken_pool_does_not_hang(self):
+        """تست ثبت خطای نماد و ادامه چرخه بدون pool وقتی submit خطای BrokenProcessPool می‌دهد"""
+        bot = FakeBot()
+        pipeline = SignalPipeline(bot, fetch_workers=2, compute_workers=2, queue_size=1)
+        executor = pipeline.executor = FailingExecutor()
+        symbols = [f"S{i}" for i in range(8)]
+
+        result = run_with_timeout(pipeline, symbols)
+
+        assert executor.submitted == 1 and pipeline.executor is None
+        assert len(result['errors']) == 1
+        assert sorted(bot.delivered + result['errors']) == sorted(symbols)
+        assert set(result['finished_at']) == set(symbols)
+
+    def test_crashed_stage_propagates_done(self):
+        """تست ثبت خطای همه نمادهای باقیمانده و پایان run وقتی مرحله جمع‌آوری از کار می‌افتد"""
+        bot = FakeBot()
+        pipeline = SignalPipeline(bot, fetch_workers=2, compute_workers=2, queue_size=1)
+        pipeline.executor = FailingExecutor(broken=False)
+        symbols = [f"S{i}" for i in range(8)]
+
+        result = run_with_timeout(pipeline, symbols)
+
+        assert bot.delivered == []
+        assert sorted(result['errors']) == symbols
+        assert set(result['finished_at']) == set(symbols)
+
+    def test_stateful_mode_computes_in_bot(self):
+        """تست محاسبه حالت دارای وضعیت نماد (atr_trailing) با استراتژی ربات به جای process pool"""
+        bot = FakeBot(mode='atr_trailing')
+        pipeline = SignalPipeline(bot, fetch_workers=2, compute_workers=2)
+        try:
+            result = pipeline.run(['BTCUSDT', 'ETHUSDT'], '15min')
+        finally:
+            pipeline.close()
+
+        assert pipeline.executor is None
+        assert sorted(bot.computed) == ['BTCUSDT', 'ETHUSDT']
+        assert result['stats']['compute']['items'] == 2
+
+    def test_worker_condition_stats_per_call(self):
+        """تست برگرداندن آمار شرط‌های هر فراخوانی پروسس محاسبه بدون انباشت در پروسس"""
+        worker = MutanabbyStrategy()
+        worker.lazy = True
+        signal_pipeline._worker_strategy = worker
+        try:
+            first = signal_pipeline._compute_signals(make_ohlcv(rows=100), 'BTCUSDT', time.time())[2]
+            second = signal_pipeline._compute_signals(make_ohlcv(1, rows=100), 'ETHUSDT', time.time())[2]
+        finally:
+            signal_pipeline._worker_strategy = None
+
+        assert first['symbols'] == second['symbols'] == 1
+        assert worker.condition_stats == second
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,115 @@
+import pytest
+import numpy as np
+import pandas as pd
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from services.market_state import MarketState
+from services.state_snapshot import save_snapshot, load_snapshot, SnapshotError
+from services.kline_decoder import decode_klines
+from main import CoinExSignalBot
+from unittest.mock import Mock
+from conftest import make_ohlcv
+
+class TestStateSnapshot:
+
+    @pytest.fixture
+    def state(self):
+        """وضعیت نمونه با پنجره کندل و حذف تکراری"""
+        state = MarketState()
+        index = pd.to_datetime(1700000000 + np.arange(100) * 900, unit='s')
+        window = pd.DataFrame({
+            col: np.linspace(1, 2, 100) * (i + 1)
+            for i, col in enumerate(['open', 'high', 'low', 'close', 'volume'])
+        }, index=index)
+        state.merge('BTCUSDT', '15min', window)
+        state.mark_signal('BTCUSDT', '15min', 1700089100)
+        return state
+
+    def test_round_trip(self, state, tmp_path):
+        """تست ذخیره و بازیابی بدون تغییر داده‌ها"""
+        path = str(tmp_path / 'state.bin')
+        save_snapshot(state, path)
+
+        restored, _ = load_snapshot(path)
+        original = state.get('BTCUSDT', '15min')
+        loaded = restored.get('BTCUSDT', '15min')
+
+        pd.testing.assert_frame_equal(loaded.window, original.window, check_names=False)
+        assert loaded.last_candle == original.last_candle
+        assert loaded.last_signal_candle == 1700089100
+
+    def test_corrupt_snapshot(self, state, tmp_path):
+        """تست تشخیص اسنپ‌شات خراب با checksum"""
+        path = tmp_path / 'state.bin'
+        save_snapshot(state, str(path))
+        data = bytearray(path.read_bytes())
+        data[-10] ^= 0xFF
+        path.write_bytes(bytes(data))
+
+        with pytest.raises(SnapshotError):
+            load_snapshot(str(path))
+
+    def test_stale_snapshot(self, state, tmp_path):
+        """تست رد اسنپ‌شات قدیمی"""
+        path = str(tmp_path / 'state.bin')
+        save_snapshot(state, path)
+
+        with pytest.raises(SnapshotError):
+            load_snapshot(path, max_age=60, now=9999999999)
+
+    def test_bot_fetches_only_delta_after_restore(self, state, tmp_path):
+        """تست دریافت فقط کندل‌های جدید پس از بازیابی"""
+        path = str(tmp_path / 'state.bin')
+        save_snapshot(state, path)
+        api = Mock()
+        api.get_klines.side_effect = lambda symbol, limit, timeframe: decode_klines(
+            b'{"code":0,"data":[[1700089100,"2","8","4","6","10"],'
+            b'[1700090000,"2","8","4","6","10"]]}'
+        )
+        bot = CoinExSignalBot(coinex_api=api, telegram_bot=Mock())
+        bot.clock = lambda: 1700090000 + 60
+
+        assert bot.restore_state(path) is True
+        df = bot.fetch_market_data('BTCUSDT', '15min')
+
+        assert api.get_klines.call_args[0][1] == 2
+        assert len(df) == 100
+        assert df.index[-1] == pd.Timestamp(1700090000, unit='s')
+
+    def test_bot_restores_trailing_states(self, tmp_path):
+        """تست ذخیره وضعیت حد ضرر متحرک استراتژی همراه پنجره‌ها و ادامه افزایشی پس از بازیابی"""
+        path = str(tmp_path / 'state.bin')
+        df = make_ohlcv(5, rows=200)
+        now = 1700000000 + 200 * 900
+        bot = CoinExSignalBot(coinex_api=Mock(), telegram_bot=Mock())
+        bot.strategy.mode = 'atr_trailing'
+        bot.state.merge('BTCUSDT', '15min', df.iloc[:150])
+        bot.strategy.trailing_state(df.iloc[50:150], 'BTCUSDT', now=now)
+        bot.save_state(path)
+
+        restored = CoinExSignalBot(coinex_api=Mock(), telegram_bot=Mock())
+        assert restored.restore_state(path) is True
+        key = ('BTCUSDT', pd.Timedelta(minutes=15))
+        original, loaded = bot.strategy.trailing_states[key], restored.strategy.trailing_states[key]
+        assert loaded.to_dict() == pytest.approx(original.to_dict(), nan_ok=True)
+        assert loaded.last_time == df.index[149]
+
+        # کندل‌های بعدی از همان وضعیت به صورت افزایشی اعمال می‌شوند
+        for strategy in (bot.strategy, restored.strategy):
+            strategy.trailing_state(df.iloc[100:200], 'BTCUSDT', now=now)
+        assert restored.strategy.trailing_states[key].count == bot.strategy.trailing_states[key].count == 150
+        assert restored.strategy.trailing_states[key].stop == bot.strategy.trailing_states[key].stop
+
+    def test_bot_falls_back_on_corrupt_snapshot(self, tmp_path):
+        """تست بازسازی کامل وقتی اسنپ‌شات خراب است"""
+        path = tmp_path / 'state.bin'
+        path.write_bytes(b'not a snapshot at all, definitely not')
+        bot = CoinExSignalBot(coinex_api=Mock(), telegram_bot=Mock())
+
+        assert bot.restore_state(str(path)) is False
+        assert bot.state.symbols == {}
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -48,6 +48,37 @@ class TestMutanabbyStrategy:
         assert len(signal) == len(sample_data)
         assert len(hist) == len(sample_data)
     
+    def test_calculate_indicators_matches_pandas(self, strategy, sample_data):
+        """تست برابری اندیکاتورهای کرنل با محاسبه pandas و استفاده دوباره از بافرها"""
+        df = strategy.calculate_indicators(sample_data.copy())
+        buffers = strategy.buffers
+        close = sample_data['close']
+
+        delta = close.diff()
+        averages = []
+        for moves in (delta.clip(lower=0), (-delta).clip(lower=0)):
+            # میانگین Wilder: مقدار اولیه میانگین ساده 14 تغییر اول و سپس ewm
+            seeded = moves.iloc[14:].copy()
+            seeded.iloc[0] = moves.iloc[1:15].mean()
+            averages.append(seeded.ewm(alpha=1 / 14, adjust=False).mean().reindex(close.index))
+        macd = close.ewm(span=12, adjust=False).mean() - close.ewm(span=26, adjust=False).mean()
+        std = close.rolling(20).std()
+        expected = {
+            'sma_20': close.rolling(20).mean(), 'sma_50': close.rolling(50).mean(),
+            'sma_100': close.rolling(100).mean(), 'rsi': 100 - 100 / (1 + averages[0] / averages[1]),
+            'macd': macd, 'macd_signal': macd.ewm(span=9, adjust=False).mean(),
+            'bb_middle': close.rolling(20).mean(),
+            'bb_upper': close.rolling(20).mean() + 2 * std, 'bb_lower': close.rolling(20).mean() - 2 * std,
+        }
+        for name, values in expected.items():
+            np.testing.assert_allclose(df[name], values, rtol=1e-9, err_msg=name)
+
+        again = strategy.calculate_indicators(sample_data.copy())
+        assert strategy.buffers is buffers
+        # ستون‌های خروجی قبلی با محاسبه بعدی در همان بافرها تغییر نمی‌کنند
+        np.testing.assert_array_equal(df['rsi'], again['rsi'])
+        assert not np.shares_memory(again['sma_20'].to_numpy(), buffers['sma'])
+    
     def test_generate_signals_no_data(self, strategy):
         """تست تولید سیگنال با داده ناکافی"""
         empty_data = pd.DataFrame()
@@ -30,6 +30,19 @@ class TestTelegramBot:
         assert '28500.0' in message
         assert '29500.0' in message
     
+    def test_provisional_signal_is_marked(self, telegram_bot):
+        """تست نمایش متفاوت سیگنال موقت کندل در حال تشکیل"""
+        signal = {'type': 'SELL', 'entry': 2.5, 'sl': 2.6, 'tp1': 2.4, 'tp2': 2.3, 'tp3': 2.2}
+        
+        fields = telegram_bot.signal_fields(signal, 'ETHUSDT')
+        provisional = telegram_bot.signal_fields(dict(signal, provisional=True), 'ETHUSDT')
+        
+        assert fields['provisional'] is False and provisional['provisional'] is True
+        assert 'موقت' not in telegram_bot.format_signal_message(**fields)
+        assert 'موقت' in telegram_bot.format_signal_message(**provisional)
+        assert 'موقت' not in telegram_bot.format_digest_line(**fields)
+        assert 'موقت' in telegram_bot.format_digest_line(**provisional)
+    
     @patch('services.telegram_bot.requests.post')
     def test_send_message_success(self, mock_post, telegram_bot):
         """تست ارسال موفق پیام"""
@@ -52,5 +65,41 @@ class TestTelegramBot:
         
         assert result is False
 
+    def test_split_digest_respects_message_limit(self, telegram_bot):
+        """تست تقسیم پیام خلاصه روی محدودیت ۴۰۹۶ کاراکتر تلگرام"""
+        lines = [
+            telegram_bot.format_digest_line(f"SYM{i}USDT", 'خرید', 1.2345, 1.1, 1.3, 1.4, 1.5)
+            for i in range(300)
+        ]
+        
+        chunks = telegram_bot.split_digest(lines)
+        
+        assert 1 < len(chunks) < 30
+        assert [line for chunk in chunks for line in chunk] == lines
+        for part, chunk in enumerate(chunks, 1):
+            assert len(telegram_bot.render_digest(chunk, part, len(chunks), len(lines))) <= 4096
+    
+    def test_split_digest_truncates_plain_text(self, telegram_bot):
+        """تست کوتاه کردن خط بلند بدون بریدن برچسب HTML"""
+        line = "<b>" + "A&B " * 2000 + "</b> <i>tail</i>"
+        
+        chunks = telegram_bot.split_digest([line, "<b>short</b>"])
+        
+        truncated = chunks[0][0]
+        assert '<' not in truncated and '>' not in truncated
+        assert truncated.startswith("A&amp;B A&amp;B") and not truncated.endswith(('&', '&amp', '&am', '&a'))
+        assert len(telegram_bot.render_digest(chunks[0], 1, len(chunks), 2)) <= 4096
+        assert chunks[-1][-1] == "<b>short</b>"
+    
+    def test_send_digest_reports_delivery_per_line(self, telegram_bot):
+        """تست ارسال خلاصه با یک درخواست برای هر بخش"""
+        lines = ["x" * 1500] * 5
+        telegram_bot.send_message = Mock(side_effect=[True, False, True])
+        
+        delivered = telegram_bot.send_digest(lines)
+        
+        assert telegram_bot.send_message.call_count == 3
+        assert delivered == [True, True, False, False, True]
+
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
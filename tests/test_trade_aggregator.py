@@ -0,0 +1,201 @@
+import pytest
+import sys
+import os
+import numpy as np
+import pandas as pd
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from services.trade_aggregator import TradeAggregator, ProvisionalIndicators
+from strategies.mutanabby_strategy import MutanabbyStrategy
+from conftest import make_ohlcv
+
+START = 1700000100 - 1700000100 % 900  # مرز کندل 15 دقیقه
+
+def make_window(rows=120, seed=7):
+    """پنجره kline که کندل آخر آن هنوز باز است"""
+    return make_ohlcv(seed, rows, start=START - (rows - 1) * 900)
+
+def deal(deal_id, price, amount, ms):
+    return {'id': deal_id, 'price': str(price), 'amount': str(amount), 'date_ms': ms, 'type': 'buy'}
+
+class TestProvisionalIndicators:
+
+    def test_matches_calculate_indicators(self):
+        """تست برابری اندیکاتورهای افزایشی با محاسبه کامل pandas"""
+        window = make_window()
+        strategy = MutanabbyStrategy()
+        closes = window['close'].to_numpy()
+
+        indicators = ProvisionalIndicators(closes[:-1])
+        expected = strategy.calculate_indicators(window.copy())
+
+        for name, value in indicators.evaluate(closes[-1]).items():
+            assert value == pytest.approx(expected[name].iloc[-1], rel=1e-9), name
+        for name, value in indicators.previous.items():
+            assert value == pytest.approx(expected[name].iloc[-2], rel=1e-9), name
+
+    def test_short_history_gives_nan(self):
+        """تست مقدار nan برای اندیکاتورهایی که داده کافی ندارند"""
+        closes = make_window(rows=30)['close'].to_numpy()
+
+        values = ProvisionalIndicators(closes).evaluate(closes[-1])
+
+        assert not np.isnan(values['sma_20'])
+        assert np.isnan(values['sma_50'])
+        assert np.isnan(values['sma_100'])
+
+class TestTradeAggregator:
+
+    @pytest.fixture
+    def aggregator(self):
+        aggregator = TradeAggregator('15min')
+        aggregator.anchor('BTCUSDT', make_window(), now=START + 300)
+        return aggregator
+
+    def test_anchor_and_ingest(self, aggregator):
+        """تست ادامه کندل kline با معاملات بعد از snapshot"""
+        bar = aggregator.provisional_bar('BTCUSDT')
+        high, volume = bar[2], bar[5]
+        as_of = (START + 300) * 1000
+
+        # API جدیدترین معامله را اول برمی‌گرداند؛ معامله قبل از snapshot نادیده گرفته می‌شود
+        applied = aggregator.ingest('BTCUSDT', [
+            deal(12, high + 5, 2, as_of + 2000),
+            deal(11, high - 1, 1, as_of + 1000),
+            deal(10, high + 50, 9, as_of - 1000),
+        ])
+
+        assert applied == 2
+        bar = aggregator.provisional_bar('BTCUSDT')
+        assert bar[0] == START
+        assert bar[2] == high + 5
+        assert bar[4] == high + 5
+        assert bar[5] == pytest.approx(volume + 3)
+        # دسته تکراری دوباره اعمال نمی‌شود
+        assert aggregator.ingest('BTCUSDT', [deal(12, 1, 1, as_of + 2000)]) == 0
+
+    def test_rollover_to_next_candle(self, aggregator):
+        """تست بسته شدن کندل با اولین معامله کندل بعدی"""
+        as_of = (START + 300) * 1000
+        aggregator.ingest('BTCUSDT', [
+            deal(2, 105.0, 1, (START + 900) * 1000 + 10),
+            deal(1, 104.0, 1, as_of + 10),
+        ])
+
+        assert aggregator.provisional_bar('BTCUSDT') == [START + 900, 105.0, 105.0, 105.0, 105.0, 1.0]
+        assert aggregator.closed_bars['BTCUSDT'][0][0] == START
+
+        frame = aggregator.provisional_frame('BTCUSDT', make_window())
+        assert list(frame.index) == list(pd.to_datetime([START, START + 900], unit='s'))
+        assert frame['close'].iloc[0] == 104.0
+
+    def test_cold_start_is_not_provisional(self):
+        """تست اینکه کندل شروع شده از وسط (بدون anchor) ارائه نمی‌شود"""
+        aggregator = TradeAggregator('15min')
+        aggregator.ingest('BTCUSDT', [deal(1, 100.0, 1, (START + 10) * 1000)])
+        assert aggregator.provisional_bar('BTCUSDT') is None
+
+        aggregator.ingest('BTCUSDT', [deal(2, 101.0, 1, (START + 900) * 1000)])
+        assert aggregator.provisional_bar('BTCUSDT')[0] == START + 900
+        assert aggregator.closed_bars['BTCUSDT'] == []
+
+    def test_provisional_frame_matches_full_recalculation(self, aggregator):
+        """تست اندیکاتورهای کندل موقت در برابر محاسبه کامل روی پنجره به‌روز"""
+        window = make_window()
+        as_of = (START + 300) * 1000
+        aggregator.ingest('BTCUSDT', [deal(1, 90.0, 4, as_of + 1000)])
+
+        frame = aggregator.provisional_frame('BTCUSDT', window)
+
+        updated = window.copy()
+        updated.iloc[-1] = aggregator.provisional_bar('BTCUSDT')[1:]
+        expected = MutanabbyStrategy().calculate_indicators(updated)
+        for column in ['close', 'low', 'sma_20', 'rsi', 'macd_signal', 'bb_lower']:
+            assert frame[column].iloc[-1] == pytest.approx(expected[column].iloc[-1], rel=1e-9)
+            assert frame[column].iloc[0] == pytest.approx(expected[column].iloc[-2], rel=1e-9)
+
+        # حالت کندل‌های بسته شده تا کندل بعدی دوباره ساخته نمی‌شود
+        prepared = aggregator.indicators['BTCUSDT']
+        aggregator.ingest('BTCUSDT', [deal(2, 91.0, 1, as_of + 2000)])
+        aggregator.provisional_frame('BTCUSDT', window)
+        assert aggregator.indicators['BTCUSDT'] is prepared
+
+    def test_provisional_window(self, aggregator):
+        """تست پنجره کامل با کندل موقت به عنوان ردیف آخر"""
+        window = make_window()
+        aggregator.ingest('BTCUSDT', [deal(1, 90.0, 4, (START + 400) * 1000)])
+
+        frame = aggregator.provisional_window('BTCUSDT', window)
+
+        assert len(frame) == len(window)
+        assert list(frame.index[:-1]) == list(window.index[:-1])
+        assert frame.iloc[-1].tolist() == aggregator.provisional_bar('BTCUSDT')[1:]
+        assert aggregator.provisional_window('ETHUSDT', window) is None
+
+    def test_intrabar_uses_active_mode(self, aggregator, monkeypatch):
+        """تست ارزیابی کندل موقت با حالت فعال استراتژی بدون تغییر وضعیت نماد"""
+        import main
+        from unittest.mock import Mock
+
+        monkeypatch.setattr(main, 'SYMBOLS', ['BTCUSDT'])
+        api = Mock()
+        api.get_deals.return_value = [deal(1, 90.0, 4, (START + 400) * 1000)]
+        bot = main.CoinExSignalBot(coinex_api=api, telegram_bot=Mock())
+        bot.trades = aggregator
+        bot.clock = lambda: START + 450
+        bot.state.get('BTCUSDT', '15min').window = make_window()
+        bot.strategy.mode = 'atr_trailing'
+        bot.strategy.analyze_signals = Mock(return_value=[])
+        bot.strategy.generate_signals = Mock(wraps=bot.strategy.generate_signals)
+
+        bot.run_intrabar('15min')
+
+        bot.strategy.analyze_signals.assert_not_called()
+        frame = bot.strategy.generate_signals.call_args.args[0]
+        assert frame.index[-1] == pd.Timestamp(START, unit='s') and frame['close'].iloc[-1] == 90.0
+        assert bot.strategy.generate_signals.call_args.kwargs['commit'] is False
+        assert bot.strategy.trailing_states == {}
+
+    def test_intrabar_signals_are_provisional(self, aggregator, monkeypatch):
+        """تست ارسال سیگنال کندل موقت با علامت موقت و حذف تکراری جدا از سیگنال قطعی همان کندل"""
+        import main
+        from unittest.mock import Mock
+
+        monkeypatch.setattr(main, 'SYMBOLS', ['BTCUSDT'])
+        api = Mock()
+        api.get_deals.side_effect = lambda symbol, last_id, limit: [deal(last_id + 1, 90.0, 4, (START + 400) * 1000)]
+        telegram = Mock()
+        telegram.signal_fields.return_value = {}
+        bot = main.CoinExSignalBot(coinex_api=api, telegram_bot=telegram)
+        bot.trades = aggregator
+        bot.digest_mode = False
+        bot.send_delay = 0
+        bot.state.get('BTCUSDT', '15min').window = make_window()
+        signal = {'type': 'BUY', 'confidence': 60, 'timestamp': pd.Timestamp(START, unit='s')}
+        bot.strategy.analyze_signals = Mock(side_effect=lambda frame: [dict(signal)])
+
+        assert bot.run_intrabar('15min') == 1
+        assert telegram.signal_fields.call_args.args[0]['provisional'] is True
+        # سیگنال موقت همان کندل دوباره ارسال نمی‌شود
+        assert bot.run_intrabar('15min') == 0
+        # ولی سیگنال قطعی کندل پس از بسته شدن آن ارسال می‌شود
+        assert bot.deliver_signals([dict(signal)], 'BTCUSDT', '15min') == 1
+        assert not bot.state.is_new_signal_candle('BTCUSDT', '15min', START, provisional=True)
+
+    def test_poll_uses_last_id(self, aggregator):
+        """تست دریافت افزایشی معاملات با last_id"""
+        class FakeAPI:
+            def __init__(self):
+                self.calls = []
+
+            def get_deals(self, symbol, last_id, limit):
+                self.calls.append(last_id)
+                return [deal(7, 100.0, 1, (START + 400) * 1000)]
+
+        api = FakeAPI()
+        assert aggregator.poll(api, 'BTCUSDT') == 1
+        assert aggregator.poll(api, 'BTCUSDT') == 0
+        assert api.calls == [0, 7]
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
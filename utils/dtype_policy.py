@@ -0,0 +1,26 @@
+import numpy as np
+
+from config.config import DATA_DTYPE
+
+# نوع ذخیره‌سازی داده‌ها؛ محاسبات تجمعی (rolling، ewm، جمع‌ها) همیشه float64 هستند
+SUPPORTED_DTYPES = ('float32', 'float64')
+ACCUMULATOR_DTYPE = np.dtype(np.float64)
+
+def resolve_dtype(name=DATA_DTYPE):
+    """تبدیل نام نوع داده (float32 یا float64) به np.dtype"""
+    dtype = np.dtype(name)
+    if dtype.name not in SUPPORTED_DTYPES:
+        raise ValueError(f"نوع داده پشتیبانی نمی‌شود: {name} (مجاز: {', '.join(SUPPORTED_DTYPES)})")
+    return dtype
+
+STORAGE_DTYPE = resolve_dtype()
+
+def exact_value(value):
+    """مقدار اعشاری با کوتاه‌ترین نمایش در دقت ذخیره (بدون ارقام اضافه float32)"""
+    return float(np.format_float_positional(value, unique=True, trim='-'))
+
+def frame_nbytes(df):
+    """حجم ستون‌ها و ایندکس یک DataFrame به بایت"""
+    if df is None:
+        return 0
+    return int(df.memory_usage(index=True, deep=False).sum())
@@ -1,8 +1,10 @@
 import logging
+import time
 import traceback
-from datetime import datetime
 from functools import wraps
 
+from utils.error_sink import error_sink
+
 logger = logging.getLogger(__name__)
 
 class ErrorHandler:
@@ -19,10 +21,11 @@ class ErrorHandler:
                 except Exception as e:
                     error_msg = f"Error in {context}: {str(e)}"
                     logger.error(error_msg)
-                    logger.debug(traceback.format_exc())
+                    if logger.isEnabledFor(logging.DEBUG):
+                        logger.debug(traceback.format_exc())
                     
-                    # ذخیره خطا در فایل
-                    ErrorHandler._log_error_to_file(context, e, traceback.format_exc())
+                    # ثبت خطا در بافر تجمیعی (نوشتن دسته‌ای در پس‌زمینه)
+                    ErrorHandler._log_error_to_file(context, e)
                     
                     if raise_exception:
                         raise
@@ -31,20 +34,10 @@ class ErrorHandler:
         return decorator
     
     @staticmethod
-    def _log_error_to_file(context, exception, traceback_str):
-        """ذخیره خطا در فایل"""
+    def _log_error_to_file(context, exception, traceback_str=None):
+        """ذخیره خطا در logs/errors.jsonl از طریق error_sink"""
         try:
-            error_data = {
-                "timestamp": datetime.now().isoformat(),
-                "context": context,
-                "exception_type": type(exception).__name__,
-                "exception_message": str(exception),
-                "traceback": traceback_str
-            }
-            
-            with open("logs/errors.jsonl", "a", encoding='utf-8') as f:
-                f.write(json.dumps(error_data, ensure_ascii=False) + "\n")
-                
+            error_sink.record(context, exception, traceback_str)
         except Exception as e:
             print(f"Failed to log error: {str(e)}")
     
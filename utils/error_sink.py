@@ -0,0 +1,134 @@
+import atexit
+import json
+import logging
+import os
+import threading
+import traceback
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+ERROR_LOG_PATH = "logs/errors.jsonl"
+
+class ErrorSink:
+    """ثبت بافر شده و تجمیعی خطاها؛ نوشتن دسته‌ای روی دیسک از thread پس‌زمینه"""
+
+    def __init__(self, path=ERROR_LOG_PATH, flush_interval=2.0, max_pending=500):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.dropped = 0
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+        atexit.register(self.close)
+
+    @staticmethod
+    def location(exception):
+        """محل وقوع خطا (فایل:خط:تابع) از آخرین فریم traceback"""
+        tb = exception.__traceback__
+        if tb is None:
+            return "unknown"
+        while tb.tb_next is not None:
+            tb = tb.tb_next
+        code = tb.tb_frame.f_code
+        return f"{os.path.basename(code.co_filename)}:{tb.tb_lineno}:{code.co_name}"
+
+    def record(self, context, exception, traceback_str=None):
+        """ثبت یک خطا؛ خطاهای یکسان (context، نوع، محل) فقط شمارش می‌شوند"""
+        exception_type = type(exception).__name__
+        location = self.location(exception)
+        key = (context, exception_type, location)
+        now = datetime.now().isoformat()
+
+        with self._lock:
+            entry = self._pending.get(key)
+            if entry is not None:
+                entry['count'] += 1
+                entry['last_seen'] = now
+                entry['exception_message'] = str(exception)
+                return
+
+            if len(self._pending) >= self.max_pending:
+                self.dropped += 1
+                self._wakeup.set()
+                return
+
+            # traceback فقط برای اولین رخداد هر اثر انگشت ساخته می‌شود
+            if traceback_str is None:
+                traceback_str = ''.join(traceback.format_exception(
+                    type(exception), exception, exception.__traceback__
+                ))
+            self._pending[key] = {
+                'fingerprint': f"{context}|{exception_type}|{location}",
+                'context': context,
+                'exception_type': exception_type,
+                'location': location,
+                'exception_message': str(exception),
+                'count': 1,
+                'first_seen': now,
+                'last_seen': now,
+                'traceback': traceback_str,
+            }
+
+        self._ensure_thread()
+
+    def flush(self):
+        """نوشتن رکوردهای تجمیع شده در یک عملیات append"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            dropped, self.dropped = self.dropped, 0
+
+        if not pending and not dropped:
+            return 0
+
+        lines = [json.dumps(entry, ensure_ascii=False) for entry in pending.values()]
+        if dropped:
+            lines.append(json.dumps({
+                'context': 'error_sink',
+                'exception_type': 'Dropped',
+                'count': dropped,
+                'last_seen': datetime.now().isoformat(),
+            }))
+
+        try:
+            with self._write_lock:
+                directory = os.path.dirname(self.path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                with open(self.path, "a", encoding='utf-8') as f:
+                    f.write("\n".join(lines) + "\n")
+        except Exception as e:
+            print(f"Failed to log error: {str(e)}")
+        return len(lines)
+
+    def _ensure_thread(self):
+        if self._thread is not None or self._stopped.is_set():
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="error-sink", daemon=True
+                )
+                self._thread.start()
+
+    def _run(self):
+        while not self._stopped.is_set():
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self.flush()
+
+    def close(self):
+        """توقف thread و نوشتن باقیمانده بافر"""
+        self._stopped.set()
+        self._wakeup.set()
+        thread = self._thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout=5)
+        self.flush()
+
+# ایجاد instance全局
+error_sink = ErrorSink()
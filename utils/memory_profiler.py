@@ -0,0 +1,144 @@
+import gc
+import logging
+import os
+import tracemalloc
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+TOP_ALLOCATION_SITES = 10
+TRACEBACK_FRAMES = 1
+# رشد پیوسته حافظه در این تعداد چرخه متوالی به عنوان نشت احتمالی گزارش می‌شود
+GROWTH_CYCLES = 5
+GROWTH_MIN_BYTES = 1024 * 1024
+
+# تخصیص‌های خود پروفایلر و بارگذاری ماژول‌ها در گزارش نمی‌آیند
+SNAPSHOT_FILTERS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, __file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+)
+
+class MemoryProfiler:
+    """پروفایل حافظه هر مرحله pipeline با snapshotهای tracemalloc"""
+
+    def __init__(self, top_n=TOP_ALLOCATION_SITES, frames=TRACEBACK_FRAMES,
+                 growth_cycles=GROWTH_CYCLES, growth_min_bytes=GROWTH_MIN_BYTES):
+        self.top_n = top_n
+        self.frames = frames
+        self.growth_cycles = growth_cycles
+        self.growth_min_bytes = growth_min_bytes
+        self._started_tracing = False
+        # مراحل باز؛ هر عنصر [حافظه ابتدای مرحله، بیشینه دیده شده]
+        self._open = []
+        self.reset()
+
+    def reset(self):
+        self.stages = {}
+        self.cycle_memory = []
+
+    def start(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+            self._started_tracing = True
+        logger.info("Memory profiling started (tracemalloc)")
+
+    def stop(self):
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+    def _update_open_peaks(self):
+        """انتقال بیشینه فعلی به مراحل بیرونی قبل از reset_peak مرحله داخلی"""
+        peak = tracemalloc.get_traced_memory()[1]
+        for frame in self._open:
+            frame[1] = max(frame[1], peak)
+
+    @contextmanager
+    def measure(self, stage_name, symbol=None):
+        """اندازه‌گیری بیشینه و خالص حافظه و محل‌های اصلی تخصیص یک مرحله"""
+        if not tracemalloc.is_tracing():
+            yield
+            return
+
+        before = tracemalloc.take_snapshot()
+        self._update_open_peaks()
+        tracemalloc.reset_peak()
+        baseline = tracemalloc.get_traced_memory()[0]
+        frame = [baseline, baseline]
+        self._open.append(frame)
+        try:
+            yield
+        finally:
+            self._update_open_peaks()
+            self._open.pop()
+            current = tracemalloc.get_traced_memory()[0]
+            after = tracemalloc.take_snapshot()
+            diff = after.filter_traces(SNAPSHOT_FILTERS).compare_to(
+                before.filter_traces(SNAPSHOT_FILTERS), 'lineno'
+            )
+            self.record(stage_name, symbol, frame[1] - baseline, current - baseline, diff)
+
+    def record(self, stage_name, symbol, peak_bytes, net_bytes, diff):
+        stats = self.stages.get(stage_name)
+        if stats is None:
+            stats = self.stages[stage_name] = {
+                'count': 0, 'peak_bytes': 0, 'net_bytes': 0, 'by_symbol': {}, 'sites': {}
+            }
+        stats['count'] += 1
+        stats['peak_bytes'] = max(stats['peak_bytes'], peak_bytes)
+        stats['net_bytes'] += net_bytes
+        if symbol is not None:
+            stats['by_symbol'][symbol] = max(stats['by_symbol'].get(symbol, 0), peak_bytes)
+
+        for stat in diff[:self.top_n]:
+            if stat.size_diff <= 0:
+                continue
+            frame = stat.traceback[0]
+            site = f"{os.path.basename(frame.filename)}:{frame.lineno}"
+            entry = stats['sites'].setdefault(site, {'size_bytes': 0, 'blocks': 0})
+            entry['size_bytes'] += stat.size_diff
+            entry['blocks'] += stat.count_diff
+
+    def record_cycle(self):
+        """ثبت حافظه باقیمانده پس از هر چرخه؛ خروجی هشدار رشد پیوسته یا None"""
+        if not tracemalloc.is_tracing():
+            return None
+        gc.collect()
+        self.cycle_memory.append(tracemalloc.get_traced_memory()[0])
+        return self.detect_growth()
+
+    def detect_growth(self):
+        """رشد یکنواخت حافظه در growth_cycles چرخه آخر"""
+        window = self.cycle_memory[-(self.growth_cycles + 1):]
+        if len(window) < self.growth_cycles + 1:
+            return None
+        if any(later <= earlier for earlier, later in zip(window, window[1:])):
+            return None
+        growth = window[-1] - window[0]
+        if growth < self.growth_min_bytes:
+            return None
+        return {
+            'cycles': self.growth_cycles,
+            'growth_bytes': growth,
+            'bytes_per_cycle': growth // self.growth_cycles,
+        }
+
+    def report(self):
+        stages = {}
+        for name, stats in self.stages.items():
+            sites = sorted(stats['sites'].items(), key=lambda item: item[1]['size_bytes'], reverse=True)
+            stages[name] = {
+                'count': stats['count'],
+                'peak_bytes': stats['peak_bytes'],
+                'net_bytes': stats['net_bytes'],
+                'peak_by_symbol': dict(stats['by_symbol']),
+                'top_sites': [{'site': site, **entry} for site, entry in sites[:self.top_n]],
+            }
+        return {
+            'stages': stages,
+            'cycle_memory_bytes': list(self.cycle_memory),
+            'growth': self.detect_growth(),
+        }
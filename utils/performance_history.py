@@ -0,0 +1,182 @@
+import logging
+import os
+import sqlite3
+from datetime import datetime
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+HISTORY_DB_PATH = "logs/performance_history.sqlite"
+
+# ضریب تبدیل MAD به انحراف معیار برای توزیع نرمال
+MAD_SCALE = 1.4826
+SPARK_CHARS = "▁▂▃▄▅▆▇█"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    run_id TEXT UNIQUE,
+    recorded_at TEXT NOT NULL,
+    total_seconds REAL,
+    memory_mb REAL,
+    cpu_percent REAL
+);
+CREATE TABLE IF NOT EXISTS stage_metrics (
+    run_pk INTEGER NOT NULL REFERENCES runs(id),
+    stage TEXT NOT NULL,
+    total_seconds REAL NOT NULL,
+    count INTEGER NOT NULL,
+    mean_seconds REAL NOT NULL,
+    max_seconds REAL NOT NULL,
+    PRIMARY KEY (run_pk, stage)
+);
+CREATE TABLE IF NOT EXISTS run_counts (
+    run_pk INTEGER NOT NULL REFERENCES runs(id),
+    name TEXT NOT NULL,
+    value REAL NOT NULL,
+    PRIMARY KEY (run_pk, name)
+);
+"""
+
+class PerformanceHistory:
+    """تاریخچه append-only عملکرد اجراها در SQLite و تشخیص خودکار کندشدن"""
+
+    def __init__(self, db_path=HISTORY_DB_PATH):
+        self.db_path = db_path
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.conn = sqlite3.connect(db_path)
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def ingest(self, report, run_id=None):
+        """افزودن گزارش یک اجرا (خروجی PerformanceMonitor)؛ اجرای تکراری نادیده گرفته می‌شود"""
+        with self.conn:
+            cursor = self.conn.execute(
+                "INSERT OR IGNORE INTO runs (run_id, recorded_at, total_seconds, memory_mb, cpu_percent) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (
+                    run_id,
+                    report.get('timestamp') or datetime.now().isoformat(),
+                    report.get('total_duration_seconds'),
+                    report.get('memory_usage_mb'),
+                    report.get('cpu_percent'),
+                )
+            )
+            if cursor.rowcount == 0:
+                logger.info(f"اجرای {run_id} قبلا ثبت شده است")
+                return None
+            run_pk = cursor.lastrowid
+
+            self.conn.executemany(
+                "INSERT INTO stage_metrics VALUES (?, ?, ?, ?, ?, ?)",
+                [
+                    (run_pk, stage, s['total_seconds'], s['count'],
+                     s.get('mean_seconds', s['total_seconds'] / max(s['count'], 1)),
+                     s.get('max_seconds', s['total_seconds']))
+                    for stage, s in report.get('stages', {}).items()
+                ]
+            )
+            self.conn.executemany(
+                "INSERT INTO run_counts VALUES (?, ?, ?)",
+                [(run_pk, name, value) for name, value in report.get('counts', {}).items()]
+            )
+        return run_pk
+
+    def run_count(self):
+        return self.conn.execute("SELECT COUNT(*) FROM runs").fetchone()[0]
+
+    def series(self):
+        """سری زمانی همه متریک‌ها: {نام متریک: [(run_pk, مقدار), ...]} به ترتیب اجرا"""
+        metrics = {}
+        for run_pk, total, memory in self.conn.execute(
+                "SELECT id, total_seconds, memory_mb FROM runs ORDER BY id"):
+            if total is not None:
+                metrics.setdefault('run.total_seconds', []).append((run_pk, total))
+            if memory is not None:
+                metrics.setdefault('run.memory_mb', []).append((run_pk, memory))
+
+        for run_pk, stage, total, mean in self.conn.execute(
+                "SELECT run_pk, stage, total_seconds, mean_seconds FROM stage_metrics ORDER BY run_pk"):
+            metrics.setdefault(f"stage.{stage}.total_seconds", []).append((run_pk, total))
+            metrics.setdefault(f"stage.{stage}.mean_seconds", []).append((run_pk, mean))
+        return metrics
+
+    @staticmethod
+    def baseline(values):
+        """خط مبنای مقاوم: میانه و MAD مقیاس شده"""
+        values = np.asarray(values, dtype=float)
+        median = float(np.median(values))
+        mad = float(np.median(np.abs(values - median))) * MAD_SCALE
+        return median, mad
+
+    def detect_regressions(self, window=20, min_runs=5, z_threshold=3.5, min_ratio=1.10):
+        """مقایسه آخرین اجرا با خط مبنای اجراهای قبلی برای هر متریک
+
+        کندشدن وقتی علامت می‌خورد که z مقاوم (بر پایه MAD) از z_threshold و
+        نسبت به میانه از min_ratio بیشتر باشد؛ شرط دوم نوسان ناچیز را حذف می‌کند.
+        """
+        results = []
+        for metric, points in sorted(self.series().items()):
+            if len(points) < min_runs + 1:
+                continue
+            history = [value for _, value in points[-(window + 1):-1]]
+            latest = points[-1][1]
+            median, mad = self.baseline(history)
+            # کف MAD برای سری‌های تقریبا ثابت تا هر تغییر کوچکی معنادار نشود
+            spread = max(mad, abs(median) * 0.01, 1e-9)
+            z_score = (latest - median) / spread
+            ratio = latest / median if median else float('inf')
+
+            results.append({
+                'metric': metric,
+                'latest': latest,
+                'baseline_median': median,
+                'baseline_mad': mad,
+                'z_score': round(z_score, 2),
+                'ratio': round(ratio, 3),
+                'runs': len(history),
+                'regression': z_score > z_threshold and ratio > min_ratio,
+                'trend': self.sparkline([value for _, value in points[-window:]]),
+            })
+        return results
+
+    @staticmethod
+    def sparkline(values):
+        """نمایش روند مقادیر با کاراکترهای بلوکی"""
+        if not values:
+            return ""
+        low, high = min(values), max(values)
+        if high == low:
+            return SPARK_CHARS[0] * len(values)
+        scale = (len(SPARK_CHARS) - 1) / (high - low)
+        return "".join(SPARK_CHARS[int((v - low) * scale)] for v in values)
+
+    def trend_report(self, window=20, min_runs=5):
+        """گزارش Markdown روند و کندشدن‌های تشخیص داده شده"""
+        results = self.detect_regressions(window=window, min_runs=min_runs)
+        regressions = [r for r in results if r['regression']]
+
+        report = f"\n## 📉 Performance Trend (last {window} runs, {self.run_count()} total)\n"
+        if not results:
+            report += f"\nNot enough history yet (need at least {min_runs + 1} runs).\n"
+            return report, regressions
+
+        if regressions:
+            report += "\n### ⚠️ Regressions\n"
+            for r in regressions:
+                report += (f"- **{r['metric']}**: {r['latest']:.4f} vs baseline "
+                           f"{r['baseline_median']:.4f} (x{r['ratio']}, z={r['z_score']})\n")
+        else:
+            report += "\n✅ No significant regressions detected.\n"
+
+        report += "\n| Metric | Latest | Baseline | Ratio | z | Trend |\n|---|---|---|---|---|---|\n"
+        for r in results:
+            flag = " ⚠️" if r['regression'] else ""
+            report += (f"| {r['metric']}{flag} | {r['latest']:.4f} | {r['baseline_median']:.4f} | "
+                       f"{r['ratio']} | {r['z_score']} | {r['trend']} |\n")
+        return report, regressions
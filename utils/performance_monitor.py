@@ -1,8 +1,13 @@
+import json
+import os
 import time
 import psutil
 import logging
+from contextlib import contextmanager
 from datetime import datetime
 
+from utils.memory_profiler import MemoryProfiler
+
 logger = logging.getLogger(__name__)
 
 class PerformanceMonitor:
@@ -12,14 +17,72 @@ class PerformanceMonitor:
         self.start_time = None
         self.operation_times = {}
         self.memory_usage = []
+        self.stages = {}
+        self.counts = {}
+        # پروفایل حافظه فقط در حالت --memory-profile فعال می‌شود
+        self.memory_profiler = None
         
     def start_monitoring(self):
         """شروع مانیتورینگ"""
         self.start_time = time.time()
         self.operation_times = {}
         self.memory_usage = []
+        self.stages = {}
+        self.counts = {}
+        if self.memory_profiler is not None:
+            self.memory_profiler.reset()
         logger.info("Performance monitoring started")
     
+    def enable_memory_profiling(self, **kwargs):
+        """فعال‌سازی snapshotهای tracemalloc در اطراف هر مرحله"""
+        if self.memory_profiler is None:
+            self.memory_profiler = MemoryProfiler(**kwargs)
+        self.memory_profiler.start()
+        return self.memory_profiler
+    
+    def record_stage(self, stage_name, duration):
+        """ثبت یک اجرای مرحله (مجموع، تعداد و بیشینه زمان)"""
+        stats = self.stages.get(stage_name)
+        if stats is None:
+            stats = self.stages[stage_name] = {"total_seconds": 0.0, "count": 0, "max_seconds": 0.0}
+        stats["total_seconds"] += duration
+        stats["count"] += 1
+        stats["max_seconds"] = max(stats["max_seconds"], duration)
+    
+    @contextmanager
+    def stage(self, stage_name, symbol=None):
+        """اندازه‌گیری زمان (و در حالت پروفایل، حافظه) یک مرحله از pipeline"""
+        if self.memory_profiler is not None:
+            with self.memory_profiler.measure(stage_name, symbol):
+                start = time.perf_counter()
+                try:
+                    yield
+                finally:
+                    self.record_stage(stage_name, time.perf_counter() - start)
+            return
+        
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record_stage(stage_name, time.perf_counter() - start)
+    
+    def end_cycle(self):
+        """پایان یک چرخه در حالت اجرای دائمی؛ هشدار در صورت رشد پیوسته حافظه"""
+        if self.memory_profiler is None:
+            return None
+        growth = self.memory_profiler.record_cycle()
+        if growth:
+            logger.warning(
+                f"Memory grew monotonically for {growth['cycles']} cycles "
+                f"(+{growth['growth_bytes'] / 1024:.1f} KiB, ~{growth['bytes_per_cycle'] / 1024:.1f} KiB/cycle)"
+            )
+        return growth
+    
+    def increment(self, counter_name, value=1):
+        """افزایش یک شمارنده (مثلا تعداد نمادها یا سیگنال‌ها)"""
+        self.counts[counter_name] = self.counts.get(counter_name, 0) + value
+    
     def track_operation(self, operation_name):
         """ردیابی زمان عملیات"""
         def decorator(func):
@@ -59,6 +122,17 @@ class PerformanceMonitor:
             "operation_times": self.operation_times,
             "memory_usage_mb": round(process.memory_info().rss / 1024 / 1024, 2),
             "cpu_percent": process.cpu_percent(),
+            "stages": {
+                name: {
+                    "total_seconds": round(stats["total_seconds"], 6),
+                    "count": stats["count"],
+                    "mean_seconds": round(stats["total_seconds"] / stats["count"], 6),
+                    "max_seconds": round(stats["max_seconds"], 6),
+                }
+                for name, stats in self.stages.items()
+            },
+            "counts": dict(self.counts),
+            "memory_profile": self.memory_profiler.report() if self.memory_profiler is not None else None,
             "detailed_metrics": self.memory_usage
         }
         
@@ -74,10 +148,20 @@ class PerformanceMonitor:
         
         for op, duration in report['operation_times'].items():
             logger.info(f"  {op}: {duration:.4f}s")
+        for stage_name, stats in report['stages'].items():
+            logger.info(f"  {stage_name}: {stats['total_seconds']:.4f}s ({stats['count']}x)")
+        if report['memory_profile']:
+            for stage_name, stats in report['memory_profile']['stages'].items():
+                logger.info(f"  {stage_name}: peak {stats['peak_bytes'] / 1024:.1f} KiB, "
+                            f"net {stats['net_bytes'] / 1024:.1f} KiB")
+                for site in stats['top_sites'][:3]:
+                    logger.info(f"    {site['site']}: {site['size_bytes'] / 1024:.1f} KiB")
         
         # ذخیره گزارش کامل
+        os.makedirs("logs", exist_ok=True)
         with open("logs/performance_report.json", "w", encoding='utf-8') as f:
-            json.dump(report, f, indent=2, ensure_ascii=False)
+            json.dump(report, f, indent=2, ensure_ascii=False, default=str)
+        return report
 
 # ایجاد instance全局
 performance_monitor = PerformanceMonitor()
@@ -0,0 +1,76 @@
+import os
+import sys
+import threading
+from collections import Counter
+
+DEFAULT_INTERVAL_SECONDS = 0.001
+
+class SamplingProfiler:
+    """پروفایلر نمونه‌بردار: ثبت دوره‌ای پشته یک thread به قالب collapsed (برای flamegraph)"""
+
+    def __init__(self, interval=DEFAULT_INTERVAL_SECONDS, thread_id=None, label=None):
+        self.interval = interval
+        self.thread_id = thread_id
+        # تابع اختیاری برای برچسب ریشه هر نمونه (مثلا نام مرحله فعلی)
+        self.label = label
+        self.samples = Counter()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    @staticmethod
+    def frame_name(frame):
+        code = frame.f_code
+        return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+    def collapse(self, frame):
+        """پشته از ریشه به برگ، جدا شده با ';'"""
+        names = []
+        while frame is not None:
+            names.append(self.frame_name(frame))
+            frame = frame.f_back
+        if self.label is not None:
+            names.append(self.label())
+        return ";".join(reversed(names))
+
+    def start(self):
+        if self.thread_id is None:
+            self.thread_id = threading.get_ident()
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+        return self
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self.samples[self.collapse(frame)] += 1
+
+    def stop(self):
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def total_samples(self):
+        return sum(self.samples.values())
+
+    def top_functions(self, limit=10):
+        """توابع با بیشترین نمونه در بالای پشته (زمان اختصاصی)"""
+        leaves = Counter()
+        for stack, count in self.samples.items():
+            leaves[stack.rsplit(";", 1)[-1]] += count
+        return leaves.most_common(limit)
+
+    def write_collapsed(self, path):
+        """نوشتن خطوط 'stack count' قابل استفاده در flamegraph.pl و speedscope"""
+        with open(path, "w", encoding='utf-8') as f:
+            for stack, count in sorted(self.samples.items()):
+                f.write(f"{stack} {count}\n")
+        return path
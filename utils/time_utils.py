@@ -0,0 +1,36 @@
+import logging
+
+logger = logging.getLogger(__name__)
+
+# طول هر کندل به ثانیه برای تایم فریم‌های CoinEx
+TIMEFRAME_SECONDS = {
+    '1min': 60,
+    '3min': 3 * 60,
+    '5min': 5 * 60,
+    '15min': 15 * 60,
+    '30min': 30 * 60,
+    '1hour': 60 * 60,
+    '2hour': 2 * 60 * 60,
+    '4hour': 4 * 60 * 60,
+    '6hour': 6 * 60 * 60,
+    '12hour': 12 * 60 * 60,
+    '1day': 24 * 60 * 60,
+    '3day': 3 * 24 * 60 * 60,
+    '1week': 7 * 24 * 60 * 60,
+}
+
+def timeframe_to_seconds(timeframe):
+    """تبدیل تایم فریم CoinEx (مثلا 15min) به ثانیه"""
+    try:
+        return TIMEFRAME_SECONDS[timeframe]
+    except KeyError:
+        raise ValueError(f"تایم فریم نامعتبر: {timeframe}")
+
+def candle_close_time(open_timestamp, timeframe):
+    """زمان بسته شدن کندل بر اساس زمان باز شدن آن (ثانیه یونیکس)"""
+    return int(open_timestamp) + timeframe_to_seconds(timeframe)
+
+def next_candle_close(now, timeframe):
+    """زمان بسته شدن کندل جاری (مرز بعدی تایم فریم) پس از لحظه now"""
+    seconds = timeframe_to_seconds(timeframe)
+    return (int(now) // seconds + 1) * seconds